@@ -13,7 +13,7 @@ os.chdir(parent_dir)
 
 # Now we can import from src
 from src.web_interface.app import app
-from src.database import db, Market, Offer
+from src.database import db, SaveStats, get_market_registry, save_offers
 
 
 def add_sample_data():
@@ -22,12 +22,11 @@ def add_sample_data():
         print("Adding sample data to database...")
         
         # Ensure all markets exist first
+        registry = get_market_registry()
         for market_name in ['Bilka', 'Rema 1000', 'Netto', 'Føtex', 'Lidl']:
-            if not Market.query.filter_by(name=market_name).first():
+            if registry.get(market_name) is None:
                 print(f"Creating market: {market_name}")
-                market = Market(name=market_name)
-                db.session.add(market)
-        db.session.commit()
+                registry.get_or_create(market_name)
         
         # Sample offers for different markets
         sample_offers = [
@@ -72,28 +71,24 @@ def add_sample_data():
         valid_from = today
         valid_to = today + timedelta(days=7)
         
-        added_count = 0
-        for offer_data in sample_offers:
+        save_stats = SaveStats()
+        for market_name in dict.fromkeys(offer['market'] for offer in sample_offers):
             # Get market
-            market = Market.query.filter_by(name=offer_data['market']).first()
+            market = registry.get(market_name)
             if not market:
-                print(f"Warning: Market {offer_data['market']} not found")
+                print(f"Warning: Market {market_name} not found")
                 continue
             
-            # Create offer
-            offer = Offer(
-                market_id=market.id,
-                product_name=offer_data['product'],
-                price=offer_data['price'],
-                unit=offer_data['unit'],
-                valid_from=valid_from,
-                valid_to=valid_to
-            )
-            db.session.add(offer)
-            added_count += 1
+            # Offers already added today are skipped instead of duplicated
+            offers = [{'product_name': offer_data['product'], 'price': offer_data['price'],
+                       'unit': offer_data['unit'], 'valid_from': valid_from,
+                       'valid_to': valid_to}
+                      for offer_data in sample_offers if offer_data['market'] == market_name]
+            save_offers(market, offers, commit=False, stats=save_stats)
         
         db.session.commit()
-        print(f"Successfully added {added_count} sample offers")
+        print(f"Successfully saved {save_stats.rows} sample offers: {save_stats.inserted} "
+              f"inserted, {save_stats.updated} updated, {save_stats.skipped} unchanged")
 
 
 if __name__ == '__main__':
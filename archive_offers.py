@@ -0,0 +1,33 @@
+"""Script to move expired offers from the offers table to the archive."""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.database import archive_expired_offers
+from src.database.archive import ARCHIVE_CHUNK_SIZE
+from src.web_interface.app import create_app
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Archive offers whose validity has ended')
+    parser.add_argument('--today', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                        default=None, metavar='YYYY-MM-DD',
+                        help='Archive offers that ended before this date (default: today)')
+    parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE,
+                        help='Offers moved per transaction (default: %(default)s)')
+    
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        moved = archive_expired_offers(today=args.today, chunk_size=args.chunk_size)
+    print(f"Archived {moved} expired offers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark offer extraction on a large synthetic flyer.
+
+Compares the nearest-unit lookup against the previous approach of
+measuring the distance to every unit in the document, and times the full
+extraction. With --documents it also times extract_offers_many() over
+that many copies of the flyer. Run from the project root:
+
+    python benchmarks/bench_offer_extraction.py --lines 5000
+    python benchmarks/bench_offer_extraction.py --lines 500 --documents 200 --workers 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.nlp_processor import ExtractionStats, OfferExtractor, extract_offers_many
+from src.nlp_processor.extractor import nearest_unit
+
+
+PRODUCTS = ['Bananer', 'Mælk Letmælk 1,5%', 'Rugbrød', 'Hakket oksekød 8-12%', 'Kaffe',
+            'Æbler', 'Smør', 'Kyllingebryst', 'Havregryn', 'Tomater']
+UNITS = ['g', 'kg', 'stk', 'l', 'pk']
+
+
+def make_flyer(lines: int, seed: int = 45) -> str:
+    """Build flyer text with one price and one unit per line."""
+    rng = random.Random(seed)
+    text = ['Bilka Tilbudsavis uge 45', 'Gyldig fra 1. november 2024 til 7. november 2024']
+    for index in range(lines):
+        text.append(f"{rng.choice(PRODUCTS)} {rng.randint(1, 999)} {rng.choice(UNITS)} "
+                    f"{rng.randint(1, 99)},{rng.randint(10, 99)} kr")
+        if index % 10 == 0:
+            text.append('Spar op til 30% - kun så længe lager haves. Pr. kg max 89,95')
+    return '\n'.join(text)
+
+
+def nearest_unit_linear(units, position, window):
+    """Previous approach: measure the distance to every unit."""
+    unit = None
+    min_distance = float('inf')
+    for unit_info in units:
+        distance = abs(unit_info['position'] - position)
+        if distance < min_distance and distance < window:
+            min_distance = distance
+            unit = unit_info['unit']
+    return unit
+
+
+def timed(function, *args):
+    """Run a function once and return (result, seconds)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Benchmark offer extraction')
+    parser.add_argument('--lines', type=int, default=5000, help='Offer lines in the flyer')
+    parser.add_argument('--documents', type=int, default=0, help='Flyers for the batch benchmark')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for the batch benchmark')
+    args = parser.parse_args()
+    
+    text = make_flyer(args.lines)
+    extractor = OfferExtractor()
+    window = extractor.UNIT_WINDOW
+    prices = extractor.extract_prices(text)
+    units = extractor.extract_units(text)
+    unit_positions = [unit_info['position'] for unit_info in units]
+    print(f"Flyer: {len(text)} characters, {len(prices)} prices, {len(units)} units")
+    
+    linear, linear_seconds = timed(
+        lambda: [nearest_unit_linear(units, price['position'], window) for price in prices])
+    indexed, indexed_seconds = timed(
+        lambda: [nearest_unit(units, unit_positions, price['position'], window) for price in prices])
+    assert linear == indexed, 'indexed lookup disagrees with linear scan'
+    
+    print(f"Nearest unit, linear scan:    {linear_seconds * 1000:9.1f} ms")
+    print(f"Nearest unit, bisected index: {indexed_seconds * 1000:9.1f} ms "
+          f"({linear_seconds / indexed_seconds:.0f}x faster)")
+    
+    offers, seconds = timed(extractor.extract_offers_from_text, text, 'Bilka')
+    print(f"extract_offers_from_text:     {seconds * 1000:9.1f} ms for {len(offers)} offers")
+    
+    if args.documents:
+        documents = [(make_flyer(args.lines, seed=index), 'Bilka') for index in range(args.documents)]
+        stats = ExtractionStats()
+        for _ in extract_offers_many(documents, workers=args.workers, stats=stats):
+            pass
+        print(f"extract_offers_many:          {stats.documents_per_second:9.1f} documents/s "
+              f"({stats.documents} documents, {stats.offers} offers, workers={args.workers or 1})")
+
+
+if __name__ == '__main__':
+    main()
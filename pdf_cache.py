@@ -0,0 +1,55 @@
+"""Script to inspect and purge the extracted PDF text cache."""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.pdf_processor.extractor import get_default_cache
+
+
+def show_stats(cache):
+    """Print a summary of the cache."""
+    entries = cache.entries()
+    total = sum(entry.size for entry in entries)
+    print(f"Cache directory: {cache.cache_dir}")
+    print(f"Extractor version: {cache.version}")
+    print(f"Entries: {len(entries)}")
+    print(f"Size: {total / 1024 / 1024:.2f} MB of {cache.max_bytes / 1024 / 1024:.0f} MB")
+
+
+def list_entries(cache):
+    """Print one line per cache entry, most recently used first."""
+    for entry in reversed(cache.entries()):
+        last_used = datetime.fromtimestamp(entry.last_used).strftime('%Y-%m-%d %H:%M')
+        print(f"{entry.key[:16]}  {last_used}  {entry.pages:4d} pages  "
+              f"{entry.size / 1024:8.1f} KB  {entry.source or '-'}")
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Inspect and purge the PDF text cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='Show cache size and entry count')
+    subparsers.add_parser('list', help='List cached extractions')
+    purge_parser = subparsers.add_parser('purge', help='Remove cached extractions')
+    purge_parser.add_argument('--older-than', type=float, default=None, metavar='DAYS',
+                              help='Only remove entries not used for this many days')
+    
+    args = parser.parse_args()
+    cache = get_default_cache()
+    
+    if args.command == 'stats':
+        show_stats(cache)
+    elif args.command == 'list':
+        list_entries(cache)
+    elif args.command == 'purge':
+        removed = cache.purge(older_than_days=args.older_than)
+        print(f"Removed {removed} cache entries")
+
+
+if __name__ == '__main__':
+    main()
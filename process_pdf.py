@@ -3,23 +3,56 @@
 import sys
 import os
 import argparse
+import time
 
-# Add src directory to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from pdf_processor import extract_pdf_text
-from nlp_processor import extract_offers
-from database import db, Market, Offer, init_db
-from web_interface.app import create_app
+from src.pdf_processor import ExtractionReport, extract_pdf_pages, iter_pdf_pages
+from src.pdf_processor.extractor import ENGINES, summarize_page_stats
+from src.nlp_processor import iter_offer_batches
+from src.database import (db, MarketEntry, SaveStats, archive_expired_offers,
+                          get_market_registry, save_offers)
+from src.ingestion import discover_jobs, read_manifest, run_batch
+from src.web_interface.app import create_app
 
 
-def process_pdf_file(pdf_path: str, market_name: str):
+def get_or_create_market(market_name: str) -> MarketEntry:
+    """
+    Look up a market by name, creating it if it does not exist yet.
+    
+    Args:
+        market_name: Name of the market
+        
+    Returns:
+        MarketEntry of the market
+    """
+    registry = get_market_registry()
+    if registry.get(market_name) is None:
+        print(f"Creating new market: {market_name}")
+    return registry.get_or_create(market_name)
+
+
+def report_archived(count: int):
+    """Print how many expired offers were moved to the archive."""
+    if count:
+        print(f"Archived {count} expired offers")
+
+
+def process_pdf_file(pdf_path: str, market_name: str, workers=None, use_cache=True,
+                     engines=ENGINES):
     """
     Process a PDF file and extract offers.
     
     Args:
         pdf_path: Path to the PDF file
         market_name: Name of the market (e.g., 'Bilka', 'Rema 1000')
+        workers: Number of worker processes for PDF page extraction
+        use_cache: Whether to reuse previously extracted text for this file
+        engines: Extraction engines in the order each page tries them
+        
+    Returns:
+        True if every page was read and the offers were saved
     """
     # Create Flask app for database access
     app = create_app()
@@ -28,55 +61,161 @@ def process_pdf_file(pdf_path: str, market_name: str):
         print(f"Processing PDF: {pdf_path}")
         print(f"Market: {market_name}")
         
-        # Extract text from PDF
-        print("Extracting text from PDF...")
-        text = extract_pdf_text(pdf_path)
+        # Get or create market
+        market = get_or_create_market(market_name)
         
-        if not text:
-            print("Error: Could not extract text from PDF")
-            return
+        # Pages are streamed into the NLP step as they are extracted, unless
+        # extraction is split across worker processes
+        print("Extracting offers from PDF...")
+        page_stats = []
+        report = ExtractionReport()
+        if workers and workers > 1:
+            pages = extract_pdf_pages(pdf_path, workers=workers, use_cache=use_cache,
+                                      engines=engines, page_stats=page_stats, report=report)
+        else:
+            pages = iter_pdf_pages(pdf_path, use_cache=use_cache, engines=engines,
+                                   page_stats=page_stats, report=report)
         
-        print(f"Extracted {len(text)} characters of text")
+        # Save offers to database page by page
+        page_count = 0
+        char_count = 0
+        save_stats = SaveStats()
         
-        # Extract offers from text
-        print("Extracting offers from text...")
-        offers_data = extract_offers(text, market_name)
-        print(f"Found {len(offers_data)} potential offers")
+        def counted(pages):
+            nonlocal page_count, char_count
+            for page_text in pages:
+                page_count += 1
+                char_count += len(page_text)
+                yield page_text
         
-        # Get or create market
-        market = Market.query.filter_by(name=market_name).first()
-        if not market:
-            print(f"Creating new market: {market_name}")
-            market = Market(name=market_name)
-            db.session.add(market)
-            db.session.commit()
+        for page_offers in iter_offer_batches(counted(pages), market_name):
+            save_offers(market, page_offers, commit=False, stats=save_stats)
         
-        # Save offers to database
-        print("Saving offers to database...")
-        saved_count = 0
-        for offer_data in offers_data:
-            offer = Offer(
-                market_id=market.id,
-                product_name=offer_data['product_name'],
-                price=offer_data['price'],
-                unit=offer_data.get('unit'),
-                valid_from=offer_data.get('valid_from'),
-                valid_to=offer_data.get('valid_to')
-            )
-            db.session.add(offer)
-            saved_count += 1
+        if not char_count:
+            db.session.rollback()
+            print("Error: Could not extract text from PDF")
+            return False
         
         db.session.commit()
-        print(f"Successfully saved {saved_count} offers to database")
+        if report.partial:
+            # The offers that were read are kept; run again once the file is fixed
+            print("Warning: some pages could not be read; their offers are missing")
+        print(f"Extracted {char_count} characters of text from {page_count} pages")
+        for engine, summary in summarize_page_stats(page_stats).items():
+            print(f"  {engine}: {summary['pages']} pages in {summary['seconds']:.2f}s")
+        print(f"Successfully saved {save_stats.rows} offers to database "
+              f"({save_stats.rows_per_second:.0f} rows/s): {save_stats.inserted} inserted, "
+              f"{save_stats.updated} updated, {save_stats.skipped} unchanged")
+        report_archived(archive_expired_offers())
+        return not report.partial
+
+
+def process_batch(jobs, workers=None, use_cache=True, engines=ENGINES):
+    """
+    Process many PDF files in a process pool with a single database writer.
+    
+    Args:
+        jobs: List of BatchJob objects
+        workers: Number of worker processes (default: one per CPU)
+        use_cache: Whether to reuse previously extracted text
+        engines: Extraction engines in the order each page tries them
+        
+    Returns:
+        True if every file was read completely and saved
+    """
+    app = create_app()
+    
+    with app.app_context():
+        print(f"Processing {len(jobs)} PDF files...")
+        start = time.perf_counter()
+        save_stats = SaveStats()
+        
+        def save(result):
+            market = get_or_create_market(result.market_name)
+            save_offers(market, result.offers, stats=save_stats)
+        
+        results = run_batch(jobs, save, workers=workers, use_cache=use_cache, engines=engines)
+        elapsed = time.perf_counter() - start
+        
+        total_pages = 0
+        total_offers = 0
+        failed = 0
+        partial = 0
+        for result in sorted(results, key=lambda result: result.pdf_path):
+            name = os.path.basename(result.pdf_path)
+            if result.error:
+                failed += 1
+                print(f"  {name} ({result.market_name}): FAILED - {result.error}")
+                continue
+            total_pages += result.pages
+            total_offers += len(result.offers)
+            pages_per_second = result.pages / result.seconds if result.seconds else 0.0
+            print(f"  {name} ({result.market_name}): {result.pages} pages, "
+                  f"{len(result.offers)} offers in {result.seconds:.2f}s "
+                  f"({pages_per_second:.1f} pages/s)")
+            if result.partial:
+                partial += 1
+                print(f"  {name}: Warning: some pages could not be read; their offers are missing")
+        
+        print(f"Processed {len(results) - failed} of {len(results)} files in {elapsed:.2f}s: "
+              f"{total_pages} pages, {total_offers} offers")
+        if elapsed > 0:
+            print(f"Throughput: {len(results) / elapsed:.2f} files/s, "
+                  f"{total_pages / elapsed:.1f} pages/s, {total_offers / elapsed:.1f} offers/s")
+        print(f"Database: {save_stats.rows} rows in {save_stats.seconds:.2f}s "
+              f"({save_stats.rows_per_second:.0f} rows/s): {save_stats.inserted} inserted, "
+              f"{save_stats.updated} updated, {save_stats.skipped} unchanged")
+        report_archived(archive_expired_offers())
+        if partial:
+            print(f"Warning: {partial} files were only partly read")
+        return failed == 0 and not partial
+
+
+def collect_jobs(args):
+    """Build the batch job list from --dir or --manifest arguments."""
+    if args.manifest:
+        return read_manifest(args.manifest)
+    
+    app = create_app()
+    with app.app_context():
+        market_names = get_market_registry().names()
+    return list(discover_jobs(args.dir, market_names, market_name=args.market))
 
 
 def main():
     """Main function."""
     parser = argparse.ArgumentParser(description='Process PDF files and extract offers')
-    parser.add_argument('pdf_path', help='Path to the PDF file')
-    parser.add_argument('market_name', help='Name of the market (e.g., Bilka, Rema 1000)')
+    parser.add_argument('pdf_path', nargs='?', help='Path to the PDF file')
+    parser.add_argument('market_name', nargs='?', help='Name of the market (e.g., Bilka, Rema 1000)')
+    parser.add_argument('--dir', help='Process every PDF in this directory')
+    parser.add_argument('--market', help='Market for every PDF in --dir '
+                                         '(default: taken from each file name)')
+    parser.add_argument('--manifest', help='CSV file of pdf_path,market_name rows to process')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes: PDF pages for a single file, '
+                             'whole files in batch mode')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse the PDF even if its text is already cached')
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help='Comma-separated extraction engines in the order each page '
+                             'tries them (default: %(default)s)')
     
     args = parser.parse_args()
+    engines = args.engines.split(',')
+    
+    if args.dir or args.manifest:
+        try:
+            jobs = collect_jobs(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if not process_batch(jobs, workers=args.workers, use_cache=not args.no_cache,
+                             engines=engines):
+            sys.exit(1)
+        return
+    
+    if not args.pdf_path or not args.market_name:
+        parser.error('pdf_path and market_name are required unless --dir or --manifest is given')
     
     # Check if PDF file exists
     if not os.path.exists(args.pdf_path):
@@ -85,12 +224,15 @@ def main():
     
     # Process the PDF
     try:
-        process_pdf_file(args.pdf_path, args.market_name)
+        complete = process_pdf_file(args.pdf_path, args.market_name, workers=args.workers,
+                                    use_cache=not args.no_cache, engines=engines)
     except Exception as e:
         print(f"Error processing PDF: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    if not complete:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
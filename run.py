@@ -6,7 +6,7 @@ import os
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from web_interface.app import app
+from web_interface.app import app, warm_suggestion_index
 
 if __name__ == '__main__':
     print("Starting TilbudsFinder application...")
@@ -14,4 +14,5 @@ if __name__ == '__main__':
     # Debug mode should only be enabled in development
     # Set FLASK_DEBUG=1 environment variable to enable debug mode
     debug_mode = os.environ.get('FLASK_DEBUG', '0') == '1'
+    warm_suggestion_index(app)
     app.run(debug=debug_mode, host='0.0.0.0', port=5000)
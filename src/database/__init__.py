@@ -1,5 +1,19 @@
 """Database initialization and configuration."""
 
-from .models import db, Market, Offer, init_db
+from .models import db, Market, Offer, OfferArchive, init_db
+from .archive import archive_expired_offers
+from .config import configure_database
+from .ingest import SaveStats, save_offers
+from .markets import MarketEntry, MarketRegistry, get_market_registry
+from .queries import (MAX_PER_PAGE, count_rows, decode_cursor, encode_cursor, iter_row_batches,
+                      keyset_page, offer_history_query, offer_row_to_dict, offers_query,
+                      paginate_rows)
+from .search import product_search_filter
+from .suggest import SuggestionIndex, get_suggestion_index
 
-__all__ = ['db', 'Market', 'Offer', 'init_db']
+__all__ = ['db', 'Market', 'Offer', 'OfferArchive', 'init_db', 'archive_expired_offers',
+           'configure_database', 'SaveStats', 'save_offers', 'MarketEntry', 'MarketRegistry',
+           'get_market_registry', 'MAX_PER_PAGE', 'count_rows', 'decode_cursor', 'encode_cursor',
+           'iter_row_batches', 'keyset_page', 'offer_history_query', 'offer_row_to_dict',
+           'offers_query', 'paginate_rows', 'product_search_filter', 'SuggestionIndex',
+           'get_suggestion_index']
@@ -0,0 +1,95 @@
+"""Moving expired offers out of the offers table."""
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, literal, or_, select
+
+from .generation import bump_generation
+from .ingest import dialect_insert
+from .models import db, Offer, OfferArchive
+
+
+# Offers moved per transaction; each batch holds the write lock only briefly
+ARCHIVE_CHUNK_SIZE = 1000
+
+# Offers without an end date stay in the offers table this long after extraction,
+# about the run of one weekly flyer
+UNDATED_RETENTION = timedelta(days=7)
+
+# Columns copied from offers to offers_archive
+_ARCHIVED_COLUMNS = ('market_id', 'product_name', 'price', 'unit', 'valid_from', 'valid_to',
+                     'extracted_at', 'product_key')
+
+
+def expired_filter(today: date):
+    """
+    Build the filter clause for offers that no longer belong in the offers table.
+    
+    Args:
+        today: First day on which an offer still counts as current
+        
+    Returns:
+        SQLAlchemy clause matching offers that ended before today, or that
+        have no end date and were extracted more than UNDATED_RETENTION ago
+    """
+    cutoff = datetime.combine(today, time()) - UNDATED_RETENTION
+    return or_(Offer.valid_to < today,
+               and_(Offer.valid_to.is_(None), Offer.extracted_at < cutoff))
+
+
+def _archive_statement(offer_ids, archived_at: datetime):
+    """Build the INSERT ... SELECT that copies offers to the archive."""
+    offers = Offer.__table__
+    archive = OfferArchive.__table__
+    rows = select(offers.c.id, *(offers.c[name] for name in _ARCHIVED_COLUMNS),
+                  literal(archived_at, archive.c.archived_at.type)
+                  ).where(offers.c.id.in_(offer_ids))
+    
+    insert = dialect_insert(db.session.get_bind().dialect.name)
+    if insert is None:
+        return archive.insert().from_select(['offer_id', *_ARCHIVED_COLUMNS, 'archived_at'], rows)
+    # An offer re-ingested after it was archived is already in the archive
+    return (insert(archive)
+            .from_select(['offer_id', *_ARCHIVED_COLUMNS, 'archived_at'], rows)
+            .on_conflict_do_nothing())
+
+
+def archive_expired_offers(today: Optional[date] = None,
+                           chunk_size: int = ARCHIVE_CHUNK_SIZE) -> int:
+    """
+    Move expired offers from the offers table to offers_archive.
+    
+    Offers are moved in batches of ``chunk_size``, each copied and deleted
+    in its own transaction, so /api/offers keeps reading the offers table
+    while a large backlog is archived. Deleting an offer also removes it
+    from the search index. Pending changes in the session are committed
+    with the first batch.
+    
+    Args:
+        today: Offers that ended before this date are moved (default: today)
+        chunk_size: Offers moved per transaction
+        
+    Returns:
+        Number of offers moved
+    """
+    if today is None:
+        today = date.today()
+    expired = select(Offer.id).where(expired_filter(today)).limit(chunk_size)
+    archived_at = datetime.utcnow()
+    
+    moved = 0
+    while True:
+        offer_ids = db.session.execute(expired).scalars().all()
+        if not offer_ids:
+            break
+        try:
+            db.session.execute(_archive_statement(offer_ids, archived_at))
+            db.session.execute(delete(Offer.__table__).where(Offer.__table__.c.id.in_(offer_ids)))
+            bump_generation()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        moved += len(offer_ids)
+    return moved
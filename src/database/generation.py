@@ -0,0 +1,36 @@
+"""Data generation counter for invalidating caches across processes."""
+
+from sqlalchemy import select, update
+
+from .models import db, DataGeneration
+
+
+# Primary key of the single row of the data_generation table
+GENERATION_ID = 1
+
+
+def current_generation() -> int:
+    """
+    Read the data generation.
+    
+    Returns:
+        Generation number; it only grows, and changes whenever offers or
+        markets were written
+    """
+    generation = db.session.execute(
+        select(DataGeneration.generation).where(DataGeneration.id == GENERATION_ID)
+    ).scalar()
+    return generation or 0
+
+
+def bump_generation():
+    """
+    Increment the data generation in the session's current transaction.
+    
+    The new generation becomes visible with the commit of the data it
+    describes, and disappears with it on rollback, so a cache keyed on the
+    generation never serves data from before a committed write.
+    """
+    db.session.execute(update(DataGeneration)
+                       .where(DataGeneration.id == GENERATION_ID)
+                       .values(generation=DataGeneration.generation + 1))
@@ -0,0 +1,252 @@
+"""Saving extracted offers to the database."""
+
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, or_, select
+
+from .generation import bump_generation
+from .models import db, Market, Offer, OFFER_NATURAL_KEY, normalize_product_name
+
+
+# Rows per executemany call; large enough to amortise the round trip,
+# small enough to keep the parameter list in memory cheap
+DEFAULT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class SaveStats:
+    """Outcome and throughput of saving offers."""
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    
+    @property
+    def rows_per_second(self) -> float:
+        """Rows written per second."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def offer_rows(market: Market, offers: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Turn extracted offers into parameter rows for the offers table.
+    
+    An OfferBatch (anything with ``iter_columns()``) is read column by
+    column, without building a row view or dictionary per offer; any
+    other iterable is read as offer dictionaries.
+    
+    Args:
+        market: Market or MarketEntry the offers belong to
+        offers: OfferBatch or iterable of offer dictionaries
+        
+    Yields:
+        Dictionary of column values for each offer
+    """
+    if hasattr(offers, 'iter_columns'):
+        records = ((product_name, price, unit, valid_from, valid_to)
+                   for _, product_name, price, unit, valid_from, valid_to in offers.iter_columns())
+    else:
+        records = ((offer['product_name'], offer['price'], offer.get('unit'),
+                    offer.get('valid_from'), offer.get('valid_to')) for offer in offers)
+    
+    market_id = market.id
+    extracted_at = datetime.utcnow()
+    for product_name, price, unit, valid_from, valid_to in records:
+        yield {
+            'market_id': market_id,
+            'product_name': product_name,
+            'price': price,
+            'unit': unit,
+            'valid_from': valid_from,
+            'valid_to': valid_to,
+            'extracted_at': extracted_at
+        }
+
+
+def _day(value) -> Optional[date]:
+    """Reduce a validity date or datetime to the day the Date column stores."""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _distinct_rows(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Drop rows of a chunk that repeat the natural key of a later row.
+    
+    A flyer can print the same offer twice. One statement must not write
+    a row twice: PostgreSQL rejects it in ON CONFLICT DO UPDATE, and on
+    SQLite the second copy would be counted as an unchanged offer.
+    
+    Args:
+        chunk: Parameter rows from offer_rows()
+        
+    Returns:
+        One row per natural key, the last one seen, in order of first
+        appearance
+    """
+    rows = {(row['market_id'], normalize_product_name(row['product_name']), row['price'],
+             _day(row['valid_from']), _day(row['valid_to'])): row
+            for row in chunk}
+    return list(rows.values())
+
+
+def dialect_insert(dialect_name: str):
+    """
+    Get the insert() construct that supports ON CONFLICT for a dialect.
+    
+    Args:
+        dialect_name: Name of the database dialect
+        
+    Returns:
+        The dialect's insert function, or None if it has no ON CONFLICT clause
+    """
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+
+def upsert_statement(dialect_name: str):
+    """
+    Build the INSERT ... ON CONFLICT statement for the offers table.
+    
+    An offer whose natural key (market, product key, price, validity)
+    already exists only updates the display name, unit and extraction
+    time, and only if the name or unit changed, so re-ingesting an
+    unchanged flyer writes nothing.
+    
+    Args:
+        dialect_name: Name of the database dialect
+        
+    Returns:
+        Insert statement, or None if the dialect has no ON CONFLICT clause
+    """
+    insert = dialect_insert(dialect_name)
+    if insert is None:
+        return None
+    
+    offers = Offer.__table__
+    statement = insert(offers)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=OFFER_NATURAL_KEY,
+        set_={
+            'product_name': excluded.product_name,
+            'unit': excluded.unit,
+            'extracted_at': excluded.extracted_at
+        },
+        where=or_(offers.c.product_name != excluded.product_name,
+                  offers.c.unit.is_distinct_from(excluded.unit))
+    )
+
+
+def _written_rows(statement, dialect_name: str, chunk) -> Tuple[int, int]:
+    """
+    Run an upsert for one chunk and tell inserted rows from updated ones.
+    
+    RETURNING only yields rows the statement wrote, so conflicts that
+    change nothing are left out. PostgreSQL flags a freshly inserted row
+    with xmax = 0. SQLite gives a new row an id above every id in the
+    table, so rows with an id above the maximum before the chunk are new;
+    the maximum is read from the primary key without scanning the table.
+    
+    Args:
+        statement: Statement from upsert_statement()
+        dialect_name: Name of the database dialect
+        chunk: Parameter rows for the offers table
+        
+    Returns:
+        Tuple of the numbers of rows inserted and updated
+    """
+    offers = Offer.__table__
+    if dialect_name == 'postgresql':
+        flags = db.session.execute(
+            statement.returning(literal_column('xmax') == 0), chunk
+        ).scalars().all()
+        inserted = sum(1 for flag in flags if flag)
+        return inserted, len(flags) - inserted
+    
+    max_id = db.session.execute(select(func.max(offers.c.id))).scalar() or 0
+    offer_ids = db.session.execute(statement.returning(offers.c.id), chunk).scalars().all()
+    inserted = sum(1 for offer_id in offer_ids if offer_id > max_id)
+    return inserted, len(offer_ids) - inserted
+
+
+def save_offers(market: Market, offers: Iterable[Dict[str, Any]],
+                chunk_size: int = DEFAULT_CHUNK_SIZE, commit: bool = True,
+                stats: Optional[SaveStats] = None) -> SaveStats:
+    """
+    Write extracted offers with chunked executemany upserts.
+    
+    The offers are written through the Core table, bypassing the ORM
+    unit of work, in the session's current transaction. Offers already
+    stored from an earlier run are updated or skipped instead of being
+    duplicated (see upsert_statement()); on databases without ON
+    CONFLICT support every offer is inserted. An offer repeated within a
+    chunk is saved and counted once (see _distinct_rows()). If any row was
+    written, the data generation is bumped in the same transaction.
+    
+    With ``commit`` the transaction is committed at the end and rolled
+    back on error; without it the caller decides, e.g. to save a flyer
+    page by page and commit once.
+    
+    Args:
+        market: Market or MarketEntry the offers belong to
+        offers: OfferBatch or iterable of offer dictionaries
+        chunk_size: Rows per executemany call
+        commit: Whether to commit the transaction after the last chunk
+        stats: Optional SaveStats to add this call's counts and time to
+        
+    Returns:
+        SaveStats with the rows written, what happened to them and the
+        time it took
+    """
+    if stats is None:
+        stats = SaveStats()
+    start = time.perf_counter()
+    
+    dialect_name = db.session.get_bind().dialect.name
+    statement = upsert_statement(dialect_name)
+    rows = offer_rows(market, offers)
+    try:
+        if statement is None:
+            statement = Offer.__table__.insert()
+            written = 0
+            for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+                chunk = _distinct_rows(chunk)
+                db.session.execute(statement, chunk)
+                written += len(chunk)
+            stats.rows += written
+            stats.inserted += written
+        else:
+            sent = inserted = updated = 0
+            for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+                chunk = _distinct_rows(chunk)
+                chunk_inserted, chunk_updated = _written_rows(statement, dialect_name, chunk)
+                inserted += chunk_inserted
+                updated += chunk_updated
+                sent += len(chunk)
+            written = inserted + updated
+            stats.rows += sent
+            stats.inserted += inserted
+            stats.updated += updated
+            stats.skipped += sent - written
+        if written:
+            # Caches of offer listings are stale once this commits
+            bump_generation()
+        if commit:
+            db.session.commit()
+    except Exception:
+        if commit:
+            db.session.rollback()
+        raise
+    finally:
+        stats.seconds += time.perf_counter() - start
+    return stats
@@ -0,0 +1,197 @@
+"""In-process cache of the markets table."""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from .generation import bump_generation
+from .models import db, Market
+
+
+# Key in app.extensions holding the app's MarketRegistry
+REGISTRY_KEY = 'market_registry'
+
+# Markets created by another process (e.g. process_pdf.py next to the
+# web server) show up in listings after at most this many seconds
+REGISTRY_TTL = 60.0
+
+# A lookup of an unknown name reloads the table at most this often, so
+# requests for a misspelt market do not query the database each time
+MISS_RELOAD_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class MarketEntry:
+    """A market as cached by the registry."""
+    id: int
+    name: str
+    created_at: Optional[datetime]
+    
+    def to_dict(self):
+        """Convert to dictionary, like Market.to_dict()."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class MarketRegistry:
+    """
+    Cached mapping between market names and ids.
+    
+    The whole markets table, a handful of rows, is loaded on first use and
+    kept in memory. Markets created through get_or_create() are added
+    immediately; markets created elsewhere are picked up when a lookup
+    misses, the cache is older than REGISTRY_TTL or sync() sees a new
+    data generation. All methods need an app context.
+    """
+    
+    def __init__(self, ttl: float = REGISTRY_TTL):
+        """
+        Create an empty registry.
+        
+        Args:
+            ttl: Seconds after which markets() reloads the table
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_name: Dict[str, MarketEntry] = {}
+        self._by_id: Dict[int, MarketEntry] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation: Optional[int] = None
+    
+    def _load(self):
+        """Read the markets table into the cache."""
+        rows = db.session.execute(
+            select(Market.id, Market.name, Market.created_at).order_by(Market.id)
+        ).all()
+        entries = [MarketEntry(*row) for row in rows]
+        with self._lock:
+            # Readers see either the old or the new mapping, never a mix
+            self._by_name = {entry.name: entry for entry in entries}
+            self._by_id = {entry.id: entry for entry in entries}
+            self._loaded_at = time.monotonic()
+    
+    def _age(self) -> float:
+        """Seconds since the table was last loaded; infinite if never."""
+        if self._loaded_at is None:
+            return float('inf')
+        return time.monotonic() - self._loaded_at
+    
+    def invalidate(self):
+        """Drop the cache so the next call reloads the table."""
+        with self._lock:
+            self._loaded_at = None
+    
+    def sync(self, generation: int):
+        """
+        Reload on next use if the data generation changed since the last call.
+        
+        Markets created by another process bump the generation, so this
+        picks them up without waiting for the TTL.
+        
+        Args:
+            generation: Current data generation
+        """
+        if generation != self._generation:
+            self._generation = generation
+            self.invalidate()
+    
+    def get(self, name: str) -> Optional[MarketEntry]:
+        """
+        Look up a market by name.
+        
+        Args:
+            name: Market name
+            
+        Returns:
+            MarketEntry, or None if no market has this name
+        """
+        if self._age() > self.ttl:
+            self._load()
+        entry = self._by_name.get(name)
+        if entry is None and self._age() > MISS_RELOAD_INTERVAL:
+            self._load()
+            entry = self._by_name.get(name)
+        return entry
+    
+    def id_for(self, name: str) -> Optional[int]:
+        """
+        Look up the id of a market by name.
+        
+        Args:
+            name: Market name; empty for none
+            
+        Returns:
+            Market id, or None if the name is empty or unknown
+        """
+        if not name:
+            return None
+        entry = self.get(name)
+        return entry.id if entry else None
+    
+    def markets(self) -> List[MarketEntry]:
+        """
+        List all markets.
+        
+        Returns:
+            MarketEntry for each market, in creation order
+        """
+        if self._age() > self.ttl:
+            self._load()
+        return list(self._by_name.values())
+    
+    def names(self) -> List[str]:
+        """
+        List the names of all markets.
+        
+        Returns:
+            Market names in creation order
+        """
+        return [entry.name for entry in self.markets()]
+    
+    def get_or_create(self, name: str) -> MarketEntry:
+        """
+        Look up a market by name, creating it if it does not exist yet.
+        
+        A new market is committed right away and the cache is reloaded.
+        
+        Args:
+            name: Market name
+            
+        Returns:
+            MarketEntry of the existing or new market
+        """
+        entry = self.get(name)
+        if entry is not None:
+            return entry
+        
+        db.session.add(Market(name=name))
+        bump_generation()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another process created it first
+            db.session.rollback()
+        self._load()
+        return self._by_name[name]
+
+
+def get_market_registry() -> MarketRegistry:
+    """
+    Get the market registry of the current app.
+    
+    Returns:
+        MarketRegistry, created on first use
+    """
+    registry = current_app.extensions.get(REGISTRY_KEY)
+    if registry is None:
+        registry = current_app.extensions[REGISTRY_KEY] = MarketRegistry()
+    return registry
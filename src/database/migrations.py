@@ -0,0 +1,83 @@
+"""In-place upgrades for databases created by earlier versions."""
+
+from itertools import islice
+
+from sqlalchemy import bindparam, delete, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from .models import Offer, OFFER_NATURAL_KEY, normalize_product_name
+
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def _backfill_product_keys(connection: Connection) -> int:
+    """Fill product_key for offers saved before the column existed."""
+    offers = Offer.__table__
+    rows = connection.execute(
+        select(offers.c.id, offers.c.product_name).where(offers.c.product_key.is_(None))
+    ).all()
+    statement = (offers.update()
+                 .where(offers.c.id == bindparam('offer_id'))
+                 .values(product_key=bindparam('key')))
+    
+    params = ({'offer_id': offer_id, 'key': normalize_product_name(name)} for offer_id, name in rows)
+    while True:
+        chunk = list(islice(params, BACKFILL_CHUNK_SIZE))
+        if not chunk:
+            break
+        connection.execute(statement, chunk)
+    return len(rows)
+
+
+def _has_index(connection: Connection, name: str) -> bool:
+    """Check whether an index on the offers table exists."""
+    if connection.dialect.name == 'sqlite':
+        # The SQLite inspector skips expression indexes such as the natural key
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"),
+            {'name': name}
+        ).first() is not None
+    return inspect(connection).has_index('offers', name)
+
+
+def remove_duplicate_offers(connection: Connection) -> int:
+    """
+    Delete offers that repeat the natural key of an older offer.
+    
+    Args:
+        connection: Connection inside a transaction
+        
+    Returns:
+        Number of offers deleted
+    """
+    offers = Offer.__table__
+    keep = select(func.min(offers.c.id)).group_by(*OFFER_NATURAL_KEY)
+    return connection.execute(delete(offers).where(offers.c.id.not_in(keep))).rowcount
+
+
+def upgrade_schema(engine: Engine):
+    """
+    Bring the offers table of an existing database up to date.
+    
+    Adds columns and indexes that create_all() skips for existing tables.
+    Before the natural-key unique index is created, product keys are
+    filled in and duplicate offers from repeated ingests are removed.
+    
+    Args:
+        engine: Engine of the application database
+    """
+    with engine.begin() as connection:
+        columns = {column['name'] for column in inspect(connection).get_columns('offers')}
+        if 'product_key' not in columns:
+            connection.execute(text('ALTER TABLE offers ADD COLUMN product_key VARCHAR(255)'))
+            _backfill_product_keys(connection)
+        
+        if not _has_index(connection, 'uq_offers_natural_key'):
+            removed = remove_duplicate_offers(connection)
+            if removed:
+                print(f"Removed {removed} duplicate offers before adding the natural key")
+        
+        for index in Offer.__table__.indexes:
+            if not _has_index(connection, index.name):
+                index.create(connection)
@@ -5,6 +5,28 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# Stands in for a missing validity date in the natural key, as NULLs
+# never collide in a unique index
+NO_DATE = db.literal_column("'0001-01-01'")
+
+
+def normalize_product_name(name: str) -> str:
+    """
+    Normalize a product name for the natural key of an offer.
+    
+    Args:
+        name: Product name as extracted
+        
+    Returns:
+        Case-folded name with runs of whitespace collapsed
+    """
+    return ' '.join(name.split()).casefold()
+
+
+def _product_key_default(context) -> str:
+    """Derive product_key from product_name when an offer is inserted."""
+    return normalize_product_name(context.get_current_parameters()['product_name'])
+
 
 class Market(db.Model):
     """Represents a supermarket chain."""
@@ -32,6 +54,15 @@ class Market(db.Model):
 class Offer(db.Model):
     """Represents a product offer from a market."""
     __tablename__ = 'offers'
+    __table_args__ = (
+        # Market filter with price sort, price sort alone, expiry checks
+        db.Index('ix_offers_market_id_price', 'market_id', 'price'),
+        db.Index('ix_offers_price', 'price'),
+        db.Index('ix_offers_valid_to', 'valid_to'),
+        # Ids of deleted offers are never handed out again, so readers such
+        # as the suggestion index can tell new offers by id
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     market_id = db.Column(db.Integer, db.ForeignKey('markets.id'), nullable=False)
@@ -41,6 +72,7 @@ class Offer(db.Model):
     valid_from = db.Column(db.Date)
     valid_to = db.Column(db.Date)
     extracted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    product_key = db.Column(db.String(255), default=_product_key_default)
     
     def __repr__(self):
         return f'<Offer {self.product_name} - {self.price}>'
@@ -59,15 +91,91 @@ class Offer(db.Model):
         }
 
 
+class OfferArchive(db.Model):
+    """An expired offer moved out of the offers table."""
+    __tablename__ = 'offers_archive'
+    __table_args__ = (
+        db.Index('ix_offers_archive_market_id_price', 'market_id', 'price'),
+        db.Index('ix_offers_archive_price', 'price'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    offer_id = db.Column(db.Integer)  # id the offer had in the offers table
+    market_id = db.Column(db.Integer, db.ForeignKey('markets.id'), nullable=False)
+    product_name = db.Column(db.String(255), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(50))
+    valid_from = db.Column(db.Date)
+    valid_to = db.Column(db.Date)
+    extracted_at = db.Column(db.DateTime)
+    product_key = db.Column(db.String(255))
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<OfferArchive {self.product_name} - {self.price}>'
+
+
+class DataGeneration(db.Model):
+    """Single-row counter bumped by every write that changes offers or markets."""
+    __tablename__ = 'data_generation'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+
+def natural_key(model) -> tuple:
+    """
+    Get the columns that identify the same offer seen in a later run of a flyer.
+    
+    Args:
+        model: Offer or OfferArchive
+        
+    Returns:
+        Tuple of column expressions
+    """
+    return (
+        model.market_id,
+        model.product_key,
+        model.price,
+        db.func.coalesce(model.valid_from, NO_DATE),
+        db.func.coalesce(model.valid_to, NO_DATE),
+    )
+
+
+OFFER_NATURAL_KEY = natural_key(Offer)
+db.Index('uq_offers_natural_key', *OFFER_NATURAL_KEY, unique=True)
+
+# An offer is archived once, however often its flyer is ingested again
+ARCHIVE_NATURAL_KEY = natural_key(OfferArchive)
+db.Index('uq_offers_archive_natural_key', *ARCHIVE_NATURAL_KEY, unique=True)
+
+
 def init_db(app):
     """Initialize the database."""
+    from .config import DEFAULT_PROFILE, install_pragmas
+    from .generation import GENERATION_ID
+    from .markets import REGISTRY_KEY, MarketRegistry
+    from .migrations import upgrade_schema
+    from .search import EXTENSION_KEY, ensure_search_index
+    from .suggest import SUGGEST_INDEX_KEY, SuggestionIndex
+    
     db.init_app(app)
     with app.app_context():
+        install_pragmas(db.engine, app.config.get('DATABASE_PROFILE', DEFAULT_PROFILE))
         db.create_all()
+        upgrade_schema(db.engine)
+        app.extensions[EXTENSION_KEY] = ensure_search_index(db.engine)
         # Add default markets if they don't exist
         default_markets = ['Bilka', 'Rema 1000', 'Netto', 'Føtex', 'Lidl']
+        existing = set(db.session.execute(
+            db.select(Market.name).where(Market.name.in_(default_markets))
+        ).scalars())
         for market_name in default_markets:
-            if not Market.query.filter_by(name=market_name).first():
+            if market_name not in existing:
                 market = Market(name=market_name)
                 db.session.add(market)
+        if db.session.get(DataGeneration, GENERATION_ID) is None:
+            db.session.add(DataGeneration(id=GENERATION_ID, generation=0))
         db.session.commit()
+        app.extensions[REGISTRY_KEY] = MarketRegistry()
+        app.extensions[SUGGEST_INDEX_KEY] = SuggestionIndex()
@@ -0,0 +1,259 @@
+"""Queries behind the offer API endpoints."""
+
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import false, func, or_, select, true, tuple_, union_all
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import Select
+
+from .models import db, Market, Offer, OfferArchive
+from .markets import get_market_registry
+from .search import product_search_filter
+
+
+# Largest page /api/offers returns, whatever per_page asks for
+MAX_PER_PAGE = 100
+
+# Rows fetched from the database cursor at a time when streaming a listing
+EXPORT_BATCH_SIZE = 1000
+
+
+def _market_id(market_name: str) -> Optional[int]:
+    """Look up the id of a market by name; None if empty or unknown."""
+    return get_market_registry().id_for(market_name)
+
+
+def _offer_select(model, search_filter, market_id: Optional[int], archived: bool) -> Select:
+    """
+    Project offers or archived offers onto the columns of offer_row_to_dict().
+    
+    The market name is joined in, so a page of offers is read in one
+    statement instead of one lazy load of Offer.market per offer.
+    """
+    statement = (select(model.id, Market.name.label('market'), model.product_name, model.price,
+                        model.unit, model.valid_from, model.valid_to, model.extracted_at,
+                        (true() if archived else false()).label('archived'))
+                 .join(Market, Market.id == model.market_id))
+    if search_filter is not None:
+        statement = statement.where(search_filter)
+    if market_id is not None:
+        statement = statement.where(model.market_id == market_id)
+    return statement
+
+
+def _sorted(statement: Select, key_columns: Sequence, sort_order: str,
+            after: Optional[Sequence] = None) -> Select:
+    """
+    Sort a listing on its key columns, by price first.
+    
+    With ``after``, only rows that sort after that key are kept, which
+    lets the database seek into the price index instead of skipping
+    rows with OFFSET.
+    """
+    descending = sort_order == 'price_desc'
+    if after is not None:
+        key = tuple_(*key_columns)
+        statement = statement.where(key < tuple_(*after) if descending else key > tuple_(*after))
+    return statement.order_by(*(column.desc() if descending else column.asc()
+                                for column in key_columns))
+
+
+def offers_query(search_term: str = '', market_name: str = '',
+                 sort_order: str = 'price_asc', after: Optional[Dict[str, Any]] = None,
+                 today: Optional[date] = None) -> Select:
+    """
+    Build the offer listing query used by /api/offers.
+    
+    Offers that ended before today are left out even while they wait in
+    the offers table for archive_expired_offers().
+    
+    Args:
+        search_term: Search term for product names; empty for no search
+        market_name: Only offers from this market; empty or unknown for all
+        sort_order: 'price_desc' for the most expensive first, anything
+                    else for the cheapest first
+        after: Key from decode_cursor(); only offers after it are listed
+        today: First day on which an offer still counts as current
+               (default: today)
+        
+    Returns:
+        Select of offer rows, filtered and sorted by price and id, ready
+        for paginate_rows() or keyset_page()
+    """
+    if today is None:
+        today = date.today()
+    search_filter = product_search_filter(search_term) if search_term else None
+    statement = (_offer_select(Offer, search_filter, _market_id(market_name), archived=False)
+                 .where(or_(Offer.valid_to.is_(None), Offer.valid_to >= today)))
+    return _sorted(statement, (Offer.price, Offer.id), sort_order,
+                   None if after is None else (after['price'], after['id']))
+
+
+def offer_history_query(search_term: str = '', market_name: str = '',
+                        sort_order: str = 'price_asc',
+                        after: Optional[Dict[str, Any]] = None) -> Select:
+    """
+    Build the offer listing query over current and archived offers.
+    
+    Takes the same arguments as offers_query(). Archived offers are not
+    in the full-text index and are searched with ILIKE. An offer and an
+    archived offer can share an id, so rows are sorted by the archived
+    flag between price and id.
+    
+    Returns:
+        Select of offer rows from both tables, filtered and sorted
+    """
+    market_id = _market_id(market_name)
+    current = _offer_select(Offer, product_search_filter(search_term) if search_term else None,
+                            market_id, archived=False)
+    archived = _offer_select(OfferArchive,
+                             OfferArchive.product_name.ilike(f'%{search_term}%')
+                             if search_term else None,
+                             market_id, archived=True)
+    offers = union_all(current, archived).subquery()
+    return _sorted(select(offers), (offers.c.price, offers.c.archived, offers.c.id), sort_order,
+                   None if after is None else (after['price'], after['archived'], after['id']))
+
+
+def encode_cursor(row: Row) -> str:
+    """
+    Build the opaque cursor that continues a listing after a row.
+    
+    Args:
+        row: Last row of offers_query() or offer_history_query() on a page
+        
+    Returns:
+        URL-safe cursor string
+    """
+    key = {'price': row.price, 'archived': bool(row.archived), 'id': row.id}
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Read the key of a cursor from encode_cursor().
+    
+    Args:
+        cursor: Cursor string from a previous response
+        
+    Returns:
+        Dictionary with the price, archived flag and id of the last row
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if (not isinstance(key, dict)
+            or not isinstance(key.get('price'), (int, float)) or isinstance(key['price'], bool)
+            or not isinstance(key.get('archived'), bool)
+            or not isinstance(key.get('id'), int) or isinstance(key['id'], bool)):
+        raise ValueError('Invalid cursor')
+    return key
+
+
+def keyset_page(statement: Select, per_page: int) -> Tuple[List[Row], Optional[str]]:
+    """
+    Run one page of a listing and build the cursor for the next page.
+    
+    Args:
+        statement: Listing from offers_query() or offer_history_query(),
+                   built with the key of the previous page's cursor
+        per_page: Rows per page
+        
+    Returns:
+        Tuple of the rows on the page and the cursor for the next page,
+        or None if this is the last page
+    """
+    per_page = max(per_page, 1)
+    # One row more tells whether there is a next page without counting
+    rows = db.session.execute(statement.limit(per_page + 1)).all()
+    if len(rows) <= per_page:
+        return rows, None
+    return rows[:per_page], encode_cursor(rows[per_page - 1])
+
+
+def iter_row_batches(statement: Select,
+                     batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence[Row]]:
+    """
+    Stream all rows of a listing in batches from a server-side cursor.
+    
+    Only one batch is held in memory at a time, however many rows match.
+    The rows are read in one transaction, so they form a consistent
+    snapshot even while an ingest commits.
+    
+    Args:
+        statement: Listing from offers_query() or offer_history_query()
+        batch_size: Rows fetched from the cursor at a time
+        
+    Yields:
+        Lists of up to batch_size rows in listing order
+    """
+    result = db.session.execute(statement,
+                                execution_options={'yield_per': max(batch_size, 1)})
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def count_rows(statement: Select) -> int:
+    """
+    Count the rows of a listing.
+    
+    Args:
+        statement: Listing from offers_query() or offer_history_query()
+        
+    Returns:
+        Number of rows
+    """
+    return db.session.execute(
+        select(func.count()).select_from(statement.order_by(None).subquery())
+    ).scalar()
+
+
+def paginate_rows(statement: Select, page: int, per_page: int) -> Tuple[List[Row], int]:
+    """
+    Run one page of a Core select and count all its rows.
+    
+    Args:
+        statement: Sorted select
+        page: Page number, starting at 1
+        per_page: Rows per page
+        
+    Returns:
+        Tuple of the rows on the page and the total number of rows
+    """
+    page = max(page, 1)
+    per_page = max(per_page, 1)
+    rows = db.session.execute(statement.limit(per_page).offset((page - 1) * per_page)).all()
+    return rows, count_rows(statement)
+
+
+def offer_row_to_dict(row: Row) -> Dict[str, Any]:
+    """
+    Convert a listing row to the dictionary of Offer.to_dict().
+    
+    Args:
+        row: Row of offers_query() or offer_history_query()
+        
+    Returns:
+        Offer dictionary with an additional ``archived`` flag
+    """
+    return {
+        'id': row.id,
+        'market': row.market,
+        'product_name': row.product_name,
+        'price': row.price,
+        'unit': row.unit,
+        'valid_from': row.valid_from.isoformat() if row.valid_from else None,
+        'valid_to': row.valid_to.isoformat() if row.valid_to else None,
+        'extracted_at': row.extracted_at.isoformat() if row.extracted_at else None,
+        'archived': bool(row.archived)
+    }
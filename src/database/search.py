@@ -0,0 +1,141 @@
+"""Full-text product search backed by an SQLite FTS5 index."""
+
+import re
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from .models import Offer
+
+
+FTS_TABLE = 'offers_fts'
+
+# Key in app.extensions telling whether the FTS index is available
+EXTENSION_KEY = 'offers_fts'
+
+# Danish letters that neither case folding nor diacritic removal in the
+# unicode61 tokenizer spell out the way Danes type them without the
+# letter, e.g. "blaabaer" for "blåbær"
+DANISH_FOLDING = {
+    'æ': 'ae', 'Æ': 'Ae',
+    'ø': 'oe', 'Ø': 'Oe',
+    'å': 'aa', 'Å': 'Aa',
+}
+
+_FOLD_TABLE = str.maketrans(DANISH_FOLDING)
+
+
+def fold_danish(value: str) -> str:
+    """
+    Spell out æ, ø and å as ae, oe and aa.
+    
+    Args:
+        value: Product name or search term
+        
+    Returns:
+        Folded string
+    """
+    return value.translate(_FOLD_TABLE)
+
+
+def _fold_sql(expression: str) -> str:
+    """Build the SQL expression that applies fold_danish() to a column."""
+    for letter, replacement in DANISH_FOLDING.items():
+        expression = f"replace({expression}, '{letter}', '{replacement}')"
+    return expression
+
+
+def _schema_statements():
+    """Statements that create the FTS table and the triggers that sync it."""
+    return [
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"product_name, tokenize = 'unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON offers BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, product_name) "
+        f"VALUES (new.id, {_fold_sql('new.product_name')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON offers BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF product_name ON offers BEGIN "
+        f"UPDATE {FTS_TABLE} SET product_name = {_fold_sql('new.product_name')} "
+        f"WHERE rowid = new.id; END",
+    ]
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """
+    Create the FTS index and its triggers if they do not exist yet.
+    
+    A new index is filled from the offers already in the table. Nothing
+    happens on databases other than SQLite, or if SQLite was built
+    without FTS5.
+    
+    Args:
+        engine: Engine of the application database
+        
+    Returns:
+        True if the FTS index is available
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+        if exists:
+            return True
+        
+        try:
+            for statement in _schema_statements():
+                connection.execute(text(statement))
+        except OperationalError as e:
+            print(f"Warning: full-text search unavailable, using ILIKE: {e}")
+            return False
+        
+        connection.execute(text(
+            f"INSERT INTO {FTS_TABLE}(rowid, product_name) "
+            f"SELECT id, {_fold_sql('product_name')} FROM offers"
+        ))
+    return True
+
+
+def match_query(search_term: str) -> Optional[str]:
+    """
+    Build an FTS5 MATCH query that finds names with words starting with each term.
+    
+    Args:
+        search_term: Search input from the user
+        
+    Returns:
+        MATCH query string, or None if the term has no searchable words
+    """
+    words = re.findall(r'\w+', fold_danish(search_term))
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def product_search_filter(search_term: str):
+    """
+    Build the filter clause for a product name search.
+    
+    Uses the FTS index with prefix matching when it is available and
+    falls back to a substring ILIKE otherwise.
+    
+    Args:
+        search_term: Search input from the user
+        
+    Returns:
+        SQLAlchemy clause to pass to Query.filter()
+    """
+    query = match_query(search_term)
+    if query is None or not current_app.extensions.get(EXTENSION_KEY):
+        return Offer.product_name.ilike(f'%{search_term}%')
+    
+    fts = table(FTS_TABLE, column('rowid'))
+    matches = select(fts.c.rowid).where(literal_column(FTS_TABLE).op('MATCH')(query))
+    return Offer.id.in_(matches)
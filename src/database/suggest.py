@@ -0,0 +1,231 @@
+"""In-memory prefix index of product names for search suggestions."""
+
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, select, text
+
+from .models import db, Offer
+from .search import fold_danish
+
+
+# Key in app.extensions holding the app's SuggestionIndex
+SUGGEST_INDEX_KEY = 'suggestion_index'
+
+# Suggestions returned when the caller does not ask for a number
+DEFAULT_SUGGESTIONS = 8
+
+# Ranked results kept per index version; a short prefix can match most
+# names, and ranking them all again on every keystroke would be slow
+MEMO_SIZE = 4096
+
+# Sorts after every character, so (prefix + _PREFIX_END,) bounds all terms
+# starting with prefix
+_PREFIX_END = chr(0x10FFFF)
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize_term(value: str) -> str:
+    """
+    Normalize a product name or typed prefix for prefix matching.
+    
+    Matches the FTS search: case and diacritics are ignored, and æ, ø and
+    å may be typed as ae, oe and aa.
+    
+    Args:
+        value: Product name or search input
+        
+    Returns:
+        Lower case words without diacritics, separated by single spaces
+    """
+    folded = fold_danish(value.lower())
+    if not folded.isascii():
+        folded = ''.join(char for char in unicodedata.normalize('NFKD', folded)
+                         if not unicodedata.combining(char))
+    return ' '.join(_WORD.findall(folded))
+
+
+def _word_suffixes(name: str) -> List[str]:
+    """Get the normalized name from the start of each of its words."""
+    normalized = normalize_term(name)
+    return [normalized[match.start():] for match in _WORD.finditer(normalized)]
+
+
+def _ids_never_reused() -> bool:
+    """
+    Check whether the offers table never hands out the id of a deleted offer.
+    
+    SQLite reuses the highest id after it is deleted unless the table was
+    created with AUTOINCREMENT, which databases from before the suggestion
+    index were not. Sequences on other databases never go back.
+    """
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return True
+    schema = db.session.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'offers'")
+    ).scalar()
+    return 'AUTOINCREMENT' in (schema or '').upper()
+
+
+class _Snapshot:
+    """One immutable version of the index; readers use it without locking."""
+    
+    def __init__(self, names: List[str], counts: List[int], key_ids: Dict[str, int],
+                 terms: List[Tuple[str, int]], rows: int, max_id: int):
+        self.names = names
+        self.counts = counts
+        self.key_ids = key_ids
+        self.terms = terms
+        self.rows = rows
+        self.max_id = max_id
+        self.memo: Dict[Tuple[str, int], List[Dict[str, object]]] = {}
+
+
+class SuggestionIndex:
+    """
+    Product names of the current offers, sorted for prefix lookups.
+    
+    Every product (offers with the same product_key) has one entry per
+    word of its normalized name, holding the name from that word on, so
+    "mælk" suggests "Arla letmælk" as well as "Mælk". Suggestions are
+    ranked by the number of current offers of the product.
+    
+    sync() brings the index up to date when the data generation changes.
+    Offers added since the last sync are read by id and merged in. Ids
+    are never reused, so if the number of offers does not match the ones
+    merged in, offers were removed, e.g. archived, and the index is
+    rebuilt. On an older SQLite database that may reuse ids the index is
+    rebuilt on every change. All methods except suggest() need an app
+    context.
+    """
+    
+    def __init__(self):
+        """Create an empty index; it is filled by the first sync()."""
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot([], [], {}, [], 0, 0)
+        self._generation: Optional[int] = None
+        self._incremental: Optional[bool] = None
+    
+    def sync(self, generation: int):
+        """
+        Update the index if the data generation changed since the last call.
+        
+        Args:
+            generation: Current data generation
+        """
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation == self._generation:
+                return
+            if self._incremental is None:
+                self._incremental = _ids_never_reused()
+            rows, max_id = db.session.execute(
+                select(func.count(Offer.id), func.max(Offer.id))
+            ).one()
+            snapshot = self._snapshot
+            if not snapshot.rows or not self._incremental:
+                self._snapshot = self._built()
+            elif rows != snapshot.rows or (max_id or 0) != snapshot.max_id:
+                self._snapshot = self._merged(snapshot, rows) or self._built()
+            self._generation = generation
+    
+    def _built(self) -> _Snapshot:
+        """Build the index from all current offers."""
+        products = db.session.execute(
+            select(Offer.product_key, func.min(Offer.product_name), func.count(Offer.id),
+                   func.max(Offer.id))
+            .group_by(Offer.product_key)
+        ).all()
+        names = [name for _, name, _, _ in products]
+        counts = [count for _, _, count, _ in products]
+        key_ids = {key: index for index, (key, _, _, _) in enumerate(products)}
+        terms = sorted((term, index) for index, name in enumerate(names)
+                       for term in _word_suffixes(name))
+        return _Snapshot(names, counts, key_ids, terms, sum(counts),
+                         max((max_id for *_, max_id in products), default=0))
+    
+    def _merged(self, snapshot: _Snapshot, rows: int) -> Optional[_Snapshot]:
+        """
+        Merge offers added since a snapshot into a copy of it.
+        
+        Returns:
+            New snapshot, or None if offers were also removed and the
+            index must be rebuilt
+        """
+        added = db.session.execute(
+            select(Offer.id, Offer.product_key, Offer.product_name)
+            .where(Offer.id > snapshot.max_id)
+        ).all()
+        if snapshot.rows + len(added) != rows:
+            return None
+        
+        names = list(snapshot.names)
+        counts = list(snapshot.counts)
+        key_ids = dict(snapshot.key_ids)
+        new_terms = []
+        for _, key, name in added:
+            index = key_ids.get(key)
+            if index is None:
+                index = key_ids[key] = len(names)
+                names.append(name)
+                counts.append(0)
+                new_terms.extend((term, index) for term in _word_suffixes(name))
+            counts[index] += 1
+        new_terms.sort()
+        # Two sorted runs; sorting their concatenation merges them in linear time
+        terms = sorted(snapshot.terms + new_terms)
+        max_id = max((offer_id for offer_id, _, _ in added), default=snapshot.max_id)
+        return _Snapshot(names, counts, key_ids, terms, rows, max_id)
+    
+    def suggest(self, prefix: str, limit: int = DEFAULT_SUGGESTIONS) -> List[Dict[str, object]]:
+        """
+        Find the most frequent products with a word starting with a prefix.
+        
+        Args:
+            prefix: Typed search input; later words must follow in order
+            limit: Maximum number of suggestions
+            
+        Returns:
+            Dictionaries with the product name and its number of current
+            offers, most frequent first
+        """
+        term = normalize_term(prefix)
+        if not term or limit < 1:
+            return []
+        snapshot = self._snapshot
+        cached = snapshot.memo.get((term, limit))
+        if cached is not None:
+            return cached
+        
+        start = bisect_left(snapshot.terms, (term,))
+        stop = bisect_left(snapshot.terms, (term + _PREFIX_END,), start)
+        matches = {index for _, index in snapshot.terms[start:stop]}
+        best = heapq.nsmallest(limit, matches,
+                               key=lambda index: (-snapshot.counts[index], snapshot.names[index]))
+        suggestions = [{'name': snapshot.names[index], 'count': snapshot.counts[index]}
+                       for index in best]
+        if len(snapshot.memo) >= MEMO_SIZE:
+            snapshot.memo.clear()
+        snapshot.memo[(term, limit)] = suggestions
+        return suggestions
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    """
+    Get the suggestion index of the current app.
+    
+    Returns:
+        SuggestionIndex, created on first use
+    """
+    index = current_app.extensions.get(SUGGEST_INDEX_KEY)
+    if index is None:
+        index = current_app.extensions[SUGGEST_INDEX_KEY] = SuggestionIndex()
+    return index
@@ -0,0 +1,7 @@
+"""Batch ingestion of PDF flyers."""
+
+from .batch import BatchJob, FileResult, discover_jobs, read_manifest, run_batch
+from .jobs import IngestJob, JobQueue, QueueFull
+
+__all__ = ['BatchJob', 'FileResult', 'discover_jobs', 'read_manifest', 'run_batch',
+           'IngestJob', 'JobQueue', 'QueueFull']
@@ -0,0 +1,178 @@
+"""Batch ingestion of many flyers with a process pool."""
+
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+from ..pdf_processor.extractor import ENGINES, ExtractionReport, iter_pdf_pages
+from ..nlp_processor import OfferBatch, iter_offer_batches
+
+
+@dataclass
+class BatchJob:
+    """One flyer to ingest."""
+    pdf_path: str
+    market_name: str
+
+
+@dataclass
+class FileResult:
+    """Extraction result for one flyer, produced by a worker process."""
+    pdf_path: str
+    market_name: str
+    offers: OfferBatch = field(default_factory=OfferBatch)
+    pages: int = 0
+    characters: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+    # Some pages could not be read; the offers of the others are kept
+    partial: bool = False
+
+
+def _normalize_name(name: str) -> str:
+    """Reduce a market or file name to lowercase letters and digits."""
+    return re.sub(r'[\W_]+', '', name.lower())
+
+
+def discover_jobs(directory: str, market_names: Sequence[str],
+                  market_name: Optional[str] = None) -> Iterator[BatchJob]:
+    """
+    Find the PDF files in a directory and pair each with a market.
+    
+    Unless ``market_name`` is given, the market is taken from the start of
+    the file name, e.g. ``rema1000_uge45.pdf`` belongs to "Rema 1000".
+    
+    Args:
+        directory: Directory to scan for PDF files
+        market_names: Known market names to match file names against
+        market_name: Market to use for every file instead of matching
+    
+    Yields:
+        BatchJob for each PDF file, sorted by file name
+    
+    Raises:
+        ValueError: If a file name does not match any known market
+    """
+    # Longest names first, so 'Rema 1000' wins over a hypothetical 'Rema'
+    candidates = sorted(market_names, key=lambda name: len(_normalize_name(name)), reverse=True)
+    
+    for filename in sorted(os.listdir(directory)):
+        if not filename.lower().endswith('.pdf'):
+            continue
+        pdf_path = os.path.join(directory, filename)
+        if market_name:
+            yield BatchJob(pdf_path, market_name)
+            continue
+        
+        stem = _normalize_name(os.path.splitext(filename)[0])
+        for candidate in candidates:
+            if stem.startswith(_normalize_name(candidate)):
+                yield BatchJob(pdf_path, candidate)
+                break
+        else:
+            raise ValueError(f"Cannot determine market for {filename}; use --market or a manifest")
+
+
+def read_manifest(manifest_path: str) -> List[BatchJob]:
+    """
+    Read a CSV manifest of (pdf_path, market_name) rows.
+    
+    Relative PDF paths are resolved against the manifest's directory. A
+    header row starting with ``pdf_path`` is skipped.
+    
+    Args:
+        manifest_path: Path to the manifest file
+    
+    Returns:
+        List of BatchJob objects in manifest order
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, newline='', encoding='utf-8') as file:
+        for row in csv.reader(file):
+            if not row or row[0].startswith('#') or row[0].strip() == 'pdf_path':
+                continue
+            if len(row) < 2:
+                raise ValueError(f"Manifest row needs a PDF path and a market: {row}")
+            pdf_path = os.path.join(base_dir, row[0].strip())
+            jobs.append(BatchJob(pdf_path, row[1].strip()))
+    return jobs
+
+
+def extract_file(job: BatchJob, use_cache: bool = True,
+                 engines: Sequence[str] = ENGINES) -> FileResult:
+    """
+    Run PDF extraction and offer extraction for one flyer.
+    
+    Runs inside a worker process and never touches the database.
+    
+    Args:
+        job: Flyer to process
+        use_cache: Whether to read and populate the extraction cache
+        engines: Extraction engines in the order each page tries them
+    
+    Returns:
+        FileResult with the extracted offers or an error message
+    """
+    result = FileResult(job.pdf_path, job.market_name)
+    start = time.perf_counter()
+    
+    def counted(pages):
+        for page_text in pages:
+            result.pages += 1
+            result.characters += len(page_text)
+            yield page_text
+    
+    try:
+        report = ExtractionReport()
+        pages = iter_pdf_pages(job.pdf_path, use_cache=use_cache, engines=engines,
+                               report=report)
+        for page_offers in iter_offer_batches(counted(pages), job.market_name):
+            result.offers.extend(page_offers)
+        result.partial = report.partial
+        if not result.characters:
+            result.error = 'Could not extract text from PDF'
+    except Exception as e:
+        result.error = str(e)
+    
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def run_batch(jobs: Iterable[BatchJob], save: Callable[[FileResult], None],
+              workers: Optional[int] = None, use_cache: bool = True,
+              engines: Sequence[str] = ENGINES) -> List[FileResult]:
+    """
+    Extract many flyers in a process pool and hand results to one writer.
+    
+    ``save`` is called in the calling process, one result at a time, as
+    soon as each file finishes, so the database has a single writer.
+    
+    Args:
+        jobs: Flyers to process
+        save: Callback that stores one successful FileResult
+        workers: Number of worker processes; None uses every CPU
+        use_cache: Whether to read and populate the extraction cache
+        engines: Extraction engines in the order each page tries them
+    
+    Returns:
+        List of FileResult objects in completion order
+    """
+    jobs = list(jobs)
+    results = []
+    if not jobs:
+        return results
+    
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(extract_file, job, use_cache, engines) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            if result.error is None:
+                save(result)
+            results.append(result)
+    return results
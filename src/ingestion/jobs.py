@@ -0,0 +1,201 @@
+"""Background queue of flyer ingestion jobs."""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_WORKERS = 1
+
+# Jobs waiting for a worker; submitting more is refused instead of letting
+# a burst of uploads pile up work that competes with search requests
+DEFAULT_QUEUE_DEPTH = 8
+
+# Finished jobs kept for status requests; the oldest are forgotten first
+DEFAULT_KEEP_FINISHED = 100
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its depth cap."""
+
+
+@dataclass
+class IngestJob:
+    """One flyer ingestion and its progress."""
+    pdf_path: str
+    market_name: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    pages_done: int = 0
+    pages_total: Optional[int] = None
+    result: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    
+    def to_dict(self):
+        """Convert to dictionary for the status endpoint."""
+        progress = None
+        if self.status == DONE:
+            progress = 1.0
+        elif self.pages_total:
+            progress = min(self.pages_done / self.pages_total, 1.0)
+        return {
+            'id': self.id,
+            'status': self.status,
+            'pdf_path': self.pdf_path,
+            'market_name': self.market_name,
+            'pages_done': self.pages_done,
+            'pages_total': self.pages_total,
+            'progress': progress,
+            'result': self.result or None,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobQueue:
+    """
+    Runs ingestion jobs on a small pool of background threads.
+    
+    Jobs wait in a queue of at most ``max_depth`` entries; submit() raises
+    QueueFull beyond that. The worker threads are started with the first
+    job, so scripts that only create the app never start them.
+    """
+    
+    def __init__(self, run: Callable[[IngestJob], None], workers: int = DEFAULT_WORKERS,
+                 max_depth: int = DEFAULT_QUEUE_DEPTH,
+                 keep_finished: int = DEFAULT_KEEP_FINISHED):
+        """
+        Initialize the job queue.
+        
+        Args:
+            run: Callable running one job; it updates the job's progress and
+                result, and raises to fail it
+            workers: Number of worker threads
+            max_depth: Jobs that may wait for a worker
+            keep_finished: Finished jobs kept for status requests
+        """
+        self.run = run
+        self.workers = max(1, workers)
+        self.max_depth = max(1, max_depth)
+        self.keep_finished = keep_finished
+        self._queue: 'queue.Queue[IngestJob]' = queue.Queue(maxsize=self.max_depth)
+        self._jobs: Dict[str, IngestJob] = {}
+        self._finished: 'OrderedDict[str, None]' = OrderedDict()
+        self._threads = []
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_environment(cls, run: Callable[[IngestJob], None]) -> 'JobQueue':
+        """
+        Create a job queue configured by environment variables.
+        
+        TILBUDSFINDER_INGEST_WORKERS sets the number of worker threads and
+        TILBUDSFINDER_INGEST_QUEUE_DEPTH the number of jobs that may wait.
+        
+        Args:
+            run: Callable running one job
+            
+        Returns:
+            Configured JobQueue
+        """
+        return cls(run,
+                   workers=int(os.environ.get('TILBUDSFINDER_INGEST_WORKERS', DEFAULT_WORKERS)),
+                   max_depth=int(os.environ.get('TILBUDSFINDER_INGEST_QUEUE_DEPTH',
+                                                DEFAULT_QUEUE_DEPTH)))
+    
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+    
+    def _start_workers(self):
+        """Start the worker threads if they are not running yet."""
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f'ingest-worker-{len(self._threads) + 1}')
+                thread.start()
+                self._threads.append(thread)
+    
+    def submit(self, pdf_path: str, market_name: str) -> IngestJob:
+        """
+        Queue a flyer for ingestion.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            market_name: Name of the market
+            
+        Returns:
+            The queued IngestJob
+            
+        Raises:
+            QueueFull: If max_depth jobs are already waiting
+        """
+        job = IngestJob(pdf_path, market_name)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFull(f"{self.max_depth} ingestion jobs are already waiting")
+        self._start_workers()
+        return job
+    
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        """
+        Look up a job by id.
+        
+        Args:
+            job_id: Id returned by submit()
+            
+        Returns:
+            IngestJob, or None if the id is unknown or the job was forgotten
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def join(self):
+        """Block until every queued job has finished."""
+        self._queue.join()
+    
+    def _work(self):
+        """Worker thread: run jobs from the queue until the process exits."""
+        while True:
+            job = self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                self.run(job)
+                job.status = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+            finally:
+                job.finished_at = time.time()
+                self._forget_old(job)
+                self._queue.task_done()
+    
+    def _forget_old(self, job: IngestJob):
+        """Record a finished job, dropping the oldest beyond keep_finished."""
+        with self._lock:
+            self._finished[job.id] = None
+            while len(self._finished) > self.keep_finished:
+                old_id, _ = self._finished.popitem(last=False)
+                self._jobs.pop(old_id, None)
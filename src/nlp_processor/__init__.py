@@ -1,5 +1,8 @@
 """NLP processing module."""
 
-from .extractor import OfferExtractor, extract_offers
+from .batch import OfferBatch, OfferRow
+from .extractor import (OfferExtractor, ExtractionStats, extract_offer_batch, extract_offers,
+                        extract_offers_many, iter_offer_batches, iter_offers)
 
-__all__ = ['OfferExtractor', 'extract_offers']
+__all__ = ['OfferExtractor', 'OfferBatch', 'OfferRow', 'ExtractionStats', 'extract_offer_batch',
+           'extract_offers', 'extract_offers_many', 'iter_offer_batches', 'iter_offers']
@@ -0,0 +1,234 @@
+"""Compact column storage for extracted offers."""
+
+import sys
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Keys of an offer dictionary, in the order extract_offers() builds them
+OFFER_FIELDS = ('market', 'product_name', 'price', 'unit', 'valid_from', 'valid_to')
+
+NO_UNIT = -1
+
+
+class OfferRow:
+    """
+    Read-only view of one offer in an OfferBatch.
+    
+    Fields are available as attributes and, for code written against
+    offer dictionaries, through ``row['price']`` and ``row.get('unit')``.
+    """
+    
+    __slots__ = ('_batch', '_index')
+    
+    def __init__(self, batch: 'OfferBatch', index: int):
+        self._batch = batch
+        self._index = index
+    
+    @property
+    def market(self) -> str:
+        return self._batch.markets[self._batch.market_codes[self._index]]
+    
+    @property
+    def product_name(self) -> str:
+        return self._batch.product_names[self._index]
+    
+    @property
+    def price(self) -> float:
+        return self._batch.prices[self._index]
+    
+    @property
+    def position(self) -> int:
+        return self._batch.positions[self._index]
+    
+    @property
+    def unit(self) -> Optional[str]:
+        code = self._batch.unit_codes[self._index]
+        return None if code == NO_UNIT else self._batch.units[code]
+    
+    @property
+    def valid_from(self) -> Optional[datetime]:
+        return self._batch.periods[self._batch.period_codes[self._index]][0]
+    
+    @property
+    def valid_to(self) -> Optional[datetime]:
+        return self._batch.periods[self._batch.period_codes[self._index]][1]
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in OFFER_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in OFFER_FIELDS else default
+    
+    def keys(self) -> Tuple[str, ...]:
+        return OFFER_FIELDS
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to an offer dictionary as returned by extract_offers()."""
+        return {key: getattr(self, key) for key in OFFER_FIELDS}
+    
+    def __repr__(self):
+        return f'<OfferRow {self.product_name} - {self.price}>'
+
+
+class OfferBatch:
+    """
+    Offers stored column by column.
+    
+    Prices and text positions live in typed arrays. Markets, units and
+    validity periods, which repeat for nearly every offer of a flyer, are
+    stored once and referenced by small integer codes, and product names
+    are interned. A batch of tens of thousands of offers therefore costs a
+    fraction of the equivalent list of dictionaries.
+    
+    Iterating a batch yields OfferRow views; iter_dicts() yields plain
+    offer dictionaries for callers that need them.
+    """
+    
+    __slots__ = ('prices', 'positions', 'unit_codes', 'market_codes', 'period_codes',
+                 'product_names', 'units', 'markets', 'periods', '_unit_index',
+                 '_market_index', '_period_index')
+    
+    def __init__(self):
+        """Create an empty batch."""
+        self.prices = array('d')
+        self.positions = array('q')
+        self.unit_codes = array('h')
+        self.market_codes = array('H')
+        self.period_codes = array('H')
+        self.product_names: List[str] = []
+        
+        # Lookup tables for the code columns
+        self.units: List[str] = []
+        self.markets: List[str] = []
+        self.periods: List[Tuple[Optional[datetime], Optional[datetime]]] = []
+        self._unit_index: Dict[str, int] = {}
+        self._market_index: Dict[str, int] = {}
+        self._period_index: Dict[Tuple[Optional[datetime], Optional[datetime]], int] = {}
+    
+    @staticmethod
+    def _code(values: list, index: dict, value) -> int:
+        """Get the code of a value in a lookup table, adding it if new."""
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(values)
+            values.append(value)
+        return code
+    
+    def append(self, market: str, product_name: str, price: float, unit: Optional[str],
+               valid_from: Optional[datetime], valid_to: Optional[datetime],
+               position: int = -1):
+        """
+        Add one offer to the batch.
+        
+        Args:
+            market: Name of the market
+            product_name: Product name
+            price: Offer price
+            unit: Unit name, or None
+            valid_from: Start of the validity period
+            valid_to: End of the validity period
+            position: Position of the price in the source text, if known
+        """
+        self.prices.append(price)
+        self.positions.append(position)
+        self.unit_codes.append(NO_UNIT if unit is None else
+                               self._code(self.units, self._unit_index, unit))
+        self.market_codes.append(self._code(self.markets, self._market_index, market))
+        self.period_codes.append(self._code(self.periods, self._period_index,
+                                            (valid_from, valid_to)))
+        self.product_names.append(sys.intern(product_name))
+    
+    def extend(self, other: 'OfferBatch'):
+        """
+        Append all offers of another batch.
+        
+        Args:
+            other: Batch to copy the offers from
+        """
+        unit_map = [self._code(self.units, self._unit_index, unit) for unit in other.units]
+        market_map = [self._code(self.markets, self._market_index, market)
+                      for market in other.markets]
+        period_map = [self._code(self.periods, self._period_index, period)
+                      for period in other.periods]
+        
+        self.prices.extend(other.prices)
+        self.positions.extend(other.positions)
+        self.unit_codes.extend(NO_UNIT if code == NO_UNIT else unit_map[code]
+                               for code in other.unit_codes)
+        self.market_codes.extend(market_map[code] for code in other.market_codes)
+        self.period_codes.extend(period_map[code] for code in other.period_codes)
+        self.product_names.extend(other.product_names)
+    
+    @classmethod
+    def from_dicts(cls, offers: Iterable[Dict[str, Any]]) -> 'OfferBatch':
+        """
+        Build a batch from offer dictionaries.
+        
+        Args:
+            offers: Iterable of offer dictionaries
+            
+        Returns:
+            OfferBatch holding the same offers
+        """
+        batch = cls()
+        for offer in offers:
+            batch.append(offer['market'], offer['product_name'], offer['price'],
+                         offer.get('unit'), offer.get('valid_from'), offer.get('valid_to'))
+        return batch
+    
+    def __len__(self) -> int:
+        return len(self.prices)
+    
+    def __getitem__(self, index: int) -> OfferRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('offer index out of range')
+        return OfferRow(self, index)
+    
+    def __iter__(self) -> Iterator[OfferRow]:
+        for index in range(len(self)):
+            yield OfferRow(self, index)
+    
+    def iter_columns(self) -> Iterator[Tuple[str, str, float, Optional[str],
+                                             Optional[datetime], Optional[datetime]]]:
+        """
+        Yield each offer as a tuple in OFFER_FIELDS order, without row objects.
+        
+        Yields:
+            (market, product_name, price, unit, valid_from, valid_to) tuples
+        """
+        units = self.units + [None]  # NO_UNIT (-1) picks the trailing None
+        markets = self.markets
+        periods = self.periods
+        for market_code, product_name, price, unit_code, period_code in zip(
+                self.market_codes, self.product_names, self.prices,
+                self.unit_codes, self.period_codes):
+            valid_from, valid_to = periods[period_code]
+            yield markets[market_code], product_name, price, units[unit_code], valid_from, valid_to
+    
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield each offer as a dictionary, as returned by extract_offers().
+        
+        Yields:
+            Offer dictionaries in batch order
+        """
+        for values in self.iter_columns():
+            yield dict(zip(OFFER_FIELDS, values))
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Convert the batch to a list of offer dictionaries.
+        
+        Returns:
+            List of offer dictionaries in batch order
+        """
+        return list(self.iter_dicts())
+    
+    def __repr__(self):
+        return f'<OfferBatch {len(self)} offers>'
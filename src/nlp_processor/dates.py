@@ -0,0 +1,117 @@
+"""Fast parser for the Danish dates found by the offer scanner."""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Match, Optional
+from dateutil import parser as date_parser
+
+from .scanner import DATE_PATTERNS
+
+
+# Danish month names for date parsing
+DANISH_MONTHS = {
+    'januar': 'january', 'jan': 'jan',
+    'februar': 'february', 'feb': 'feb',
+    'marts': 'march', 'mar': 'mar',
+    'april': 'april', 'apr': 'apr',
+    'maj': 'may', 'may': 'may',
+    'juni': 'june', 'jun': 'jun',
+    'juli': 'july', 'jul': 'jul',
+    'august': 'august', 'aug': 'aug',
+    'september': 'september', 'sep': 'sep',
+    'oktober': 'october', 'okt': 'oct',
+    'november': 'november', 'nov': 'nov',
+    'december': 'december', 'dec': 'dec'
+}
+
+NUMERIC_DATE_PATTERN = DATE_PATTERNS[0]
+
+_PARSER_INFO = date_parser.parserinfo()
+
+
+def translate_months(date_str: str) -> str:
+    """
+    Replace Danish month names with English ones, the way dateutil expects.
+    
+    Args:
+        date_str: Lowercase date string
+        
+    Returns:
+        Date string with English month names
+    """
+    for danish, english in DANISH_MONTHS.items():
+        date_str = date_str.replace(danish, english)
+    return date_str
+
+
+def _build_month_table() -> Dict[str, int]:
+    """
+    Map every Danish and English month word to its month number.
+    
+    Only words that dateutil reads as the same month after
+    translate_months() are included, so the table never disagrees with
+    the dateutil fallback.
+    """
+    words = set(DANISH_MONTHS) | set(DANISH_MONTHS.values())
+    for names in _PARSER_INFO.MONTHS:
+        words.update(name.lower() for name in names)
+    
+    table = {}
+    for word in words:
+        month = _PARSER_INFO.month(translate_months(word))
+        if month is not None:
+            table[word] = month
+    return table
+
+
+MONTHS = _build_month_table()
+
+
+def _is_number(value: str) -> bool:
+    """Check that a regex group holds plain ASCII digits."""
+    return value.isascii() and value.isdigit()
+
+
+@lru_cache(maxsize=4096)
+def _parse(date_str: str, numeric: bool, day: str, month: str, year: str) -> Optional[datetime]:
+    """Parse one matched date string; see parse_date_match()."""
+    # Zero-padded long years ("0024") are read inconsistently by dateutil
+    if _is_number(day) and _is_number(year) and (len(year) == 2 or year[0] != '0'):
+        if numeric:
+            # dateutil rejects mixed separators such as "12.06-2024"
+            same_separator = date_str[len(day)] == date_str[len(day) + len(month) + 1]
+            month_number = int(month) if same_separator and _is_number(month) else None
+        else:
+            month_number = MONTHS.get(month.lower())
+        
+        # Day-first with the year last is how dateutil reads these forms too,
+        # as long as the day and month cannot be mistaken for each other
+        if month_number is not None and 1 <= month_number <= 12 and 1 <= int(day) <= 31:
+            try:
+                return datetime(_PARSER_INFO.convertyear(int(year), len(year) > 2),
+                                month_number, int(day))
+            except ValueError:
+                pass
+    
+    try:
+        return date_parser.parse(translate_months(date_str.lower()), dayfirst=True, fuzzy=True)
+    except (ValueError, OverflowError, date_parser.ParserError):
+        return None
+
+
+def parse_date_match(match: Match) -> Optional[datetime]:
+    """
+    Parse a date match from OfferScanner.scan().
+    
+    Numeric dates and dates with a known month name are built straight
+    from the regex groups; anything else is left to dateutil. Results are
+    memoized, as a flyer repeats the same validity dates on many pages.
+    
+    Args:
+        match: Match of one of the DATE_PATTERNS
+        
+    Returns:
+        Parsed datetime, or None if the match is not a valid date
+    """
+    day, month, year = match.groups()
+    return _parse(match.group(0), match.re.pattern == NUMERIC_DATE_PATTERN, day, month, year)
@@ -1,36 +1,47 @@
 """NLP processor for extracting offer information from text."""
 
-import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
-from dateutil import parser as date_parser
+from itertools import accumulate
+from typing import List, Dict, Optional, Tuple, Any, Iterable, Iterator
+
+from .batch import OfferBatch
+from .dates import DANISH_MONTHS, parse_date_match
+from .scanner import ScanResult, get_scanner
+
+
+@dataclass
+class ExtractionStats:
+    """Throughput of a multi-document extraction run."""
+    documents: int = 0
+    offers: int = 0
+    seconds: float = 0.0
+    
+    @property
+    def documents_per_second(self) -> float:
+        """Documents extracted per second of wall-clock time."""
+        return self.documents / self.seconds if self.seconds else 0.0
 
 
 class OfferExtractor:
     """Extracts product offers from text using NLP techniques."""
     
     # Danish month names for date parsing
-    DANISH_MONTHS = {
-        'januar': 'january', 'jan': 'jan',
-        'februar': 'february', 'feb': 'feb',
-        'marts': 'march', 'mar': 'mar',
-        'april': 'april', 'apr': 'apr',
-        'maj': 'may', 'may': 'may',
-        'juni': 'june', 'jun': 'jun',
-        'juli': 'july', 'jul': 'jul',
-        'august': 'august', 'aug': 'aug',
-        'september': 'september', 'sep': 'sep',
-        'oktober': 'october', 'okt': 'oct',
-        'november': 'november', 'nov': 'nov',
-        'december': 'december', 'dec': 'dec'
-    }
+    DANISH_MONTHS = DANISH_MONTHS
     
     # Common Danish units
     UNITS = ['kg', 'g', 'l', 'ml', 'cl', 'dl', 'stk', 'stk.', 'pk', 'pk.', 'bk', 'ps', 'pose']
     
+    # A unit belongs to a price if it is fewer than this many characters away
+    UNIT_WINDOW = 100
+    
     def __init__(self):
         """Initialize the offer extractor."""
-        pass
+        self.scanner = get_scanner(tuple(self.UNITS))
     
     def extract_prices(self, text: str) -> List[Dict[str, Any]]:
         """
@@ -42,31 +53,7 @@ class OfferExtractor:
         Returns:
             List of dictionaries containing price information
         """
-        prices = []
-        
-        # Pattern: "XX,XX kr" or "XX kr" or "XX,-"
-        price_patterns = [
-            r'(\d+)[,.](\d{2})\s*kr',  # 12,50 kr or 12.50 kr
-            r'(\d+)\s*kr',              # 12 kr
-            r'(\d+)[,.](\d{2})\s*,-',   # 12,50 ,-
-            r'(\d+)\s*,-',              # 12 ,-
-        ]
-        
-        for pattern in price_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if len(match.groups()) == 2:
-                    price = float(f"{match.group(1)}.{match.group(2)}")
-                else:
-                    price = float(match.group(1))
-                
-                prices.append({
-                    'price': price,
-                    'position': match.start(),
-                    'text': match.group(0)
-                })
-        
-        return prices
+        return self._prices_from_scan(self.scanner.scan(text, kinds=('price',)))
     
     def extract_units(self, text: str) -> List[Dict[str, Any]]:
         """
@@ -78,98 +65,169 @@ class OfferExtractor:
         Returns:
             List of dictionaries containing unit information
         """
-        units = []
-        
-        # Create pattern from known units
-        unit_pattern = r'\b(\d+[,.]?\d*)\s*(' + '|'.join(self.UNITS) + r')\b'
+        return self._units_from_scan(self.scanner.scan(text, kinds=('unit',)))
+    
+    def extract_dates(self, text: str) -> List[datetime]:
+        """
+        Extract dates from text (Danish format).
         
-        matches = re.finditer(unit_pattern, text, re.IGNORECASE)
-        for match in matches:
+        Args:
+            text: Input text to search
+            
+        Returns:
+            List of datetime objects
+        """
+        return self._dates_from_scan(self.scanner.scan(text, kinds=('date',)))
+    
+    def _prices_from_scan(self, scan: ScanResult) -> List[Dict[str, Any]]:
+        """Convert scanned price matches to price dictionaries."""
+        prices = []
+        for match in scan.prices:
+            if len(match.groups()) == 2:
+                price = float(f"{match.group(1)}.{match.group(2)}")
+            else:
+                price = float(match.group(1))
+            
+            prices.append({
+                'price': price,
+                'position': match.start(),
+                'text': match.group(0)
+            })
+        return prices
+    
+    def _units_from_scan(self, scan: ScanResult) -> List[Dict[str, Any]]:
+        """Convert scanned unit matches to unit dictionaries."""
+        units = []
+        for match in scan.units:
             units.append({
                 'quantity': match.group(1),
                 'unit': match.group(2).lower(),
                 'position': match.start(),
                 'text': match.group(0)
             })
-        
         return units
     
-    def extract_dates(self, text: str) -> List[datetime]:
+    def _dates_from_scan(self, scan: ScanResult) -> List[datetime]:
+        """Parse scanned date matches, skipping those that are not valid dates."""
+        dates = []
+        for match in scan.dates:
+            date = parse_date_match(match)
+            if date is not None:
+                dates.append(date)
+        return dates
+    
+    def extract_offers_from_text(self, text: str, market_name: str) -> List[Dict[str, Any]]:
         """
-        Extract dates from text (Danish format).
+        Extract complete offer information from text.
         
         Args:
-            text: Input text to search
+            text: Input text from PDF
+            market_name: Name of the market
             
         Returns:
-            List of datetime objects
+            List of offer dictionaries
         """
-        dates = []
+        return self.extract_offer_batch(text, market_name).to_dicts()
+    
+    def extract_offer_batch(self, text: str, market_name: str) -> OfferBatch:
+        """
+        Extract complete offer information from text into an OfferBatch.
         
-        # Convert Danish month names to English for parsing
-        text_normalized = text.lower()
-        for danish, english in self.DANISH_MONTHS.items():
-            text_normalized = text_normalized.replace(danish, english)
-        
-        # Common date patterns
-        date_patterns = [
-            r'\b(\d{1,2})[./\-](\d{1,2})[./\-](\d{2,4})\b',  # 12/06/2024 or 12-06-24
-            r'\b(\d{1,2})\.\s*(\w+)\s*(\d{4})\b',            # 12. juni 2024
-            r'\b(\d{1,2})\s+(\w+)\s+(\d{4})\b',              # 12 juni 2024
-        ]
-        
-        for pattern in date_patterns:
-            matches = re.finditer(pattern, text_normalized)
-            for match in matches:
-                try:
-                    date_str = match.group(0)
-                    parsed_date = date_parser.parse(date_str, dayfirst=True, fuzzy=True)
-                    dates.append(parsed_date)
-                except (ValueError, date_parser.ParserError):
-                    # Skip dates that cannot be parsed
-                    pass
+        Args:
+            text: Input text from PDF
+            market_name: Name of the market
+            
+        Returns:
+            OfferBatch with the offers in text order
+        """
+        # Find prices, units and dates with one scan() call
+        scan = self.scanner.scan(text)
+        dates = self._dates_from_scan(scan)
         
-        return dates
+        # Find validity period
+        valid_from = dates[0] if len(dates) > 0 else None
+        valid_to = dates[1] if len(dates) > 1 else None
+        
+        return self._extract_offers_with_validity(text, scan, market_name, valid_from, valid_to)
     
-    def extract_offers_from_text(self, text: str, market_name: str) -> List[Dict[str, Any]]:
+    def iter_offers_from_pages(self, pages: Iterable[str],
+                               market_name: str) -> Iterator[List[Dict[str, Any]]]:
         """
-        Extract complete offer information from text.
+        Extract offers page by page as pages arrive.
+        
+        Dates found on a page are carried over to the following pages, so
+        a validity period printed on the front page applies to the whole
+        flyer. Offers on pages before any date was seen have no validity.
+        
+        Args:
+            pages: Iterable of page texts in page order
+            market_name: Name of the market
+            
+        Yields:
+            List of offer dictionaries for each page
+        """
+        for batch in self.iter_offer_batches_from_pages(pages, market_name):
+            yield batch.to_dicts()
+    
+    def iter_offer_batches_from_pages(self, pages: Iterable[str],
+                                      market_name: str) -> Iterator[OfferBatch]:
+        """
+        Extract offers page by page as pages arrive, one OfferBatch per page.
+        
+        Validity periods carry over between pages as in iter_offers_from_pages().
+        
+        Args:
+            pages: Iterable of page texts in page order
+            market_name: Name of the market
+            
+        Yields:
+            OfferBatch for each page
+        """
+        dates = []
+        for page_text in pages:
+            scan = self.scanner.scan(page_text)
+            if len(dates) < 2:
+                dates.extend(self._dates_from_scan(scan))
+            valid_from = dates[0] if len(dates) > 0 else None
+            valid_to = dates[1] if len(dates) > 1 else None
+            yield self._extract_offers_with_validity(page_text, scan, market_name,
+                                                     valid_from, valid_to)
+    
+    def _extract_offers_with_validity(self, text: str, scan: ScanResult, market_name: str,
+                                      valid_from: Optional[datetime],
+                                      valid_to: Optional[datetime]) -> OfferBatch:
+        """
+        Extract offers from text with a known validity period.
         
         Args:
             text: Input text from PDF
+            scan: Prices, units and dates scanned from the text
             market_name: Name of the market
+            valid_from: Start of the validity period
+            valid_to: End of the validity period
             
         Returns:
-            List of offer dictionaries
+            OfferBatch with the offers in price-match order
         """
-        offers = []
+        offers = OfferBatch()
         
         # Extract all components
-        prices = self.extract_prices(text)
-        units = self.extract_units(text)
-        dates = self.extract_dates(text)
+        prices = self._prices_from_scan(scan)
+        units = self._units_from_scan(scan)
         
         # Split text into lines for product name extraction
         lines = text.split('\n')
+        line_starts = line_start_offsets(lines)
         
-        # Find validity period
-        valid_from = dates[0] if len(dates) > 0 else None
-        valid_to = dates[1] if len(dates) > 1 else None
+        # Units are found in text order, so their positions are sorted
+        unit_positions = [unit_info['position'] for unit_info in units]
         
         # Process each price found
         for price_info in prices:
             price_pos = price_info['position']
             
             # Find the line containing this price
-            current_pos = 0
-            product_line = ""
-            
-            for line in lines:
-                line_end = current_pos + len(line)
-                if current_pos <= price_pos <= line_end:
-                    product_line = line
-                    break
-                current_pos = line_end + 1  # +1 for newline
+            product_line = lines[bisect_right(line_starts, price_pos) - 1]
             
             # Extract product name (text before price on the same line)
             product_name = product_line[:product_line.find(price_info['text'])].strip()
@@ -179,28 +237,77 @@ class OfferExtractor:
                 continue
             
             # Find nearest unit
-            unit = None
-            min_distance = float('inf')
-            for unit_info in units:
-                distance = abs(unit_info['position'] - price_pos)
-                if distance < min_distance and distance < 100:  # Within 100 chars
-                    min_distance = distance
-                    unit = unit_info['unit']
-            
-            offer = {
-                'market': market_name,
-                'product_name': product_name[:255],  # Limit length
-                'price': price_info['price'],
-                'unit': unit,
-                'valid_from': valid_from,
-                'valid_to': valid_to
-            }
+            unit = nearest_unit(units, unit_positions, price_pos, self.UNIT_WINDOW)
             
-            offers.append(offer)
+            offers.append(market_name, product_name[:255],  # Limit length
+                          price_info['price'], unit, valid_from, valid_to, price_pos)
         
         return offers
 
 
+def line_start_offsets(lines: List[str]) -> List[int]:
+    """
+    Compute the offset in the text at which each line starts.
+    
+    Args:
+        lines: Text split on newlines
+        
+    Returns:
+        Sorted list of start offsets, one per line
+    """
+    # Each line is followed by one newline character
+    return [0] + list(accumulate(len(line) + 1 for line in lines[:-1]))
+
+
+def nearest_unit(units: List[Dict[str, Any]], unit_positions: List[int],
+                 position: int, window: int) -> Optional[str]:
+    """
+    Find the unit closest to a position.
+    
+    Only units inside the window are looked at, found by bisecting the
+    sorted unit positions. On a tie the earlier unit wins.
+    
+    Args:
+        units: Unit dictionaries in text order
+        unit_positions: Sorted positions of those units
+        position: Position to measure from
+        window: Units must be closer than this many characters
+        
+    Returns:
+        Unit name, or None if no unit is within the window
+    """
+    start = bisect_left(unit_positions, position - window + 1)
+    stop = bisect_right(unit_positions, position + window - 1)
+    
+    unit = None
+    min_distance = window
+    for index in range(start, stop):
+        distance = abs(unit_positions[index] - position)
+        if distance < min_distance:
+            min_distance = distance
+            unit = units[index]['unit']
+    return unit
+
+
+_default_extractor: Optional[OfferExtractor] = None
+
+
+def get_default_extractor() -> OfferExtractor:
+    """
+    Get the extractor shared by the convenience functions.
+    
+    OfferExtractor keeps no per-call state, so one instance per process
+    can serve every call.
+    
+    Returns:
+        Shared OfferExtractor instance
+    """
+    global _default_extractor
+    if _default_extractor is None:
+        _default_extractor = OfferExtractor()
+    return _default_extractor
+
+
 def extract_offers(text: str, market_name: str) -> List[Dict[str, Any]]:
     """
     Convenience function to extract offers from text.
@@ -212,5 +319,94 @@ def extract_offers(text: str, market_name: str) -> List[Dict[str, Any]]:
     Returns:
         List of offer dictionaries
     """
-    extractor = OfferExtractor()
-    return extractor.extract_offers_from_text(text, market_name)
+    return get_default_extractor().extract_offers_from_text(text, market_name)
+
+
+def _init_worker():
+    """Build the worker's extractor once, before its first document."""
+    get_default_extractor()
+
+
+def extract_offers_many(documents: Iterable[Tuple[str, str]], workers: Optional[int] = None,
+                        stats: Optional[ExtractionStats] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Extract offers from many texts, optionally across a process pool.
+    
+    Results come back in input order. With a pool, at most a few
+    documents per worker are in flight at a time, so the input can be a
+    lazy stream of any length.
+    
+    Args:
+        documents: Iterable of (text, market_name) pairs
+        workers: Number of worker processes; None or 1 extracts in this process
+        stats: Optional ExtractionStats that is updated as results are yielded
+        
+    Yields:
+        List of offer dictionaries for each document, in input order
+    """
+    if stats is None:
+        stats = ExtractionStats()
+    start = time.perf_counter()
+    
+    def counted(offers):
+        stats.documents += 1
+        stats.offers += len(offers)
+        stats.seconds = time.perf_counter() - start
+        return offers
+    
+    if not workers or workers <= 1:
+        extractor = get_default_extractor()
+        for text, market_name in documents:
+            yield counted(extractor.extract_offers_from_text(text, market_name))
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = deque()
+        for text, market_name in documents:
+            pending.append(executor.submit(extract_offers, text, market_name))
+            if len(pending) >= workers * 4:
+                yield counted(pending.popleft().result())
+        while pending:
+            yield counted(pending.popleft().result())
+
+
+def extract_offer_batch(text: str, market_name: str) -> OfferBatch:
+    """
+    Convenience function to extract offers from text into an OfferBatch.
+    
+    Args:
+        text: Input text from PDF
+        market_name: Name of the market
+        
+    Returns:
+        OfferBatch with the offers in text order
+    """
+    return get_default_extractor().extract_offer_batch(text, market_name)
+
+
+def iter_offers(pages: Iterable[str], market_name: str) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Convenience generator to extract offers from a stream of pages.
+    
+    Args:
+        pages: Iterable of page texts in page order
+        market_name: Name of the market
+        
+    Yields:
+        List of offer dictionaries for each page
+    """
+    yield from get_default_extractor().iter_offers_from_pages(pages, market_name)
+
+
+def iter_offer_batches(pages: Iterable[str], market_name: str) -> Iterator[OfferBatch]:
+    """
+    Convenience generator to extract one OfferBatch per page from a stream of pages.
+    
+    Args:
+        pages: Iterable of page texts in page order
+        market_name: Name of the market
+        
+    Yields:
+        OfferBatch for each page
+    """
+    yield from get_default_extractor().iter_offer_batches_from_pages(pages, market_name)
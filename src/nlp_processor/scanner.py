@@ -0,0 +1,122 @@
+"""Precompiled scanner for prices, units and dates in flyer text."""
+
+import re
+from functools import lru_cache
+from typing import Collection, List, Match, NamedTuple, Sequence, Tuple
+
+
+# Pattern: "XX,XX kr" or "XX kr" or "XX,-"
+PRICE_PATTERNS = (
+    r'(\d+)[,.](\d{2})\s*kr',  # 12,50 kr or 12.50 kr
+    r'(\d+)\s*kr',              # 12 kr
+    r'(\d+)[,.](\d{2})\s*,-',   # 12,50 ,-
+    r'(\d+)\s*,-',              # 12 ,-
+)
+
+# Common date patterns
+DATE_PATTERNS = (
+    r'\b(\d{1,2})[./\-](\d{1,2})[./\-](\d{2,4})\b',  # 12/06/2024 or 12-06-24
+    r'\b(\d{1,2})\.\s*(\w+)\s*(\d{4})\b',            # 12. juni 2024
+    r'\b(\d{1,2})\s+(\w+)\s+(\d{4})\b',              # 12 juni 2024
+)
+
+# Kinds of matches scan() can look for
+SCAN_KINDS = ('price', 'unit', 'date')
+
+
+class ScanResult(NamedTuple):
+    """
+    Prices, units and dates found in a text.
+    
+    Each list holds ``re.Match`` objects (positions via ``start()``) in
+    the order the patterns are declared, then by position.
+    """
+    prices: List[Match]
+    units: List[Match]
+    dates: List[Match]
+
+
+def unit_pattern(units: Sequence[str]) -> str:
+    """
+    Build the unit pattern from a list of unit names.
+    
+    Args:
+        units: Unit names, used verbatim as regex alternatives
+        
+    Returns:
+        Regular expression matching a quantity followed by a unit
+    """
+    return r'\b(\d+[,.]?\d*)\s*(' + '|'.join(units) + r')\b'
+
+
+class OfferScanner:
+    """
+    Finds prices, units and dates in flyer text with precompiled patterns.
+    
+    All patterns are compiled once per unit list, and one scan() call
+    returns everything that offer extraction needs; a caller that wants
+    only some kinds of matches names them, so extract_prices() does not
+    pay for the unit and date patterns. scan() runs one finditer pass
+    per pattern, as the helpers did, rather than one combined
+    alternation: prices, units and dates overlap (e.g. "1 kg 12,50 kr"),
+    and an alternation can only report one of the overlapping matches.
+    """
+    
+    def __init__(self, units: Sequence[str]):
+        """
+        Compile the scanner patterns.
+        
+        Args:
+            units: Unit names to recognise
+        """
+        self._price_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in PRICE_PATTERNS]
+        self._unit_pattern = re.compile(unit_pattern(units), re.IGNORECASE)
+        self._date_patterns = [re.compile(pattern) for pattern in DATE_PATTERNS]
+    
+    def scan(self, text: str, kinds: Collection[str] = SCAN_KINDS) -> ScanResult:
+        """
+        Scan text for prices, units and dates.
+        
+        Args:
+            text: Input text to search
+            kinds: Kinds of matches to look for, from SCAN_KINDS; the
+                   patterns of other kinds are not run
+            
+        Returns:
+            ScanResult with the matches of each kind, empty for kinds
+            that were not asked for
+            
+        Raises:
+            ValueError: If a kind is not in SCAN_KINDS
+        """
+        unknown = set(kinds).difference(SCAN_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown scan kinds: {', '.join(sorted(unknown))}")
+        
+        prices = []
+        if 'price' in kinds:
+            for regex in self._price_patterns:
+                prices.extend(regex.finditer(text))
+        
+        units = list(self._unit_pattern.finditer(text)) if 'unit' in kinds else []
+        
+        dates = []
+        if 'date' in kinds:
+            for regex in self._date_patterns:
+                dates.extend(regex.finditer(text))
+        
+        return ScanResult(prices, units, dates)
+
+
+@lru_cache(maxsize=8)
+def get_scanner(units: Tuple[str, ...]) -> OfferScanner:
+    """
+    Get a compiled scanner for a set of units, reusing earlier compilations.
+    
+    Args:
+        units: Unit names to recognise
+        
+    Returns:
+        OfferScanner instance
+    """
+    return OfferScanner(units)
@@ -1,5 +1,8 @@
 """PDF processing module."""
 
-from .extractor import PDFExtractor, extract_pdf_text
+from .extractor import (ExtractionReport, PDFExtractor, extract_pdf_pages, extract_pdf_text,
+                        iter_pdf_pages)
+from .cache import ExtractionCache
 
-__all__ = ['PDFExtractor', 'extract_pdf_text']
+__all__ = ['ExtractionReport', 'PDFExtractor', 'extract_pdf_pages', 'extract_pdf_text',
+           'iter_pdf_pages', 'ExtractionCache']
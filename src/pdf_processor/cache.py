@@ -0,0 +1,234 @@
+"""Persistent on-disk cache for extracted PDF text."""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_ROOT, '.cache', 'pdf_text')
+DEFAULT_MAX_MB = 200
+
+
+@dataclass
+class CacheEntry:
+    """Metadata about one cached extraction."""
+    key: str
+    source: Optional[str]
+    pages: int
+    size: int
+    last_used: float
+
+
+class ExtractionCache:
+    """
+    Stores per-page PDF text on disk, keyed by file content and extractor version.
+
+    Each entry is a JSON file named after the key. The modification time
+    of an entry is refreshed on every hit and used for LRU eviction once
+    the total size exceeds the configured cap.
+    """
+
+    def __init__(self, cache_dir: str, version: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        """
+        Initialize the extraction cache.
+
+        Args:
+            cache_dir: Directory that holds the cache entries
+            version: Extractor version; part of every key
+            max_bytes: Size cap for all entries together
+        """
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_environment(cls, version: str) -> 'ExtractionCache':
+        """
+        Create a cache configured by environment variables.
+
+        TILBUDSFINDER_CACHE_DIR sets the directory and
+        TILBUDSFINDER_CACHE_MAX_MB sets the size cap in megabytes.
+
+        Args:
+            version: Extractor version; part of every key
+
+        Returns:
+            Configured ExtractionCache
+        """
+        cache_dir = os.environ.get('TILBUDSFINDER_CACHE_DIR', DEFAULT_CACHE_DIR)
+        max_mb = float(os.environ.get('TILBUDSFINDER_CACHE_MAX_MB', DEFAULT_MAX_MB))
+        return cls(cache_dir, version, max_bytes=int(max_mb * 1024 * 1024))
+
+    def key_for(self, pdf_path: str, variant: str = '') -> str:
+        """
+        Compute the cache key for a PDF file.
+
+        Args:
+            pdf_path: Path to the PDF file
+            variant: Extra settings that change the extracted text
+
+        Returns:
+            Hex digest of the extractor version, variant and file content
+        """
+        digest = hashlib.sha256(f'extractor-v{self.version}\n{variant}\n'.encode('utf-8'))
+        with open(pdf_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        """Get the file path of a cache entry."""
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        Look up cached page texts.
+
+        Args:
+            key: Cache key from key_for()
+
+        Returns:
+            List of page texts, or None on a miss
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('version') != self.version:
+            return None
+        return entry['pages']
+
+    def put(self, key: str, pages: List[str], source: Optional[str] = None):
+        """
+        Store page texts and evict old entries if the cache is over its cap.
+
+        Failures to write are reported but never raised; the cache is an
+        optimisation only.
+
+        Args:
+            key: Cache key from key_for()
+            pages: List of page texts in page order
+            source: Path of the PDF the text came from, for inspection
+        """
+        entry = {'version': self.version, 'source': source, 'pages': pages}
+        path = self._entry_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(entry, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write extraction cache: {e}")
+            return
+
+        self.evict()
+
+    def entries(self) -> List[CacheEntry]:
+        """
+        List all cache entries, least recently used first.
+
+        Returns:
+            List of CacheEntry objects
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+                with open(path, 'r', encoding='utf-8') as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                continue
+            entries.append(CacheEntry(
+                key=name[:-len('.json')],
+                source=entry.get('source'),
+                pages=len(entry.get('pages', [])),
+                size=stat.st_size,
+                last_used=stat.st_mtime
+            ))
+
+        entries.sort(key=lambda entry: entry.last_used)
+        return entries
+
+    def total_size(self) -> int:
+        """
+        Get the combined size of all entries in bytes.
+
+        Returns:
+            Size in bytes
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                try:
+                    total += os.path.getsize(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+        return total
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits its cap.
+
+        Returns:
+            Number of entries removed
+        """
+        if self.total_size() <= self.max_bytes:
+            return 0
+
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        removed = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(entry.key):
+                total -= entry.size
+                removed += 1
+        return removed
+
+    def purge(self, older_than_days: Optional[float] = None) -> int:
+        """
+        Remove cache entries.
+
+        Args:
+            older_than_days: Only remove entries not used for this many days;
+                             None removes everything
+
+        Returns:
+            Number of entries removed
+        """
+        cutoff = None
+        if older_than_days is not None:
+            cutoff = time.time() - older_than_days * 86400
+
+        removed = 0
+        for entry in self.entries():
+            if cutoff is None or entry.last_used < cutoff:
+                if self._remove(entry.key):
+                    removed += 1
+        return removed
+
+    def _remove(self, key: str) -> bool:
+        """Delete one entry, returning whether it was removed."""
+        try:
+            os.remove(self._entry_path(key))
+            return True
+        except OSError:
+            return False
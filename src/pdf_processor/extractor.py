@@ -1,60 +1,401 @@
 """PDF extraction module for processing supermarket flyers."""
 
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
 import pdfplumber
 import PyPDF2
-from typing import Optional
+
+from .cache import ExtractionCache
+
+
+# Bump whenever a change alters the extracted text, so cached results
+# produced by older code are no longer used.
+EXTRACTOR_VERSION = '2'
+
+# Extraction engines, cheapest first
+ENGINES = ('pypdf2', 'pdfplumber')
+
+# A page shorter than this (after stripping) is escalated to the next engine
+MIN_PAGE_CHARS = 20
+
+_default_cache = None
+
+
+@dataclass
+class PageStat:
+    """Records how one page was extracted."""
+    engine: str
+    seconds: float
+    attempts: int
+
+
+@dataclass
+class ExtractionReport:
+    """Outcome of an extraction that the page texts do not show."""
+    partial: bool = False
+    # Pages in the document, known once the first page was extracted
+    pages: Optional[int] = None
+
+
+def page_text_ok(text: str) -> bool:
+    """
+    Check whether an engine produced usable text for a page.
+    
+    Rejects pages that are (nearly) empty, contain mostly unprintable or
+    replacement characters, or have no word breaks, which is how a failed
+    PyPDF2 extraction of a complex layout usually looks.
+    
+    Args:
+        text: Extracted page text
+        
+    Returns:
+        True if the text is good enough to keep
+    """
+    stripped = text.strip()
+    if len(stripped) < MIN_PAGE_CHARS:
+        return False
+    
+    bad = sum(1 for char in stripped
+              if char == '\ufffd' or (not char.isprintable() and not char.isspace()))
+    if bad > len(stripped) * 0.1:
+        return False
+    
+    spaces = sum(1 for char in stripped if char.isspace())
+    return spaces >= len(stripped) * 0.05
+
+
+class _PageSource:
+    """Opens a PDF with each engine on first use and extracts single pages."""
+    
+    def __init__(self, pdf_path: str):
+        self.pdf_path = pdf_path
+        self._pdfplumber = None
+        self._pypdf2_file = None
+        self._pypdf2 = None
+    
+    def page_count(self, engines: Sequence[str]) -> int:
+        """Count pages with the first engine that can open the file."""
+        error = None
+        for engine in engines:
+            try:
+                return len(self._document(engine).pages)
+            except Exception as e:
+                error = e
+        raise error
+    
+    def _document(self, engine: str):
+        """Get the engine's document object, opening it if needed."""
+        if engine == 'pdfplumber':
+            if self._pdfplumber is None:
+                self._pdfplumber = pdfplumber.open(self.pdf_path)
+            return self._pdfplumber
+        if engine == 'pypdf2':
+            if self._pypdf2 is None:
+                self._pypdf2_file = open(self.pdf_path, 'rb')
+                self._pypdf2 = PyPDF2.PdfReader(self._pypdf2_file)
+            return self._pypdf2
+        raise ValueError(f"Unknown extraction engine: {engine}")
+    
+    def extract(self, engine: str, index: int) -> str:
+        """Extract the text of one page with the given engine."""
+        page = self._document(engine).pages[index]
+        page_text = page.extract_text() or ''
+        if engine == 'pdfplumber':
+            page.close()
+        return page_text
+    
+    def close(self):
+        """Close every document that was opened."""
+        if self._pdfplumber is not None:
+            self._pdfplumber.close()
+        if self._pypdf2_file is not None:
+            self._pypdf2_file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _select_page(source: _PageSource, index: int,
+                 engines: Sequence[str]) -> Tuple[Optional[str], PageStat]:
+    """
+    Extract one page, escalating through the engines until one passes.
+    
+    If no engine produces acceptable text, the longest result is kept.
+    
+    Args:
+        source: Open page source for the document
+        index: Page index
+        engines: Engine names in the order they should be tried
+        
+    Returns:
+        Tuple of page text (None if every engine failed) and PageStat
+    """
+    start = time.perf_counter()
+    best_text = None
+    best_engine = engines[-1]
+    attempts = 0
+    for engine in engines:
+        attempts += 1
+        try:
+            page_text = source.extract(engine, index)
+        except Exception as e:
+            print(f"Error extracting page {index + 1} with {engine}: {e}")
+            continue
+        if page_text_ok(page_text):
+            best_text, best_engine = page_text, engine
+            break
+        if best_text is None or len(page_text.strip()) > len(best_text.strip()):
+            best_text, best_engine = page_text, engine
+    return best_text, PageStat(best_engine, time.perf_counter() - start, attempts)
+
+
+def _select_page_range(pdf_path: str, start: int, stop: int,
+                       engines: Sequence[str]) -> List[Tuple[Optional[str], PageStat]]:
+    """
+    Extract pages ``start`` to ``stop`` with per-page engine selection.
+    
+    Runs inside a worker process, so the file is opened independently
+    of any other worker.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        start: Index of the first page to extract
+        stop: Index one past the last page to extract
+        engines: Engine names in the order they should be tried
+        
+    Returns:
+        List of (page text, PageStat) tuples in page order
+    """
+    with _PageSource(pdf_path) as source:
+        return [_select_page(source, index, engines) for index in range(start, stop)]
+
+
+def _pdfplumber_page_range(pdf_path: str, start: int, stop: int) -> List[Optional[str]]:
+    """
+    Extract the text of pages ``start`` to ``stop`` with pdfplumber.
+    
+    Runs inside a worker process, so the file is opened independently
+    of any other worker.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        start: Index of the first page to extract
+        stop: Index one past the last page to extract
+        
+    Returns:
+        List of page texts in page order
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return [pdf.pages[index].extract_text() for index in range(start, stop)]
+
+
+def _split_pages(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Split a page count into contiguous (start, stop) ranges.
+    
+    Uses a few ranges per worker so that slow pages do not leave the
+    other workers idle at the end of the document.
+    
+    Args:
+        page_count: Number of pages in the document
+        workers: Number of worker processes
+        
+    Returns:
+        List of (start, stop) page index ranges in page order
+    """
+    chunk_size = max(1, math.ceil(page_count / (workers * 4)))
+    return [(start, min(start + chunk_size, page_count))
+            for start in range(0, page_count, chunk_size)]
+
+
+def get_default_cache() -> ExtractionCache:
+    """
+    Get the process-wide extraction cache for the current extractor version.
+    
+    Returns:
+        ExtractionCache configured from the environment
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ExtractionCache.from_environment(EXTRACTOR_VERSION)
+    return _default_cache
 
 
 class PDFExtractor:
     """Extracts text from PDF files."""
     
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, workers: Optional[int] = None,
+                 engines: Sequence[str] = ENGINES):
         """
         Initialize PDF extractor.
         
         Args:
             pdf_path: Path to the PDF file
+            workers: Number of worker processes for page extraction.
+                     None or 1 extracts pages serially in this process.
+            engines: Engine names in the order each page tries them;
+                     ('pdfplumber', 'pypdf2') tries pdfplumber first
         """
+        unknown = set(engines) - set(ENGINES)
+        if not engines or unknown:
+            raise ValueError(f"Unknown extraction engines: {sorted(unknown)}")
         self.pdf_path = pdf_path
+        self.workers = workers
+        self.engines = tuple(engines)
+        self.partial = False
+        self.page_stats: List[PageStat] = []
+        self.page_count: Optional[int] = None
     
-    def extract_text_pdfplumber(self) -> str:
+    def _pdfplumber_page_texts(self) -> List[Optional[str]]:
         """
-        Extract text using pdfplumber (better for complex layouts).
+        Extract the text of every page with pdfplumber.
+        
+        Pages are split across a process pool when more than one worker
+        is configured; the result is always in page order.
         
         Returns:
-            Extracted text as string
+            List of page texts in page order
         """
-        text = []
-        try:
+        if not self.workers or self.workers <= 1:
             with pdfplumber.open(self.pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text.append(page_text)
-            return '\n'.join(text)
+                return [page.extract_text() for page in pdf.pages]
+        
+        with pdfplumber.open(self.pdf_path) as pdf:
+            page_count = len(pdf.pages)
+        
+        ranges = _split_pages(page_count, self.workers)
+        if len(ranges) <= 1:
+            return _pdfplumber_page_range(self.pdf_path, 0, page_count)
+        
+        page_texts = []
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(ranges))) as executor:
+            futures = [executor.submit(_pdfplumber_page_range, self.pdf_path, start, stop)
+                       for start, stop in ranges]
+            for future in futures:
+                page_texts.extend(future.result())
+        return page_texts
+    
+    def extract_pages_pdfplumber(self) -> List[str]:
+        """
+        Extract the text of each page using pdfplumber.
+        
+        Returns:
+            List of page texts in page order ('' for pages without text)
+        """
+        try:
+            return [page_text or '' for page_text in self._pdfplumber_page_texts()]
         except Exception as e:
             print(f"Error extracting with pdfplumber: {e}")
-            return ""
+            return []
     
-    def extract_text_pypdf2(self) -> str:
+    def extract_pages_pypdf2(self) -> List[str]:
         """
-        Extract text using PyPDF2 (fallback method).
+        Extract the text of each page using PyPDF2.
         
         Returns:
-            Extracted text as string
+            List of page texts in page order ('' for pages without text)
         """
-        text = []
         try:
             with open(self.pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text.append(page_text)
-            return '\n'.join(text)
+                return [page.extract_text() or '' for page in pdf_reader.pages]
         except Exception as e:
             print(f"Error extracting with PyPDF2: {e}")
-            return ""
+            return []
+    
+    def extract_text_pdfplumber(self) -> str:
+        """
+        Extract text using pdfplumber (better for complex layouts).
+        
+        Returns:
+            Extracted text as string
+        """
+        return join_pages(self.extract_pages_pdfplumber())
+    
+    def extract_text_pypdf2(self) -> str:
+        """
+        Extract text using PyPDF2 (fallback method).
+        
+        Returns:
+            Extracted text as string
+        """
+        return join_pages(self.extract_pages_pypdf2())
+    
+    def _page_ranges(self) -> List[Tuple[int, int]]:
+        """Count the pages and split them into ranges for the workers."""
+        with _PageSource(self.pdf_path) as source:
+            self.page_count = source.page_count(self.engines)
+        return _split_pages(self.page_count, self.workers)
+    
+    def _selected_pages(self) -> Iterator[Tuple[Optional[str], PageStat]]:
+        """Yield (page text, PageStat) for each page in page order."""
+        if self.workers and self.workers > 1:
+            ranges = self._page_ranges()
+            with ProcessPoolExecutor(max_workers=max(1, min(self.workers, len(ranges)))) as executor:
+                futures = [executor.submit(_select_page_range, self.pdf_path, start, stop, self.engines)
+                           for start, stop in ranges]
+                for future in futures:
+                    yield from future.result()
+            return
+        
+        with _PageSource(self.pdf_path) as source:
+            self.page_count = source.page_count(self.engines)
+            for index in range(self.page_count):
+                yield _select_page(source, index, self.engines)
+    
+    def iter_pages(self) -> Iterator[str]:
+        """
+        Yield page texts as they are extracted.
+        
+        Each page is tried with the configured engines in order and
+        escalated to the next engine only when page_text_ok() rejects
+        the text. The engine used for each page is recorded in
+        ``page_stats``. If a page could not be read by any engine,
+        ``partial`` is set and the page is yielded as ''. ``page_count``
+        is set once the document was opened.
+        
+        Yields:
+            Page texts in page order
+        """
+        self.partial = False
+        self.page_count = None
+        del self.page_stats[:]
+        try:
+            for page_text, stat in self._selected_pages():
+                self.page_stats.append(stat)
+                if page_text is None:
+                    self.partial = True
+                    page_text = ''
+                yield page_text
+        except Exception as e:
+            print(f"Error extracting PDF: {e}")
+            self.partial = True
+    
+    def extract_pages(self) -> List[str]:
+        """
+        Extract per-page text using the best available engine for each page.
+        
+        Returns:
+            List of page texts in page order
+        """
+        return list(self.iter_pages())
+    
+    def engine_summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarise which engines handled the pages of the last extraction.
+        
+        Returns:
+            Dictionary mapping engine name to page count and seconds spent
+        """
+        return summarize_page_stats(self.page_stats)
     
     def extract_text(self) -> str:
         """
@@ -63,25 +404,172 @@ class PDFExtractor:
         Returns:
             Extracted text as string
         """
-        # Try pdfplumber first (better results)
-        text = self.extract_text_pdfplumber()
+        return join_pages(self.extract_pages())
+
+
+def summarize_page_stats(page_stats: List[PageStat]) -> Dict[str, Dict[str, float]]:
+    """
+    Summarise per-page extraction statistics by engine.
+    
+    Args:
+        page_stats: List of PageStat objects
+        
+    Returns:
+        Dictionary mapping engine name to page count and seconds spent
+    """
+    summary = {}
+    for stat in page_stats:
+        entry = summary.setdefault(stat.engine, {'pages': 0, 'seconds': 0.0})
+        entry['pages'] += 1
+        entry['seconds'] += stat.seconds
+    return summary
+
+
+def join_pages(pages: List[str]) -> str:
+    """
+    Join page texts into one document, skipping pages without text.
+    
+    Args:
+        pages: List of page texts in page order
+        
+    Returns:
+        Document text as string
+    """
+    return '\n'.join(page_text for page_text in pages if page_text)
+
+
+def iter_pdf_pages(pdf_path: str, use_cache: bool = True, engines: Sequence[str] = ENGINES,
+                   page_stats: Optional[List[PageStat]] = None,
+                   report: Optional[ExtractionReport] = None) -> Iterator[str]:
+    """
+    Convenience generator yielding the page texts of a PDF file.
+    
+    Cached files are replayed from the extraction cache; otherwise pages
+    are streamed from the PDF and cached once the whole file was read.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        use_cache: Whether to read and populate the extraction cache
+        engines: Engine names in the order each page tries them
+        page_stats: Optional list that receives a PageStat per parsed page
+        report: Optional ExtractionReport; ``pages`` is set with the
+                first page, ``partial`` once the pages are exhausted if
+                some could not be read
         
-        # Fallback to PyPDF2 if pdfplumber fails
-        if not text or len(text.strip()) < 50:
-            text = self.extract_text_pypdf2()
+    Yields:
+        Page texts in page order
+    """
+    extractor = PDFExtractor(pdf_path, engines=engines)
+    if page_stats is not None:
+        extractor.page_stats = page_stats
+    try:
+        for page_text in _cached_pages(extractor, use_cache):
+            if report is not None:
+                report.pages = extractor.page_count
+            yield page_text
+    finally:
+        if report is not None:
+            report.partial = extractor.partial
+
+
+def _cached_pages(extractor: PDFExtractor, use_cache: bool) -> Iterator[str]:
+    """Yield the pages of iter_pdf_pages(), through the cache if enabled."""
+    pdf_path = extractor.pdf_path
+    if not use_cache:
+        yield from extractor.iter_pages()
+        return
+    
+    cache = get_default_cache()
+    try:
+        key = cache.key_for(pdf_path, variant=','.join(extractor.engines))
+    except OSError as e:
+        print(f"Error reading PDF for cache lookup: {e}")
+        yield from extractor.iter_pages()
+        return
+    
+    pages = cache.get(key)
+    if pages is not None:
+        extractor.page_count = len(pages)
+        yield from pages
+        return
+    
+    pages = []
+    for page_text in extractor.iter_pages():
+        pages.append(page_text)
+        yield page_text
+    
+    if any(pages) and not extractor.partial:
+        cache.put(key, pages, source=os.path.abspath(pdf_path))
+
+
+def extract_pdf_pages(pdf_path: str, workers: Optional[int] = None, use_cache: bool = True,
+                      engines: Sequence[str] = ENGINES,
+                      page_stats: Optional[List[PageStat]] = None,
+                      report: Optional[ExtractionReport] = None) -> List[str]:
+    """
+    Convenience function to extract the page texts of a PDF file.
+    
+    Unchanged files are served from the extraction cache without
+    parsing the PDF again.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        workers: Number of worker processes for page extraction
+        use_cache: Whether to read and populate the extraction cache
+        engines: Engine names in the order each page tries them
+        page_stats: Optional list that receives a PageStat per parsed page
+        report: Optional ExtractionReport; receives the page count and
+                whether some pages could not be read
         
-        return text
+    Returns:
+        List of page texts in page order
+    """
+    extractor = PDFExtractor(pdf_path, workers=workers, engines=engines)
+    if page_stats is not None:
+        extractor.page_stats = page_stats
+    pages = _extracted_pages(extractor, use_cache)
+    if report is not None:
+        report.partial = extractor.partial
+        report.pages = extractor.page_count
+    return pages
+
+
+def _extracted_pages(extractor: PDFExtractor, use_cache: bool) -> List[str]:
+    """Extract the pages of extract_pdf_pages(), through the cache if enabled."""
+    pdf_path = extractor.pdf_path
+    if not use_cache:
+        return extractor.extract_pages()
+    
+    cache = get_default_cache()
+    try:
+        key = cache.key_for(pdf_path, variant=','.join(extractor.engines))
+    except OSError as e:
+        print(f"Error reading PDF for cache lookup: {e}")
+        return extractor.extract_pages()
+    
+    pages = cache.get(key)
+    if pages is not None:
+        extractor.page_count = len(pages)
+    else:
+        pages = extractor.extract_pages()
+        # A run that lost pages is not cached, so the next run tries again
+        if any(pages) and not extractor.partial:
+            cache.put(key, pages, source=os.path.abspath(pdf_path))
+    
+    return pages
 
 
-def extract_pdf_text(pdf_path: str) -> str:
+def extract_pdf_text(pdf_path: str, workers: Optional[int] = None,
+                     use_cache: bool = True) -> str:
     """
     Convenience function to extract text from a PDF file.
     
     Args:
         pdf_path: Path to the PDF file
+        workers: Number of worker processes for page extraction
+        use_cache: Whether to read and populate the extraction cache
         
     Returns:
         Extracted text as string
     """
-    extractor = PDFExtractor(pdf_path)
-    return extractor.extract_text()
+    return join_pages(extract_pdf_pages(pdf_path, workers=workers, use_cache=use_cache))
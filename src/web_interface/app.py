@@ -1,8 +1,37 @@
 """Flask web application for TilbudsFinder."""
 
+import math
 import os
-from flask import Flask, render_template, request, jsonify
-from src.database import db, Market, Offer, init_db
+from datetime import date
+from functools import partial
+from flask import (Flask, Response, current_app, make_response, render_template, request,
+                   jsonify, stream_with_context, url_for)
+from src.database import (MAX_PER_PAGE, SaveStats, archive_expired_offers, configure_database,
+                          count_rows, db, decode_cursor, get_market_registry,
+                          get_suggestion_index, init_db, iter_row_batches, keyset_page,
+                          offer_history_query, offer_row_to_dict, offers_query, paginate_rows,
+                          save_offers)
+from src.database.generation import current_generation
+from src.database.suggest import DEFAULT_SUGGESTIONS
+from src.ingestion import JobQueue, QueueFull
+from src.web_interface.cache import ResponseCache, response_etag
+from src.web_interface.compression import (MIN_COMPRESS_SIZE, StaticFiles, compress,
+                                           compress_stream, is_compressible, negotiate_encoding)
+from src.web_interface.export import EXPORT_FORMATS, csv_chunks, ndjson_chunks
+
+# Keys in app.extensions holding the app's ResponseCache, StaticFiles and JobQueue
+RESPONSE_CACHE_KEY = 'response_cache'
+STATIC_FILES_KEY = 'static_files'
+JOB_QUEUE_KEY = 'ingest_jobs'
+
+# Seconds a client is asked to wait before resubmitting to a full job queue
+QUEUE_FULL_RETRY_AFTER = 30
+
+# Most suggestions /api/suggest returns, whatever limit asks for
+MAX_SUGGESTIONS = 20
+
+# Static URLs carry a content hash (?v=...), so a cached copy never goes stale
+STATIC_MAX_AGE = 365 * 24 * 3600
 
 
 def create_app():
@@ -21,18 +50,211 @@ def create_app():
     # Use absolute path for database - place it in the project root
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
     db_path = os.path.join(project_root, 'tilbudsfinder.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{db_path}')
+    configure_database(app, os.environ.get('DATABASE_URL', f'sqlite:///{db_path}'))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
     # Initialize database
     init_db(app)
+    app.extensions[RESPONSE_CACHE_KEY] = ResponseCache.from_environment()
+    app.extensions[STATIC_FILES_KEY] = StaticFiles(app.static_folder)
+    app.extensions[JOB_QUEUE_KEY] = JobQueue.from_environment(partial(run_ingest_job, app))
+    app.url_defaults(add_static_version)
+    app.after_request(compress_response)
     
     return app
 
 
+def warm_suggestion_index(app):
+    """
+    Build the suggestion index before the first /api/suggest request.
+    
+    Only worth it when starting the server; scripts that create the app
+    never ask for suggestions, and the first request builds the index
+    anyway.
+    
+    Args:
+        app: Flask application about to serve requests
+    """
+    with app.app_context():
+        get_suggestion_index().sync(current_generation())
+
+
+def run_ingest_job(app, job):
+    """
+    Extract and save the offers of a flyer; runs on a job queue worker.
+    
+    Pages are streamed into the NLP step and saved one by one, and the
+    job's page count advances as each page is saved. The offers are
+    committed together once the whole flyer was read. If some pages could
+    not be read, the offers of the others are still committed and the
+    result's ``partial`` flag is set.
+    
+    Args:
+        app: Flask application whose database the offers are saved to
+        job: IngestJob to run; its progress and result are updated
+        
+    Raises:
+        ValueError: If no text could be extracted from the PDF
+    """
+    from src.pdf_processor import ExtractionReport, iter_pdf_pages
+    from src.nlp_processor import iter_offer_batches
+    
+    with app.app_context():
+        market = get_market_registry().get_or_create(job.market_name)
+        
+        char_count = 0
+        extracted = 0
+        save_stats = SaveStats()
+        report = ExtractionReport()
+        
+        def counted(pages):
+            nonlocal char_count
+            for page_text in pages:
+                # Known with the first page, from the PDF or the extraction cache
+                job.pages_total = report.pages
+                char_count += len(page_text)
+                yield page_text
+        
+        try:
+            pages = iter_pdf_pages(job.pdf_path, report=report)
+            for page_offers in iter_offer_batches(counted(pages), job.market_name):
+                save_offers(market, page_offers, commit=False, stats=save_stats)
+                extracted += len(page_offers)
+                job.pages_done += 1
+            if not char_count:
+                raise ValueError('Failed to extract text from PDF')
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        job.result = {
+            'offers_extracted': extracted,
+            'offers_saved': save_stats.rows,
+            'offers_inserted': save_stats.inserted,
+            'offers_updated': save_stats.updated,
+            'offers_skipped': save_stats.skipped,
+            'rows_per_second': round(save_stats.rows_per_second),
+            'offers_archived': archive_expired_offers(),
+            'partial': report.partial
+        }
+        # Merge the new products here instead of in the next suggest request
+        get_suggestion_index().sync(current_generation())
+
+
+def add_static_version(endpoint, values):
+    """Add the content hash of a static file to its URL, e.g. app.js?v=3f2a..."""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = current_app.extensions[STATIC_FILES_KEY].version(values['filename'])
+        if version:
+            values['v'] = version
+
+
+def compress_response(response):
+    """
+    Set cache headers on static files and compress text responses.
+    
+    Static files are served from precompressed variants. API responses
+    from cached_response() arrive compressed already.
+    """
+    static = request.endpoint == 'static'
+    if static and response.status_code in (200, 304):
+        filename = request.view_args['filename']
+        if request.args.get('v') == current_app.extensions[STATIC_FILES_KEY].version(filename):
+            response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+        else:
+            # Unversioned URL: revalidate with the ETag on every use
+            response.headers['Cache-Control'] = 'no-cache'
+    
+    # Static files are streamed from disk; they are replaced by a cached variant
+    if (request.method != 'GET' or response.status_code != 200
+            or (response.is_streamed and not static)
+            or 'Content-Encoding' in response.headers or not is_compressible(response.mimetype)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    
+    if static:
+        data = current_app.extensions[STATIC_FILES_KEY].compressed(filename, encoding)
+        if data is None:
+            return response
+        response.direct_passthrough = False
+    else:
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return response
+        data = compress(data, encoding)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # The compressed body is a different representation of the same resource
+    if response.get_etag()[0]:
+        response.set_etag(response.get_etag()[0], weak=True)
+    return response
+
+
 app = create_app()
 
 
+def _flag(name: str) -> bool:
+    """Read a boolean query parameter such as include_history=1."""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def cached_response(key, build):
+    """
+    Serve a JSON response from the response cache, building it on a miss.
+    
+    Entries are tied to the data generation, which every ingest commit
+    bumps, so a cached body is never older than the last ingest. The ETag
+    is derived from the generation and the key as well; a client that
+    sends it back in If-None-Match gets a 304 without a body. Bodies are
+    compressed for the client's encoding and cached compressed. Only
+    successful responses are cached.
+    
+    Args:
+        key: Hashable tuple of the normalized request parameters
+        build: Function returning the response
+        
+    Returns:
+        Flask response with an X-Cache header of HIT or MISS
+    """
+    generation = current_generation()
+    get_market_registry().sync(generation)
+    cache = current_app.extensions[RESPONSE_CACHE_KEY]
+    etag = response_etag(generation, key)
+    
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.headers['X-Cache'] = 'HIT'
+    else:
+        # Entries are stored per encoding, compressed for it
+        encoding = negotiate_encoding(request.accept_encodings)
+        body = cache.get(key + (encoding,), generation)
+        if body is not None:
+            response = current_app.response_class(body, mimetype='application/json')
+            response.headers['X-Cache'] = 'HIT'
+        else:
+            response = make_response(build())
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            if encoding:
+                body = compress(body, encoding)
+                response.set_data(body)
+            cache.put(key + (encoding,), generation, body)
+            response.headers['X-Cache'] = 'MISS'
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(etag, weak=True)
+    # Browsers keep the body but ask again every time; unchanged data costs a 304
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
 @app.route('/')
 def index():
     """Main page showing all offers."""
@@ -49,123 +271,190 @@ def get_offers():
         - market: Filter by market name
         - sort: Sort by 'price_asc' or 'price_desc'
         - page: Page number (default 1)
-        - per_page: Items per page (default 20)
+        - per_page: Items per page (default 20, at most MAX_PER_PAGE)
+        - include_history: '1' or 'true' to include archived offers
+        - cursor: next_cursor of the previous page, or empty for the first
+          page; switches from page numbers to keyset pagination
+        - include_total: '1' or 'true' to count all matches in cursor mode
     """
-    # Get query parameters
+    # Get query parameters, normalized so equivalent requests share a cache entry
     search_term = request.args.get('search', '').strip()
     market_filter = request.args.get('market', '')
-    sort_order = request.args.get('sort', 'price_asc')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    # Build query
-    query = Offer.query
+    sort_order = 'price_desc' if request.args.get('sort') == 'price_desc' else 'price_asc'
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), MAX_PER_PAGE)
+    include_history = _flag('include_history')
+    cursor = request.args.get('cursor')
+    if cursor is None:
+        page = max(request.args.get('page', 1, type=int), 1)
+        include_total = True
+    else:
+        page = None
+        include_total = _flag('include_total')
     
-    # Apply search filter
-    if search_term:
-        query = query.filter(Offer.product_name.ilike(f'%{search_term}%'))
-    
-    # Apply market filter
-    if market_filter:
-        market = Market.query.filter_by(name=market_filter).first()
-        if market:
-            query = query.filter_by(market_id=market.id)
-    
-    # Apply sorting
-    if sort_order == 'price_desc':
-        query = query.order_by(Offer.price.desc())
-    else:  # Default to ascending
-        query = query.order_by(Offer.price.asc())
+    # Offers drop out of the listing when they end, without a new data
+    # generation, so the date is part of the key and of the ETag
+    key = ('offers', search_term, market_filter, sort_order, per_page, include_history,
+           cursor, page, include_total, date.today().isoformat())
+    return cached_response(key, lambda: _list_offers(search_term, market_filter, sort_order,
+                                                     per_page, include_history, cursor, page,
+                                                     include_total))
+
+
+def _list_offers(search_term, market_filter, sort_order, per_page, include_history,
+                 cursor, page, include_total):
+    """Build the /api/offers response from normalized parameters."""
+    listing = offer_history_query if include_history else offers_query
     
-    # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Seek past the previous page instead of skipping rows with OFFSET
+        rows, next_cursor = keyset_page(
+            listing(search_term, market_filter, sort_order, after=after), per_page)
+        total = None
+        if include_total:
+            total = count_rows(listing(search_term, market_filter, sort_order))
+        return jsonify({
+            'offers': [offer_row_to_dict(row) for row in rows],
+            'next_cursor': next_cursor,
+            'total': total,
+            'per_page': per_page
+        })
     
-    # Convert to dictionary
-    offers = [offer.to_dict() for offer in pagination.items]
+    # Paginate; the rows are plain tuples with the market name joined in
+    rows, total = paginate_rows(listing(search_term, market_filter, sort_order), page, per_page)
+    offers = [offer_row_to_dict(row) for row in rows]
+    pages = math.ceil(total / per_page)
     
     return jsonify({
         'offers': offers,
-        'total': pagination.total,
+        'total': total,
         'page': page,
         'per_page': per_page,
-        'pages': pagination.pages
+        'pages': pages
     })
 
 
+@app.route('/api/offers/export')
+def export_offers():
+    """
+    API endpoint streaming every matching offer, for bulk downloads.
+    
+    The rows are read from a server-side cursor and written out batch by
+    batch, so memory use does not grow with the number of offers.
+    
+    Query parameters:
+        - format: 'ndjson' (default) or 'csv'
+        - search, market, sort, include_history: as for /api/offers
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format; use {' or '.join(EXPORT_FORMATS)}"}), 400
+    search_term = request.args.get('search', '').strip()
+    market_filter = request.args.get('market', '')
+    sort_order = 'price_desc' if request.args.get('sort') == 'price_desc' else 'price_asc'
+    listing = offer_history_query if _flag('include_history') else offers_query
+    
+    batches = iter_row_batches(listing(search_term, market_filter, sort_order))
+    chunks = ndjson_chunks(batches) if export_format == 'ndjson' else csv_chunks(batches)
+    body = (chunk.encode('utf-8') for chunk in chunks)
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is not None:
+        body = compress_stream(body, encoding)
+    
+    # The request context keeps the database session open while streaming
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Disposition'] = f'attachment; filename=offers.{export_format}'
+    return response
+
+
 @app.route('/api/markets')
 def get_markets():
     """API endpoint to get all markets."""
-    markets = Market.query.all()
-    return jsonify({
-        'markets': [market.to_dict() for market in markets]
-    })
+    return cached_response(('markets',), lambda: jsonify({
+        'markets': [market.to_dict() for market in get_market_registry().markets()]
+    }))
+
+
+@app.route('/api/suggest')
+def suggest_products():
+    """
+    API endpoint with product names for the search box as the user types.
+    
+    Answered from the in-memory suggestion index; the only query reads
+    the data generation to see whether the index is current.
+    
+    Query parameters:
+        - q: Typed search input
+        - limit: Number of suggestions (default 8, at most MAX_SUGGESTIONS)
+    """
+    prefix = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', DEFAULT_SUGGESTIONS, type=int), 1), MAX_SUGGESTIONS)
+    index = get_suggestion_index()
+    index.sync(current_generation())
+    return jsonify({'query': prefix, 'suggestions': index.suggest(prefix, limit)})
+
+
+@app.route('/api/cache-stats')
+def get_cache_stats():
+    """API endpoint with the hit and miss counters of the response cache."""
+    return jsonify(current_app.extensions[RESPONSE_CACHE_KEY].stats())
 
 
 @app.route('/api/process-pdf', methods=['POST'])
 def process_pdf():
     """
-    API endpoint to process a PDF file and extract offers.
+    API endpoint to queue a PDF file for offer extraction.
+    
+    The flyer is processed by a background worker; the response carries
+    the job id to poll at /api/jobs/<id>.
     
     Expected JSON body:
         - pdf_path: Path to PDF file
         - market_name: Name of the market
     """
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     pdf_path = data.get('pdf_path')
     market_name = data.get('market_name')
     
     if not pdf_path or not market_name:
         return jsonify({'error': 'Missing pdf_path or market_name'}), 400
+    if not os.path.isfile(pdf_path):
+        return jsonify({'error': 'PDF file not found'}), 400
     
     try:
-        # Import processing modules
-        from src.pdf_processor import extract_pdf_text
-        from src.nlp_processor import extract_offers
-        
-        # Extract text from PDF
-        text = extract_pdf_text(pdf_path)
-        
-        if not text:
-            return jsonify({'error': 'Failed to extract text from PDF'}), 400
-        
-        # Extract offers from text
-        offers_data = extract_offers(text, market_name)
-        
-        # Get or create market
-        market = Market.query.filter_by(name=market_name).first()
-        if not market:
-            market = Market(name=market_name)
-            db.session.add(market)
-            db.session.commit()
-        
-        # Save offers to database
-        saved_count = 0
-        for offer_data in offers_data:
-            offer = Offer(
-                market_id=market.id,
-                product_name=offer_data['product_name'],
-                price=offer_data['price'],
-                unit=offer_data.get('unit'),
-                valid_from=offer_data.get('valid_from'),
-                valid_to=offer_data.get('valid_to')
-            )
-            db.session.add(offer)
-            saved_count += 1
-        
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'offers_extracted': len(offers_data),
-            'offers_saved': saved_count
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        job = current_app.extensions[JOB_QUEUE_KEY].submit(pdf_path, market_name)
+    except QueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(QUEUE_FULL_RETRY_AFTER)
+        return response
+    
+    status_url = url_for('get_job', job_id=job.id)
+    response = jsonify({'job_id': job.id, 'status': job.status, 'status_url': status_url})
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """API endpoint with the status and page progress of an ingestion job."""
+    job = current_app.extensions[JOB_QUEUE_KEY].get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
 
 
 if __name__ == '__main__':
     # Debug mode should only be enabled in development
     # Set FLASK_DEBUG=1 environment variable to enable debug mode
     debug_mode = os.environ.get('FLASK_DEBUG', '0') == '1'
+    warm_suggestion_index(app)
     app.run(debug=debug_mode, host='0.0.0.0', port=5000)
@@ -0,0 +1,163 @@
+"""In-memory cache of API response bodies."""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+DEFAULT_MAX_MB = 16
+
+# Rough per-entry cost of the key, the dictionary slot and the bytes object
+ENTRY_OVERHEAD = 200
+
+# Part of every ETag; bump it when the JSON layout of a response changes so
+# clients do not keep bodies in the old layout
+ETAG_VERSION = 1
+
+
+def response_etag(generation: int, key: Hashable) -> str:
+    """
+    Derive the ETag of a cached response.
+    
+    A response is fully determined by the data generation and its
+    normalized request parameters, so the ETag can be computed, and a
+    conditional request answered, without building the body.
+    
+    Args:
+        generation: Data generation the response is built from
+        key: Normalized request parameters
+        
+    Returns:
+        ETag value without quotes
+    """
+    return hashlib.blake2b(repr((ETAG_VERSION, generation, key)).encode(),
+                           digest_size=12).hexdigest()
+
+
+class ResponseCache:
+    """
+    Keeps response bodies in memory, keyed by request parameters.
+    
+    Every entry belongs to the data generation it was built from. Seeing a
+    newer generation empties the cache, since all older bodies may be out
+    of date. Within a generation the least recently used entries are
+    evicted once the bodies exceed the size cap.
+    """
+    
+    def __init__(self, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        """
+        Initialize the response cache.
+        
+        Args:
+            max_bytes: Size cap for all entries together
+        """
+        self.max_bytes = max_bytes
+        self.generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_environment(cls) -> 'ResponseCache':
+        """
+        Create a cache configured by environment variables.
+        
+        TILBUDSFINDER_RESPONSE_CACHE_MB sets the size cap in megabytes;
+        0 turns the cache off.
+        
+        Returns:
+            Configured ResponseCache
+        """
+        max_mb = float(os.environ.get('TILBUDSFINDER_RESPONSE_CACHE_MB', DEFAULT_MAX_MB))
+        return cls(max_bytes=int(max_mb * 1024 * 1024))
+    
+    @staticmethod
+    def _size(body: bytes) -> int:
+        """Bytes an entry counts against the cap."""
+        return len(body) + ENTRY_OVERHEAD
+    
+    def _advance(self, generation: int) -> bool:
+        """Drop all entries if the generation is newer; False if it is older."""
+        if self.generation is None or generation > self.generation:
+            self.generation = generation
+            self._entries.clear()
+            self._bytes = 0
+        return generation == self.generation
+    
+    def get(self, key: Hashable, generation: int) -> Optional[bytes]:
+        """
+        Look up a response body.
+        
+        Args:
+            key: Normalized request parameters
+            generation: Data generation the request reads
+            
+        Returns:
+            Cached body, or None on a miss
+        """
+        with self._lock:
+            body = self._entries.get(key) if self._advance(generation) else None
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+    
+    def put(self, key: Hashable, generation: int, body: bytes):
+        """
+        Store a response body, evicting the least recently used ones if needed.
+        
+        Bodies built from an older generation than the cache holds, and
+        bodies larger than the whole cache, are not stored.
+        
+        Args:
+            key: Normalized request parameters
+            generation: Data generation the body was built from
+            body: Response body
+        """
+        size = self._size(body)
+        with self._lock:
+            if size > self.max_bytes or not self._advance(generation):
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            self._entries[key] = body
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+                self.evictions += 1
+    
+    def clear(self):
+        """Remove all entries; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the counters for sizing the cache.
+        
+        Returns:
+            Dictionary of hits, misses, hit rate, evictions, entries, bytes
+            in use, the size cap and the cached generation
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'generation': self.generation
+            }
@@ -0,0 +1,186 @@
+"""Response compression and versioned static files."""
+
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is used without it
+    brotli = None
+
+
+# Responses smaller than this are sent as they are; compression would
+# save less than the extra header costs
+MIN_COMPRESS_SIZE = 500
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+    'image/svg+xml',
+}
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Static files are precompressed at the highest level once per version
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+
+def negotiate_encoding(accept_encodings) -> Optional[str]:
+    """
+    Pick the content encoding for a client.
+    
+    Args:
+        accept_encodings: request.accept_encodings of the client
+        
+    Returns:
+        'br' if brotli is installed and accepted, else 'gzip' if accepted,
+        else None
+    """
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """
+    Compress a response body.
+    
+    Args:
+        data: Uncompressed body
+        encoding: 'br' or 'gzip'
+        best: Use the slow maximum level, for content compressed only once
+        
+    Returns:
+        Compressed body
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=STATIC_BROTLI_QUALITY if best else BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, STATIC_GZIP_LEVEL if best else GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Compress a streamed response body chunk by chunk.
+    
+    Each chunk is flushed through the compressor, so the client receives
+    data as it is produced and only one chunk is held at a time.
+    
+    Args:
+        chunks: Uncompressed body chunks
+        encoding: 'br' or 'gzip'
+        
+    Yields:
+        Compressed body chunks
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    # wbits=31 writes the gzip header and trailer
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def is_compressible(mimetype: str) -> bool:
+    """Check whether responses of a type are worth compressing."""
+    return mimetype in COMPRESSIBLE_MIMETYPES
+
+
+class StaticFiles:
+    """
+    Content versions and precompressed variants of the files in a static folder.
+    
+    Both are computed on first use and kept until the file's modification
+    time or size changes, so a file edited during development is picked
+    up on the next request.
+    """
+    
+    def __init__(self, static_folder: str):
+        """
+        Initialize the static file cache.
+        
+        Args:
+            static_folder: Directory the app serves static files from
+        """
+        self.static_folder = static_folder
+        self._lock = threading.Lock()
+        self._versions: Dict[Tuple[str, int, int], str] = {}
+        self._variants: Dict[Tuple[str, int, int, str], bytes] = {}
+    
+    def _stat(self, filename: str) -> Optional[Tuple[str, int, int]]:
+        """Get the path, modification time and size of a static file."""
+        path = safe_join(self.static_folder, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return path, stat.st_mtime_ns, stat.st_size
+    
+    def version(self, filename: str) -> Optional[str]:
+        """
+        Get a short hash of a static file's content for cache-busting URLs.
+        
+        Args:
+            filename: Path relative to the static folder
+            
+        Returns:
+            Hex digest, or None if the file does not exist
+        """
+        key = self._stat(filename)
+        if key is None:
+            return None
+        version = self._versions.get(key)
+        if version is None:
+            with open(key[0], 'rb') as f:
+                version = hashlib.sha256(f.read()).hexdigest()[:12]
+            with self._lock:
+                self._versions[key] = version
+        return version
+    
+    def compressed(self, filename: str, encoding: str) -> Optional[bytes]:
+        """
+        Get a static file compressed with an encoding.
+        
+        Args:
+            filename: Path relative to the static folder
+            encoding: 'br' or 'gzip'
+            
+        Returns:
+            Compressed content, or None if the file does not exist
+        """
+        stat = self._stat(filename)
+        if stat is None:
+            return None
+        key = stat + (encoding,)
+        data = self._variants.get(key)
+        if data is None:
+            with open(stat[0], 'rb') as f:
+                data = compress(f.read(), encoding, best=True)
+            with self._lock:
+                # Drop the variants of older versions of the file
+                for old_key in [old for old in self._variants if old[0] == stat[0]
+                                and old[1:3] != stat[1:3]]:
+                    del self._variants[old_key]
+                self._variants[key] = data
+        return data
@@ -0,0 +1,59 @@
+"""Formatting of streamed offer exports."""
+
+import csv
+import io
+import json
+from typing import Iterable, Iterator, Sequence
+
+from sqlalchemy.engine import Row
+
+from src.database import offer_row_to_dict
+
+
+# Columns of a CSV export, in the key order of offer_row_to_dict()
+EXPORT_FIELDS = ('id', 'market', 'product_name', 'price', 'unit', 'valid_from', 'valid_to',
+                 'extracted_at', 'archived')
+
+# Mimetype of each export format
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def ndjson_chunks(batches: Iterable[Sequence[Row]]) -> Iterator[str]:
+    """
+    Format listing rows as newline-delimited JSON, one offer per line.
+    
+    Args:
+        batches: Row batches from iter_row_batches()
+        
+    Yields:
+        One chunk of lines per batch
+    """
+    for batch in batches:
+        yield ''.join(json.dumps(offer_row_to_dict(row), ensure_ascii=False) + '\n'
+                      for row in batch)
+
+
+def csv_chunks(batches: Iterable[Sequence[Row]]) -> Iterator[str]:
+    """
+    Format listing rows as CSV with a header line.
+    
+    Args:
+        batches: Row batches from iter_row_batches()
+        
+    Yields:
+        The header line, then one chunk of lines per batch
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(offer_row_to_dict(row) for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue()
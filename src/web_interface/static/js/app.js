@@ -5,6 +5,11 @@ let currentSearch = '';
 let currentMarket = '';
 let currentSort = 'price_asc';
 
+// Suggestions are requested once typing pauses this long
+const SUGGEST_DELAY_MS = 150;
+let suggestTimer = null;
+let suggestController = null;
+
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function() {
     loadMarkets();
@@ -17,6 +22,14 @@ document.addEventListener('DOMContentLoaded', function() {
             handleSearch();
         }
     });
+    document.getElementById('searchInput').addEventListener('input', function(e) {
+        // Picking a suggestion replaces the text instead of typing it
+        if (!(e instanceof InputEvent) || e.inputType === 'insertReplacementText') {
+            handleSearch();
+        } else {
+            scheduleSuggestions();
+        }
+    });
     document.getElementById('marketFilter').addEventListener('change', handleMarketFilter);
     document.getElementById('sortOrder').addEventListener('change', handleSortChange);
 });
@@ -39,6 +52,59 @@ async function loadMarkets() {
     }
 }
 
+// Request suggestions once typing pauses
+function scheduleSuggestions() {
+    clearTimeout(suggestTimer);
+    suggestTimer = setTimeout(loadSuggestions, SUGGEST_DELAY_MS);
+}
+
+// Cancel a scheduled or running suggestion request
+function cancelSuggestions() {
+    clearTimeout(suggestTimer);
+    if (suggestController) {
+        suggestController.abort();
+        suggestController = null;
+    }
+}
+
+// Load product name suggestions for the search box
+async function loadSuggestions() {
+    const query = document.getElementById('searchInput').value.trim();
+    // A response for an older prefix must not replace a newer one
+    cancelSuggestions();
+    if (!query) {
+        displaySuggestions([]);
+        return;
+    }
+    
+    const controller = new AbortController();
+    suggestController = controller;
+    try {
+        const params = new URLSearchParams({ q: query });
+        const response = await fetch(`/api/suggest?${params}`, { signal: controller.signal });
+        const data = await response.json();
+        displaySuggestions(data.suggestions);
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error loading suggestions:', error);
+        }
+    } finally {
+        if (suggestController === controller) {
+            suggestController = null;
+        }
+    }
+}
+
+// Fill the search box's suggestion list
+function displaySuggestions(suggestions) {
+    const options = suggestions.map(suggestion => {
+        const option = document.createElement('option');
+        option.value = suggestion.name;
+        return option;
+    });
+    document.getElementById('searchSuggestions').replaceChildren(...options);
+}
+
 // Load offers with current filters
 async function loadOffers() {
     showLoading(true);
@@ -151,6 +217,7 @@ function displayPagination(currentPage, totalPages) {
 
 // Handle search
 function handleSearch() {
+    cancelSuggestions();
     currentSearch = document.getElementById('searchInput').value;
     currentPage = 1;
     loadOffers();
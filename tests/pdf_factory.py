@@ -0,0 +1,44 @@
+"""Helpers for building small PDF flyers in tests."""
+
+
+def write_sample_pdf(path, pages):
+    """
+    Write a minimal text-only PDF with one page per entry in ``pages``.
+    
+    Args:
+        path: Destination file path
+        pages: List of page texts; lines are separated by newlines
+    """
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'.encode('latin-1'),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    for page_id, text in zip(page_ids, pages):
+        objects.append((
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>'
+        ).encode('latin-1'))
+        commands = []
+        for line_no, line in enumerate(text.split('\n') if text else []):
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            commands.append(f'BT /F1 12 Tf 50 {800 - 16 * line_no} Td ({escaped}) Tj ET')
+        stream = '\n'.join(commands).encode('cp1252')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for object_id, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % object_id + body + b'\nendobj\n'
+    xref_offset = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, xref_offset)
+    
+    with open(path, 'wb') as file:
+        file.write(bytes(output))
@@ -2,13 +2,28 @@
 
 import unittest
 import os
+import shutil
 import sys
+import tempfile
+import threading
 from datetime import datetime, date
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from database import Market, Offer
+from flask import Flask
+
+from sqlalchemy import event, text
+
+from database import (db, Market, Offer, OfferArchive, SaveStats, archive_expired_offers,
+                      configure_database, init_db, offer_history_query, offer_row_to_dict,
+                      offers_query, paginate_rows, product_search_filter, save_offers)
+from database.markets import MarketRegistry, get_market_registry
+from database.migrations import upgrade_schema
+from database.search import match_query
+from database.generation import current_generation
+from database.suggest import get_suggestion_index, normalize_term
+from nlp_processor import OfferBatch
 
 
 class TestDatabaseModels(unittest.TestCase):
@@ -46,5 +61,552 @@ class TestDatabaseModels(unittest.TestCase):
         self.assertIn('Test Product', repr(offer))
 
 
+class TestSaveOffers(unittest.TestCase):
+    """Test cases for saving extracted offers."""
+    
+    def setUp(self):
+        """Set up an in-memory database."""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_db(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+    
+    def tearDown(self):
+        """Drop the database."""
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+    
+    def test_save_offers_from_batch_and_dicts(self):
+        """Test that batches and offer dictionaries are saved alike."""
+        market = Market.query.filter_by(name='Netto').first()
+        offers = [
+            {'market': 'Netto', 'product_name': 'Banan', 'price': 12.5, 'unit': 'kg',
+             'valid_from': datetime(2024, 3, 1), 'valid_to': datetime(2024, 3, 7)},
+            {'market': 'Netto', 'product_name': 'Kaffe', 'price': 35.0, 'unit': None,
+             'valid_from': None, 'valid_to': None},
+        ]
+        self.assertEqual(save_offers(market, OfferBatch.from_dicts(offers)).inserted, 2)
+        
+        saved = Offer.query.order_by(Offer.id).all()
+        self.assertEqual([(offer.product_name, offer.price, offer.unit) for offer in saved],
+                         [('Banan', 12.5, 'kg'), ('Kaffe', 35.0, None)])
+        self.assertEqual(saved[0].valid_from, date(2024, 3, 1))
+        self.assertEqual(saved[0].valid_to, date(2024, 3, 7))
+        self.assertEqual(saved[0].product_key, 'banan')
+        self.assertIsNotNone(saved[0].extracted_at)
+    
+    def test_save_offers_is_idempotent(self):
+        """Test that saving a flyer again skips or updates instead of duplicating."""
+        market = Market.query.filter_by(name='Netto').first()
+        offers = [
+            {'product_name': 'Banan', 'price': 12.5, 'unit': 'kg',
+             'valid_from': datetime(2024, 3, 1), 'valid_to': datetime(2024, 3, 7)},
+            {'product_name': 'Kaffe', 'price': 35.0},
+            {'product_name': 'Mælk', 'price': 8.0},
+        ]
+        first = save_offers(market, offers)
+        self.assertEqual((first.rows, first.inserted, first.updated, first.skipped), (3, 3, 0, 0))
+        
+        # Same flyer again, with a changed unit, different spacing and case
+        # in a name, a new offer and a new price for an existing product
+        offers[0]['unit'] = 'stk'
+        offers[1]['product_name'] = ' KAFFE '
+        offers.append({'product_name': 'Smør', 'price': 20.0})
+        offers.append({'product_name': 'Mælk', 'price': 7.0})
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            second = save_offers(market, offers, chunk_size=2)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual((second.rows, second.inserted, second.updated, second.skipped),
+                         (5, 2, 2, 1))
+        # The split comes from each statement, not from counting the table
+        self.assertFalse([statement for statement in statements if 'count(' in statement.lower()])
+        
+        self.assertEqual(Offer.query.count(), 5)
+        self.assertEqual(Offer.query.filter_by(product_key='banan').one().unit, 'stk')
+        self.assertEqual(Offer.query.filter_by(product_key='kaffe').one().product_name, ' KAFFE ')
+    
+    def test_repeated_offer_is_saved_once(self):
+        """Test that an offer printed twice in a flyer is written and counted once."""
+        market = Market.query.filter_by(name='Netto').first()
+        offers = [
+            {'product_name': 'Banan', 'price': 12.5, 'valid_from': datetime(2024, 3, 1)},
+            {'product_name': 'Kaffe', 'price': 35.0},
+            {'product_name': 'Banan', 'price': 12.5, 'valid_from': date(2024, 3, 1)},
+            {'product_name': 'Mælk', 'price': 8.0},
+            {'product_name': ' KAFFE', 'price': 35.0, 'unit': 'pk'},
+        ]
+        stats = save_offers(market, offers)
+        self.assertEqual((stats.rows, stats.inserted, stats.updated, stats.skipped), (3, 3, 0, 0))
+        
+        # The last copy of a repeated offer wins
+        kaffe = Offer.query.filter_by(product_key='kaffe').one()
+        self.assertEqual((kaffe.product_name, kaffe.unit), (' KAFFE', 'pk'))
+    
+    def test_upgrade_removes_duplicates(self):
+        """Test that an old database gets product keys and loses duplicate offers."""
+        market = Market.query.filter_by(name='Netto').first()
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP INDEX uq_offers_natural_key'))
+            connection.execute(text('ALTER TABLE offers DROP COLUMN product_key'))
+            for name in ['Banan', 'banan', 'Kaffe']:
+                connection.execute(
+                    text('INSERT INTO offers (market_id, product_name, price) VALUES (:m, :n, 10)'),
+                    {'m': market.id, 'n': name})
+        
+        upgrade_schema(db.engine)
+        
+        saved = Offer.query.order_by(Offer.id).all()
+        self.assertEqual([(offer.product_name, offer.product_key) for offer in saved],
+                         [('Banan', 'banan'), ('Kaffe', 'kaffe')])
+        self.assertEqual(save_offers(market, [{'product_name': 'BANAN', 'price': 10}]).updated, 1)
+    
+    def test_save_offers_rolls_back_on_error(self):
+        """Test that a failing chunk leaves no rows of the call behind."""
+        market = Market.query.filter_by(name='Netto').first()
+        offers = [{'product_name': 'Banan', 'price': 12.5},
+                  {'product_name': None, 'price': 8.0}]
+        with self.assertRaises(Exception):
+            save_offers(market, offers, chunk_size=1)
+        self.assertEqual(Offer.query.count(), 0)
+    
+    def test_save_offers_without_commit(self):
+        """Test that commit=False leaves the transaction to the caller."""
+        market = Market.query.filter_by(name='Netto').first()
+        stats = SaveStats()
+        save_offers(market, [{'product_name': 'Banan', 'price': 12.5}], commit=False, stats=stats)
+        save_offers(market, [{'product_name': 'Kaffe', 'price': 35.0}], commit=False, stats=stats)
+        self.assertEqual(stats.rows, 2)
+        db.session.rollback()
+        self.assertEqual(Offer.query.count(), 0)
+
+
+class TestProductSearch(unittest.TestCase):
+    """Test cases for the full-text product search."""
+    
+    def setUp(self):
+        """Set up an in-memory database with a few offers."""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_db(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        
+        market = Market.query.filter_by(name='Netto').first()
+        save_offers(market, [
+            {'product_name': 'Økologisk letmælk 1 l', 'price': 12.0},
+            {'product_name': 'Blåbær 125 g', 'price': 15.0},
+            {'product_name': 'Crème fraîche 18%', 'price': 9.5},
+            {'product_name': 'Æbler Pink Lady', 'price': 20.0},
+        ])
+    
+    def tearDown(self):
+        """Drop the database."""
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+    
+    def search(self, term):
+        """Return the sorted product names matching a search term."""
+        return sorted(offer.product_name for offer in
+                      Offer.query.filter(product_search_filter(term)).all())
+    
+    def test_index_is_used(self):
+        """Test that SQLite databases get the FTS index."""
+        self.assertTrue(self.app.extensions['offers_fts'])
+        self.assertEqual(match_query('Blåbær 125'), '"Blaabaer"* "125"*')
+    
+    def test_prefix_and_danish_folding(self):
+        """Test prefix matches with æ, ø and å typed either way."""
+        self.assertEqual(self.search('blå'), ['Blåbær 125 g'])
+        self.assertEqual(self.search('blaabaer'), ['Blåbær 125 g'])
+        self.assertEqual(self.search('økolo'), ['Økologisk letmælk 1 l'])
+        self.assertEqual(self.search('OEKOLOGISK letm'), ['Økologisk letmælk 1 l'])
+        self.assertEqual(self.search('æbl'), ['Æbler Pink Lady'])
+        self.assertEqual(self.search('creme fraiche'), ['Crème fraîche 18%'])
+        self.assertEqual(self.search('pink banan'), [])
+    
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the triggers keep the index in sync with the offers table."""
+        offer = Offer.query.filter_by(price=15.0).first()
+        offer.product_name = 'Hindbær 125 g'
+        db.session.commit()
+        self.assertEqual(self.search('blåbær'), [])
+        self.assertEqual(self.search('hindbaer'), ['Hindbær 125 g'])
+        
+        db.session.delete(offer)
+        db.session.commit()
+        self.assertEqual(self.search('hindbær'), [])
+    
+    def test_ilike_fallback(self):
+        """Test the substring search used without an FTS index."""
+        self.app.extensions['offers_fts'] = False
+        self.assertEqual(self.search('mælk'), ['Økologisk letmælk 1 l'])
+        self.assertEqual(self.search('18%'), ['Crème fraîche 18%'])
+
+
+class TestArchiveOffers(unittest.TestCase):
+    """Test cases for moving expired offers to the archive."""
+    
+    def setUp(self):
+        """Set up an in-memory database with current and expired offers."""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_db(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        
+        self.market = Market.query.filter_by(name='Netto').first()
+        self.expired = {'product_name': 'Banan', 'price': 12.5,
+                        'valid_from': datetime(2024, 3, 1), 'valid_to': datetime(2024, 3, 7)}
+        save_offers(self.market, [
+            self.expired,
+            {'product_name': 'Kaffe', 'price': 35.0,
+             'valid_from': datetime(2024, 3, 8), 'valid_to': datetime(2024, 3, 14)},
+            {'product_name': 'Mælk', 'price': 8.0},
+            {'product_name': 'Smør', 'price': 20.0},
+        ])
+        # Undated offers stay until they are a week old
+        db.session.execute(Offer.__table__.update()
+                           .where(Offer.product_name == 'Smør')
+                           .values(extracted_at=datetime(2024, 3, 1)))
+        db.session.execute(Offer.__table__.update()
+                           .where(Offer.product_name == 'Mælk')
+                           .values(extracted_at=datetime(2024, 3, 9)))
+        db.session.commit()
+    
+    def tearDown(self):
+        """Drop the database."""
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+    
+    def test_moves_expired_offers(self):
+        """Test that ended and old undated offers move in batches."""
+        self.assertEqual(archive_expired_offers(today=date(2024, 3, 10), chunk_size=1), 2)
+        
+        self.assertEqual(sorted(offer.product_name for offer in Offer.query.all()),
+                         ['Kaffe', 'Mælk'])
+        archived = OfferArchive.query.order_by(OfferArchive.offer_id).all()
+        self.assertEqual([(offer.product_name, offer.product_key, offer.valid_to)
+                          for offer in archived],
+                         [('Banan', 'banan', date(2024, 3, 7)), ('Smør', 'smør', None)])
+        self.assertIsNotNone(archived[0].archived_at)
+        
+        # Archived offers leave the search index with the offers table
+        self.assertEqual(Offer.query.filter(product_search_filter('banan')).count(), 0)
+        self.assertEqual(archive_expired_offers(today=date(2024, 3, 10)), 0)
+    
+    def test_listing_skips_ended_offers_before_archiving(self):
+        """Test that offers leave the listing when they end, not when they are archived."""
+        rows, total = paginate_rows(offers_query(today=date(2024, 3, 10)), 1, 20)
+        self.assertEqual([row.product_name for row in rows], ['Mælk', 'Smør', 'Kaffe'])
+        self.assertEqual(total, 3)
+    
+        # The last day of an offer still lists it
+        rows, _ = paginate_rows(offers_query(today=date(2024, 3, 7)), 1, 20)
+        self.assertIn('Banan', [row.product_name for row in rows])
+    
+    def test_reingested_offer_is_archived_once(self):
+        """Test that an expired flyer ingested again does not duplicate the archive."""
+        archive_expired_offers(today=date(2024, 3, 10))
+        self.assertEqual(save_offers(self.market, [self.expired]).inserted, 1)
+        
+        self.assertEqual(archive_expired_offers(today=date(2024, 3, 10)), 1)
+        self.assertEqual(OfferArchive.query.count(), 2)
+        self.assertEqual(Offer.query.count(), 2)
+    
+    def test_history_query(self):
+        """Test that the history listing includes archived offers."""
+        archive_expired_offers(today=date(2024, 3, 10))
+        
+        rows, total = paginate_rows(offer_history_query('', 'Netto', 'price_desc'), 1, 3)
+        self.assertEqual(total, 4)
+        offers = [offer_row_to_dict(row) for row in rows]
+        self.assertEqual([(offer['product_name'], offer['archived']) for offer in offers],
+                         [('Kaffe', False), ('Smør', True), ('Banan', True)])
+        self.assertEqual(offers[2]['market'], 'Netto')
+        self.assertEqual(offers[2]['valid_to'], '2024-03-07')
+        
+        rows, total = paginate_rows(offer_history_query('ban', '', 'price_asc'), 1, 20)
+        self.assertEqual([row.product_name for row in rows], ['Banan'])
+        self.assertEqual(paginate_rows(offers_query('ban'), 1, 20), ([], 0))
+
+
+class TestMarketRegistry(unittest.TestCase):
+    """Test cases for the cached market registry."""
+    
+    def setUp(self):
+        """Set up an in-memory database with the default markets."""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_db(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self.count_statement)
+    
+    def tearDown(self):
+        """Drop the database."""
+        event.remove(db.engine, 'before_cursor_execute', self.count_statement)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+    
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def test_lookups_are_cached(self):
+        """Test that the table is read once for any number of lookups."""
+        registry = get_market_registry()
+        netto = Market.query.filter_by(name='Netto').one()
+        self.statements.clear()
+        
+        for _ in range(10):
+            self.assertEqual(registry.id_for('Netto'), netto.id)
+            self.assertIsNone(registry.id_for(''))
+        self.assertEqual(registry.names(), ['Bilka', 'Rema 1000', 'Netto', 'Føtex', 'Lidl'])
+        self.assertEqual(len(self.statements), 1)
+    
+    def test_get_or_create(self):
+        """Test that a created market is visible at once and created only once."""
+        registry = get_market_registry()
+        self.assertIsNone(registry.id_for('Meny'))
+        
+        meny = registry.get_or_create('Meny')
+        self.assertEqual(registry.id_for('Meny'), meny.id)
+        self.assertEqual(registry.get_or_create('Meny'), meny)
+        self.assertEqual(Market.query.filter_by(name='Meny').count(), 1)
+        self.assertEqual(save_offers(meny, [{'product_name': 'Banan', 'price': 2.0}]).inserted, 1)
+    
+    def test_markets_created_elsewhere(self):
+        """Test that markets another process adds show up after a reload."""
+        registry = MarketRegistry(ttl=0)
+        registry.markets()
+        db.session.add(Market(name='Meny'))
+        db.session.commit()
+        self.assertIn('Meny', registry.names())
+        
+        registry = get_market_registry()
+        registry.markets()
+        db.session.add(Market(name='Spar'))
+        db.session.commit()
+        # Unknown names are looked up again only every few seconds
+        self.assertIsNone(registry.id_for('Spar'))
+        registry.invalidate()
+        self.assertIsNotNone(registry.id_for('Spar'))
+
+
+class TestSuggestionIndex(unittest.TestCase):
+    """Test cases for the in-memory product name index."""
+    
+    def setUp(self):
+        """Set up an in-memory database with a few products."""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_db(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        
+        self.netto = Market.query.filter_by(name='Netto').one()
+        save_offers(self.netto, [
+            {'product_name': 'Arla Letmælk', 'price': 10.0},
+            {'product_name': 'Arla letmælk', 'price': 11.0},
+            {'product_name': 'Arla Smør', 'price': 20.0},
+            {'product_name': 'Økologisk letmælk', 'price': 12.0,
+             'valid_to': date(2024, 3, 7)},
+        ])
+        self.index = get_suggestion_index()
+        self.index.sync(current_generation())
+    
+    def tearDown(self):
+        """Drop the database."""
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+    
+    def names(self, prefix):
+        """Get the names suggested for a prefix."""
+        return [suggestion['name'] for suggestion in self.index.suggest(prefix)]
+    
+    def test_normalize_term(self):
+        """Test that case, diacritics and spacing are ignored and æ, ø, å spelled out."""
+        self.assertEqual(normalize_term('  Økologisk  LETMÆLK, 1 L'), 'oekologisk letmaelk 1 l')
+        self.assertEqual(normalize_term('Crème fraîche'), 'creme fraiche')
+    
+    def test_prefixes_of_every_word_ranked_by_frequency(self):
+        """Test that names match from any word and frequent products come first."""
+        self.assertEqual(self.index.suggest('arla'), [{'name': 'Arla Letmælk', 'count': 2},
+                                                      {'name': 'Arla Smør', 'count': 1}])
+        self.assertEqual(self.names('LETMÆ'), ['Arla Letmælk', 'Økologisk letmælk'])
+        self.assertEqual(self.names('oeko'), ['Økologisk letmælk'])
+        self.assertEqual(self.names('arla s'), ['Arla Smør'])
+        self.assertEqual(self.names('mælk'), [])
+        self.assertEqual(self.names(' '), [])
+        self.assertEqual(len(self.index.suggest('a', limit=1)), 1)
+    
+    def test_ingest_and_archive_update_the_index(self):
+        """Test that new offers are merged in and archived offers removed."""
+        save_offers(self.netto, [{'product_name': 'Arla Smør', 'price': price}
+                                 for price in (21.0, 22.0)] + [{'product_name': 'Banan',
+                                                               'price': 2.0}])
+        self.assertEqual(self.names('arla'), ['Arla Letmælk', 'Arla Smør'])
+        self.index.sync(current_generation())
+        self.assertEqual(self.index.suggest('arla')[0], {'name': 'Arla Smør', 'count': 3})
+        self.assertEqual(self.names('ban'), ['Banan'])
+        
+        self.assertEqual(archive_expired_offers(today=date(2024, 3, 8)), 1)
+        self.index.sync(current_generation())
+        self.assertEqual(self.names('letm'), ['Arla Letmælk'])
+        self.assertEqual(self.index.suggest('arla')[0], {'name': 'Arla Smør', 'count': 3})
+    
+    def test_ingest_after_archiving_the_newest_offer(self):
+        """Test that an offer saved after the newest one was archived is not missed."""
+        save_offers(self.netto, [{'product_name': 'Banan', 'price': 2.0,
+                                  'valid_to': date(2024, 3, 7)}])
+        self.index.sync(current_generation())
+        banan_id = Offer.query.filter_by(product_key='banan').one().id
+        
+        self.assertEqual(archive_expired_offers(today=date(2024, 3, 8)), 2)
+        save_offers(self.netto, [{'product_name': 'Kaffe', 'price': 35.0}])
+        self.assertGreater(Offer.query.filter_by(product_key='kaffe').one().id, banan_id)
+        self.index.sync(current_generation())
+        self.assertEqual(self.names('ban'), [])
+        self.assertEqual(self.names('kaf'), ['Kaffe'])
+
+
+class TestProductionProfile(unittest.TestCase):
+    """Test cases for the production database profile."""
+    
+    def setUp(self):
+        """Set up a file database with the production profile."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        configure_database(self.app, f"sqlite:///{os.path.join(self.tmp_dir, 'offers.db')}",
+                           profile='production')
+        init_db(self.app)
+    
+    def tearDown(self):
+        """Dispose of the engine and remove the database."""
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_unknown_profile(self):
+        """Test that a misspelt profile is rejected."""
+        with self.assertRaises(ValueError):
+            configure_database(Flask(__name__), 'sqlite://', profile='prod')
+    
+    def test_pragmas_are_set(self):
+        """Test that every connection uses WAL and the tuned pragmas."""
+        with self.app.app_context():
+            pragma = lambda name: db.session.execute(text(f'PRAGMA {name}')).scalar()
+            self.assertEqual(pragma('journal_mode'), 'wal')
+            self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+            self.assertEqual(pragma('busy_timeout'), 5000)
+            self.assertEqual(pragma('cache_size'), -64000)
+    
+    def test_reads_do_not_block_during_ingest(self):
+        """Test that offer queries read the last commit while a bulk ingest writes."""
+        ingest_open = threading.Event()
+        release = threading.Event()
+        errors = []
+        
+        def ingest():
+            with self.app.app_context():
+                try:
+                    market = Market.query.filter_by(name='Netto').first()
+                    # A small page cache makes the ingest spill pages before
+                    # commit, which with a rollback journal takes the
+                    # exclusive lock and locks readers out
+                    db.session.execute(text('PRAGMA cache_size = 100'))
+                    rows = ({'product_name': f'Vare {index}', 'price': float(index % 97)}
+                            for index in range(20000))
+                    save_offers(market, rows, commit=False)
+                    ingest_open.set()
+                    release.wait(10)
+                    db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    ingest_open.set()
+        
+        writer = threading.Thread(target=ingest)
+        writer.start()
+        try:
+            self.assertTrue(ingest_open.wait(10))
+            with self.app.app_context():
+                # A read that had to wait for the writer fails at once instead
+                db.session.execute(text('PRAGMA busy_timeout = 0'))
+                self.assertEqual(paginate_rows(offers_query('', 'Netto', 'price_asc'), 1, 20),
+                                 ([], 0))
+                db.session.remove()
+        finally:
+            release.set()
+            writer.join()
+        
+        self.assertEqual(errors, [])
+        with self.app.app_context():
+            self.assertEqual(Offer.query.count(), 20000)
+    
+    def test_writers_wait_for_each_other(self):
+        """Test that busy_timeout makes a second writer wait instead of failing."""
+        first_open = threading.Event()
+        release = threading.Event()
+        second_done = threading.Event()
+        errors = []
+        
+        def hold_write():
+            with self.app.app_context():
+                try:
+                    market = Market.query.filter_by(name='Netto').first()
+                    save_offers(market, [{'product_name': 'Banan', 'price': 10.0}], commit=False)
+                    first_open.set()
+                    release.wait(10)
+                    db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    first_open.set()
+        
+        def write():
+            with self.app.app_context():
+                try:
+                    market = Market.query.filter_by(name='Netto').first()
+                    save_offers(market, [{'product_name': 'Kaffe', 'price': 10.0}])
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    second_done.set()
+        
+        first = threading.Thread(target=hold_write)
+        first.start()
+        self.assertTrue(first_open.wait(10))
+        second = threading.Thread(target=write)
+        second.start()
+        try:
+            # Still waiting for the lock, not failed with "database is locked"
+            self.assertFalse(second_done.wait(0.2))
+        finally:
+            release.set()
+            first.join()
+            second.join()
+        
+        self.assertEqual(errors, [])
+        with self.app.app_context():
+            self.assertEqual(sorted(offer.product_name for offer in Offer.query.all()),
+                             ['Banan', 'Kaffe'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+"""Unit tests for batch ingestion."""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ingestion import BatchJob, discover_jobs, read_manifest, run_batch
+from src.ingestion.batch import extract_file
+from src.pdf_processor import ExtractionCache
+import src.pdf_processor.extractor as extractor_module
+from tests.pdf_factory import write_sample_pdf
+
+
+MARKETS = ['Bilka', 'Rema 1000', 'Netto', 'Føtex', 'Lidl']
+
+
+class TestBatchJobs(unittest.TestCase):
+    """Test cases for building batch job lists."""
+    
+    def setUp(self):
+        """Create a directory of empty flyer files."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for filename in ['bilka_uge45.pdf', 'rema1000-uge45.pdf', 'Føtex uge 45.pdf', 'notes.txt']:
+            open(os.path.join(self.tmpdir.name, filename), 'wb').close()
+    
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmpdir.cleanup()
+    
+    def test_discover_jobs_matches_markets(self):
+        """Test that markets are taken from the file names."""
+        jobs = list(discover_jobs(self.tmpdir.name, MARKETS))
+        markets = {os.path.basename(job.pdf_path): job.market_name for job in jobs}
+        self.assertEqual(markets, {
+            'bilka_uge45.pdf': 'Bilka',
+            'rema1000-uge45.pdf': 'Rema 1000',
+            'Føtex uge 45.pdf': 'Føtex',
+        })
+    
+    def test_discover_jobs_market_override(self):
+        """Test that an explicit market applies to every file."""
+        jobs = list(discover_jobs(self.tmpdir.name, [], market_name='Netto'))
+        self.assertEqual(len(jobs), 3)
+        self.assertTrue(all(job.market_name == 'Netto' for job in jobs))
+    
+    def test_discover_jobs_unknown_market(self):
+        """Test that unmatched file names are reported."""
+        with self.assertRaises(ValueError):
+            list(discover_jobs(self.tmpdir.name, ['Bilka']))
+    
+    def test_read_manifest(self):
+        """Test that manifest paths are resolved against the manifest."""
+        manifest = os.path.join(self.tmpdir.name, 'manifest.csv')
+        with open(manifest, 'w', encoding='utf-8') as file:
+            file.write('pdf_path,market_name\nbilka_uge45.pdf,Bilka\n\n# skipped\nsub/netto.pdf, Netto\n')
+        jobs = read_manifest(manifest)
+        self.assertEqual(jobs, [
+            BatchJob(os.path.join(self.tmpdir.name, 'bilka_uge45.pdf'), 'Bilka'),
+            BatchJob(os.path.join(self.tmpdir.name, 'sub/netto.pdf'), 'Netto'),
+        ])
+
+
+class TestRunBatch(unittest.TestCase):
+    """Test cases for the process-pool batch runner."""
+    
+    def setUp(self):
+        """Write sample flyers and isolate the extraction cache."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        cache_dir = os.path.join(self.tmpdir.name, 'cache')
+        patcher = mock.patch.dict(os.environ, {'TILBUDSFINDER_CACHE_DIR': cache_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache_patcher = mock.patch.object(extractor_module, '_default_cache',
+                                          ExtractionCache(cache_dir, version='test'))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        
+        self.jobs = []
+        for index, market in enumerate(['Bilka', 'Netto', 'Lidl']):
+            path = os.path.join(self.tmpdir.name, f'flyer{index}.pdf')
+            write_sample_pdf(path, [
+                'Gyldig fra 1. november 2024 til 7. november 2024',
+                f'Banan 1 kg 1{index},50 kr\nBrød 1 stk 15 kr',
+            ])
+            self.jobs.append(BatchJob(path, market))
+    
+    def tearDown(self):
+        """Remove the sample flyers."""
+        self.tmpdir.cleanup()
+    
+    def test_results_reach_single_writer(self):
+        """Test that every successful file is saved once in this process."""
+        saved = []
+        missing = BatchJob(os.path.join(self.tmpdir.name, 'missing.pdf'), 'Bilka')
+        results = run_batch(self.jobs + [missing], saved.append, workers=2)
+        
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sorted(result.market_name for result in saved), ['Bilka', 'Lidl', 'Netto'])
+        for result in saved:
+            self.assertEqual(result.pages, 2)
+            self.assertGreater(len(result.offers), 0)
+            self.assertEqual(result.offers[0]['valid_from'].day, 1)
+        failed = [result for result in results if result.error]
+        self.assertEqual([result.pdf_path for result in failed], [missing.pdf_path])
+        self.assertFalse([result for result in saved if result.partial])
+    
+    def test_partial_file_is_flagged(self):
+        """Test that a flyer with an unreadable page keeps its other offers but is flagged."""
+        original = extractor_module._PageSource.extract
+        
+        def unreadable(source, engine, index):
+            if index == 0:
+                raise ValueError('damaged page')
+            return original(source, engine, index)
+        
+        with mock.patch.object(extractor_module._PageSource, 'extract', unreadable):
+            result = extract_file(self.jobs[0])
+        self.assertIsNone(result.error)
+        self.assertTrue(result.partial)
+        self.assertEqual(result.pages, 2)
+        self.assertGreater(len(result.offers), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
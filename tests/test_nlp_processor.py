@@ -2,12 +2,18 @@
 
 import unittest
 import os
+import pickle
 import sys
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from nlp_processor import OfferExtractor
+from dateutil import parser as date_parser
+
+from nlp_processor import (ExtractionStats, OfferBatch, OfferExtractor, extract_offer_batch,
+                           extract_offers, extract_offers_many)
+from nlp_processor.dates import parse_date_match, translate_months
+from nlp_processor.extractor import line_start_offsets, nearest_unit
 
 
 class TestOfferExtractor(unittest.TestCase):
@@ -67,6 +73,138 @@ class TestOfferExtractor(unittest.TestCase):
             self.assertIn('product_name', offer)
             self.assertIn('price', offer)
             self.assertIn('market', offer)
+    
+    def test_scan_overlapping_matches(self):
+        """Test that overlapping prices and units are all reported."""
+        scan = self.extractor.scanner.scan("Banan 1 kg 12,50 kr")
+        self.assertEqual([match.group(0) for match in scan.prices], ['12,50 kr', '50 kr'])
+        self.assertEqual([match.group(0) for match in scan.units], ['1 kg'])
+        self.assertEqual(scan.dates, [])
+    
+    def test_scan_selected_kinds(self):
+        """Test that a scan for some kinds runs only their patterns."""
+        text = "Banan 1 kg 12,50 kr, gyldig 1/3/2024"
+        scan = self.extractor.scanner.scan(text, kinds=('price',))
+        self.assertEqual([match.group(0) for match in scan.prices], ['12,50 kr', '50 kr'])
+        self.assertEqual((scan.units, scan.dates), ([], []))
+        
+        scan = self.extractor.scanner.scan(text, kinds=('unit', 'date'))
+        self.assertEqual(scan.prices, [])
+        self.assertEqual([match.group(0) for match in scan.units], ['1 kg'])
+        self.assertEqual([match.group(0) for match in scan.dates], ['1/3/2024'])
+        
+        with self.assertRaises(ValueError):
+            self.extractor.scanner.scan(text, kinds=('prices',))
+    
+    def test_extract_dates_danish_months(self):
+        """Test date extraction with Danish month names."""
+        dates = self.extractor.extract_dates("Gyldig 1. marts 2024 - 7. MARTS 2024, 3/4/24")
+        self.assertEqual([(date.year, date.month, date.day) for date in dates],
+                         [(2024, 4, 3), (2024, 3, 1), (2024, 3, 7)])
+    
+    def test_date_parser_matches_dateutil(self):
+        """Test that the fast date paths agree with the dateutil fallback."""
+        texts = ["12/06/2024", "12-06-24", "3.4.76", "12. juni 2024", "1 okt 2024",
+                 "7.march2024", "12.06-2024", "31/04/2024", "5. mandag 2024", "1. maj 0024"]
+        for text in texts:
+            match = self.extractor.scanner.scan(text).dates[0]
+            translated = translate_months(match.group(0).lower())
+            try:
+                expected = date_parser.parse(translated, dayfirst=True, fuzzy=True)
+            except (ValueError, OverflowError):
+                expected = None
+            self.assertEqual(parse_date_match(match), expected, text)
+    
+    def test_line_start_offsets(self):
+        """Test that line offsets point at the first character of each line."""
+        text = "Bilka\n\nBanan 12 kr\nMælk 8 kr"
+        lines = text.split('\n')
+        offsets = line_start_offsets(lines)
+        self.assertEqual(len(offsets), len(lines))
+        for offset, line in zip(offsets, lines):
+            self.assertEqual(text[offset:offset + len(line)], line)
+    
+    def test_product_name_from_price_line(self):
+        """Test that each price is paired with the text on its own line."""
+        text = "Banan 12 kr\nMælk letmælk 8 kr\n\nKaffe 400 g 35 kr"
+        offers = self.extractor.extract_offers_from_text(text, "Netto")
+        self.assertEqual([offer['product_name'] for offer in offers],
+                         ['Banan', 'Mælk letmælk', 'Kaffe 400 g'])
+    
+    def test_nearest_unit_window(self):
+        """Test nearest-unit lookup at the window edges and on ties."""
+        units = [{'unit': 'kg', 'position': 10}, {'unit': 'stk', 'position': 30},
+                 {'unit': 'l', 'position': 250}]
+        positions = [unit['position'] for unit in units]
+        self.assertEqual(nearest_unit(units, positions, 20, 100), 'kg')
+        self.assertEqual(nearest_unit(units, positions, 28, 100), 'stk')
+        self.assertEqual(nearest_unit(units, positions, 129, 100), 'stk')
+        self.assertIsNone(nearest_unit(units, positions, 130, 100))
+        self.assertEqual(nearest_unit(units, positions, 151, 100), 'l')
+        self.assertIsNone(nearest_unit([], [], 10, 100))
+    
+    def test_iter_offers_matches_single_text(self):
+        """Test that a one-page stream yields the same offers as plain text."""
+        text = "Gyldig fra 1. november 2024 til 7. november 2024\nBanan 1 kg 12,50 kr"
+        pages = list(self.extractor.iter_offers_from_pages([text], "Bilka"))
+        self.assertEqual(pages, [self.extractor.extract_offers_from_text(text, "Bilka")])
+    
+    def test_iter_offers_carries_validity(self):
+        """Test that validity dates on the front page apply to later pages."""
+        pages = [
+            "Gyldig fra 1. november 2024 til 7. november 2024",
+            "Banan 1 kg 12,50 kr",
+            "Brød 1 stk 15 kr",
+        ]
+        page_offers = list(self.extractor.iter_offers_from_pages(iter(pages), "Bilka"))
+        self.assertEqual(len(page_offers), 3)
+        self.assertEqual(page_offers[0], [])
+        for offers in page_offers[1:]:
+            self.assertGreater(len(offers), 0)
+            for offer in offers:
+                self.assertEqual(offer['valid_from'].day, 1)
+                self.assertEqual(offer['valid_to'].day, 7)
+    
+    def test_extract_offers_many_keeps_order(self):
+        """Test that batch extraction matches single calls, in input order."""
+        documents = [(f"Banan {index} stk {index + 10},50 kr\nMælk 1 l 8 kr", market)
+                     for index, market in enumerate(['Netto', 'Bilka', 'Føtex'] * 4)]
+        expected = [extract_offers(text, market) for text, market in documents]
+        
+        for workers in (None, 2):
+            stats = ExtractionStats()
+            results = list(extract_offers_many(iter(documents), workers=workers, stats=stats))
+            self.assertEqual(results, expected)
+            self.assertEqual(stats.documents, len(documents))
+            self.assertEqual(stats.offers, sum(len(offers) for offers in expected))
+            self.assertGreater(stats.documents_per_second, 0)
+    
+    def test_offer_batch_matches_dicts(self):
+        """Test that an OfferBatch holds the same offers as the dictionaries."""
+        text = "Gyldig 1. marts 2024 - 7. marts 2024\nBanan 1 kg 12,50 kr\nMælk letmælk 8 kr"
+        batch = extract_offer_batch(text, "Netto")
+        expected = extract_offers(text, "Netto")
+        
+        self.assertEqual(len(batch), len(expected))
+        self.assertEqual(batch.to_dicts(), expected)
+        self.assertEqual([row.to_dict() for row in batch], expected)
+        self.assertEqual(batch[0]['unit'], 'kg')
+        self.assertEqual(batch[-1]['product_name'], 'Mælk letmælk')
+        self.assertIsNone(batch[0].get('quantity'))
+        self.assertEqual(batch.markets, ['Netto'])
+        self.assertEqual(len(batch.periods), 1)
+        self.assertEqual(pickle.loads(pickle.dumps(batch)).to_dicts(), expected)
+    
+    def test_offer_batch_extend_remaps_codes(self):
+        """Test that extending a batch keeps units and markets of both batches."""
+        first = OfferBatch.from_dicts([
+            {'market': 'Netto', 'product_name': 'Banan', 'price': 12.5, 'unit': 'kg'}])
+        second = OfferBatch.from_dicts([
+            {'market': 'Bilka', 'product_name': 'Mælk', 'price': 8.0, 'unit': 'l'},
+            {'market': 'Netto', 'product_name': 'Kaffe', 'price': 35.0}])
+        first.extend(second)
+        self.assertEqual([(row.market, row.unit) for row in first],
+                         [('Netto', 'kg'), ('Bilka', 'l'), ('Netto', None)])
 
 
 if __name__ == '__main__':
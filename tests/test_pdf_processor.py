@@ -3,11 +3,27 @@
 import unittest
 import os
 import sys
+import tempfile
+import time
+from unittest import mock
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from pdf_processor import PDFExtractor
+from pdf_processor import (PDFExtractor, ExtractionCache, ExtractionReport, extract_pdf_pages,
+                           extract_pdf_text, iter_pdf_pages)
+import pdf_processor.extractor as extractor_module
+from pdf_processor.extractor import page_text_ok
+from tests.pdf_factory import write_sample_pdf
+
+
+SAMPLE_PAGES = [
+    'Bilka Tilbudsavis\nGyldig fra 1. november 2024 til 7. november 2024',
+    'Banan 1 kg 12,50 kr\nMælk 1 l 8 kr',
+    '',
+    'Brød 1 stk 15,00 kr\nKaffe 400 g 35,- kr',
+    'Æbler 6 stk 20 kr',
+]
 
 
 class TestPDFExtractor(unittest.TestCase):
@@ -25,5 +41,258 @@ class TestPDFExtractor(unittest.TestCase):
         self.assertTrue(callable(extractor.extract_text))
 
 
+class TestParallelExtraction(unittest.TestCase):
+    """Test cases for process-pool page extraction."""
+    
+    def setUp(self):
+        """Write a multi-page sample flyer."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmpdir.name, 'flyer.pdf')
+        write_sample_pdf(self.pdf_path, SAMPLE_PAGES * 3)
+    
+    def tearDown(self):
+        """Remove the sample flyer."""
+        self.tmpdir.cleanup()
+    
+    def test_parallel_matches_serial(self):
+        """Test that parallel extraction yields exactly the serial text."""
+        serial = PDFExtractor(self.pdf_path).extract_text_pdfplumber()
+        parallel = PDFExtractor(self.pdf_path, workers=3).extract_text_pdfplumber()
+        self.assertIn('Banan 1 kg 12,50 kr', serial)
+        self.assertEqual(parallel, serial)
+    
+    def test_parallel_single_page(self):
+        """Test that a one-page document works with several workers."""
+        path = os.path.join(self.tmpdir.name, 'single.pdf')
+        write_sample_pdf(path, ['Banan 1 kg 12,50 kr'])
+        text = PDFExtractor(path, workers=4).extract_text_pdfplumber()
+        self.assertEqual(text, 'Banan 1 kg 12,50 kr')
+
+
+class TestPageStreaming(unittest.TestCase):
+    """Test cases for the page generator API."""
+    
+    def setUp(self):
+        """Create a temporary directory for sample flyers."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        """Remove the sample flyers."""
+        self.tmpdir.cleanup()
+    
+    def _write(self, pages):
+        path = os.path.join(self.tmpdir.name, 'flyer.pdf')
+        write_sample_pdf(path, pages)
+        return path
+    
+    def test_iter_pages_matches_extract_pages(self):
+        """Test that streamed pages equal the eagerly extracted pages."""
+        extractor = PDFExtractor(self._write(SAMPLE_PAGES))
+        self.assertEqual(list(extractor.iter_pages()), extractor.extract_pages())
+        self.assertFalse(extractor.partial)
+    
+    def test_iter_pages_short_document(self):
+        """Test that documents below the fallback threshold still match."""
+        extractor = PDFExtractor(self._write(['Banan 12 kr', '']))
+        self.assertEqual(list(extractor.iter_pages()), extractor.extract_pages())
+    
+    def test_iter_pages_is_lazy(self):
+        """Test that the first page is available before the rest is parsed."""
+        extractor = PDFExtractor(self._write(SAMPLE_PAGES))
+        pages = extractor.iter_pages()
+        self.assertEqual(next(pages), SAMPLE_PAGES[0])
+        self.assertEqual(len(extractor.page_stats), 1)
+        pages.close()
+    
+    def test_iter_pdf_pages_populates_cache(self):
+        """Test that a fully streamed file is served from cache afterwards."""
+        path = self._write(SAMPLE_PAGES)
+        cache = ExtractionCache(os.path.join(self.tmpdir.name, 'cache'), version='test')
+        with mock.patch.object(extractor_module, '_default_cache', cache):
+            streamed = list(iter_pdf_pages(path))
+            with mock.patch.object(PDFExtractor, 'iter_pages') as iter_pages:
+                self.assertEqual(list(iter_pdf_pages(path)), streamed)
+            iter_pages.assert_not_called()
+    
+    def test_partial_extraction_is_not_cached(self):
+        """Test that pages lost to an unreadable page are extracted again next time."""
+        path = self._write(SAMPLE_PAGES)
+        cache = ExtractionCache(os.path.join(self.tmpdir.name, 'cache'), version='test')
+        original = extractor_module._PageSource.extract
+        
+        def unreadable(source, engine, index):
+            if index == 1:
+                raise ValueError('damaged page')
+            return original(source, engine, index)
+        
+        with mock.patch.object(extractor_module, '_default_cache', cache):
+            page_stats = []
+            with mock.patch.object(extractor_module._PageSource, 'extract', unreadable):
+                pages = extract_pdf_pages(path, page_stats=page_stats)
+            self.assertEqual(pages[1], '')
+            self.assertEqual(len(page_stats), len(SAMPLE_PAGES))
+            self.assertEqual(extract_pdf_pages(path), SAMPLE_PAGES)
+    
+    def test_report_flags_partial_extraction(self):
+        """Test that callers learn about unreadable pages from the report."""
+        path = self._write(SAMPLE_PAGES)
+        cache = ExtractionCache(os.path.join(self.tmpdir.name, 'cache'), version='test')
+        original = extractor_module._PageSource.extract
+        
+        def unreadable(source, engine, index):
+            if index == 1:
+                raise ValueError('damaged page')
+            return original(source, engine, index)
+        
+        with mock.patch.object(extractor_module, '_default_cache', cache):
+            with mock.patch.object(extractor_module._PageSource, 'extract', unreadable):
+                streamed = ExtractionReport()
+                self.assertEqual(len(list(iter_pdf_pages(path, report=streamed))),
+                                 len(SAMPLE_PAGES))
+                self.assertTrue(streamed.partial)
+                self.assertEqual(streamed.pages, len(SAMPLE_PAGES))
+                extracted = ExtractionReport()
+                extract_pdf_pages(path, report=extracted)
+                self.assertTrue(extracted.partial)
+            
+            complete = ExtractionReport(partial=True)
+            list(iter_pdf_pages(path, report=complete))
+            self.assertFalse(complete.partial)
+            # Only complete extractions are cached, so a cache hit is complete too
+            cached = ExtractionReport(partial=True)
+            extract_pdf_pages(path, report=cached)
+            self.assertFalse(cached.partial)
+            self.assertEqual(cached.pages, len(SAMPLE_PAGES))
+
+
+class TestEngineSelection(unittest.TestCase):
+    """Test cases for per-page extraction engine selection."""
+    
+    def setUp(self):
+        """Write a sample flyer."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmpdir.name, 'flyer.pdf')
+        write_sample_pdf(self.pdf_path, SAMPLE_PAGES)
+    
+    def tearDown(self):
+        """Remove the sample flyer."""
+        self.tmpdir.cleanup()
+    
+    def test_page_text_ok(self):
+        """Test the page quality heuristic."""
+        self.assertTrue(page_text_ok('Banan 1 kg 12,50 kr\nMælk 1 l 8 kr'))
+        self.assertFalse(page_text_ok(''))
+        self.assertFalse(page_text_ok('12 kr'))
+        self.assertFalse(page_text_ok('BananMælkBrødKaffeÆblerSmør'))
+        self.assertFalse(page_text_ok('\ufffd\ufffd\ufffd Banan \ufffd\ufffd\ufffd\ufffd\ufffd kr'))
+    
+    def test_cheap_engine_handles_good_pages(self):
+        """Test that good pages never reach pdfplumber."""
+        extractor = PDFExtractor(self.pdf_path)
+        pages = extractor.extract_pages()
+        self.assertEqual(pages[1], SAMPLE_PAGES[1])
+        self.assertEqual(extractor.page_stats[1].engine, 'pypdf2')
+        self.assertEqual(extractor.page_stats[1].attempts, 1)
+        self.assertEqual(extractor.page_stats[2].attempts, 2)
+        self.assertEqual(sum(entry['pages'] for entry in extractor.engine_summary().values()),
+                         len(SAMPLE_PAGES))
+    
+    def test_escalates_bad_pages(self):
+        """Test that a page rejected by the heuristic is retried with pdfplumber."""
+        original = extractor_module._PageSource.extract
+        
+        def garbled(source, engine, index):
+            if engine == 'pypdf2' and index == 1:
+                return 'BananMælk'
+            return original(source, engine, index)
+        
+        with mock.patch.object(extractor_module._PageSource, 'extract', garbled):
+            extractor = PDFExtractor(self.pdf_path)
+            pages = extractor.extract_pages()
+        self.assertEqual(pages[1], SAMPLE_PAGES[1])
+        self.assertEqual(extractor.page_stats[1].engine, 'pdfplumber')
+        self.assertEqual(extractor.page_stats[0].engine, 'pypdf2')
+    
+    def test_reverse_order(self):
+        """Test that pdfplumber can be configured as the first engine."""
+        extractor = PDFExtractor(self.pdf_path, engines=('pdfplumber', 'pypdf2'))
+        extractor.extract_pages()
+        self.assertEqual(extractor.page_stats[0].engine, 'pdfplumber')
+    
+    def test_parallel_records_engines(self):
+        """Test that worker processes report engines in page order."""
+        serial = PDFExtractor(self.pdf_path)
+        parallel = PDFExtractor(self.pdf_path, workers=2)
+        self.assertEqual(parallel.extract_pages(), serial.extract_pages())
+        self.assertEqual([stat.engine for stat in parallel.page_stats],
+                         [stat.engine for stat in serial.page_stats])
+    
+    def test_unknown_engine(self):
+        """Test that unknown engine names are rejected."""
+        with self.assertRaises(ValueError):
+            PDFExtractor(self.pdf_path, engines=('ocr',))
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test cases for the on-disk extraction cache."""
+    
+    def setUp(self):
+        """Create a sample flyer and an isolated cache directory."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmpdir.name, 'flyer.pdf')
+        write_sample_pdf(self.pdf_path, SAMPLE_PAGES)
+        self.cache = ExtractionCache(os.path.join(self.tmpdir.name, 'cache'), version='test')
+        patcher = mock.patch.object(extractor_module, '_default_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        """Remove the temporary files."""
+        self.tmpdir.cleanup()
+    
+    def test_unchanged_file_skips_parsing(self):
+        """Test that a second extraction of the same file is served from cache."""
+        first = extract_pdf_text(self.pdf_path)
+        with mock.patch.object(PDFExtractor, 'extract_pages') as extract_pages:
+            second = extract_pdf_text(self.pdf_path)
+        extract_pages.assert_not_called()
+        self.assertEqual(second, first)
+        self.assertEqual(first, PDFExtractor(self.pdf_path).extract_text())
+    
+    def test_changed_file_is_parsed_again(self):
+        """Test that editing the file invalidates its cache entry."""
+        extract_pdf_text(self.pdf_path)
+        write_sample_pdf(self.pdf_path, ['Kaffe 400 g 35 kr'])
+        self.assertEqual(extract_pdf_text(self.pdf_path), 'Kaffe 400 g 35 kr')
+    
+    def test_version_is_part_of_key(self):
+        """Test that a different extractor version yields a different key."""
+        other = ExtractionCache(self.cache.cache_dir, version='other')
+        self.assertNotEqual(self.cache.key_for(self.pdf_path), other.key_for(self.pdf_path))
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        self.cache.put('old', ['a' * 100])
+        self.cache.put('new', ['b' * 100])
+        past = time.time() - 60
+        os.utime(self.cache._entry_path('new'), (past, past))
+        os.utime(self.cache._entry_path('old'), (past - 60, past - 60))
+        self.assertIsNotNone(self.cache.get('old'))
+        
+        self.cache.max_bytes = self.cache.total_size() + 50
+        self.cache.put('newest', ['c' * 100])
+        self.assertIsNone(self.cache.get('new'))
+        self.assertEqual(self.cache.get('old'), ['a' * 100])
+        self.assertEqual(self.cache.get('newest'), ['c' * 100])
+    
+    def test_purge(self):
+        """Test that purge removes entries."""
+        self.cache.put('one', ['x'])
+        self.cache.put('two', ['y'])
+        self.assertEqual(self.cache.purge(older_than_days=1), 0)
+        self.assertEqual(self.cache.purge(), 2)
+        self.assertEqual(self.cache.entries(), [])
+
+
 if __name__ == '__main__':
     unittest.main()
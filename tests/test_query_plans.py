@@ -0,0 +1,114 @@
+"""Query plan tests for the offer listing queries."""
+
+import unittest
+import os
+import re
+import sys
+from datetime import date
+from itertools import product
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask
+from sqlalchemy import func, select, text
+
+from database import db, Market, Offer, init_db, offers_query, save_offers
+from database.archive import expired_filter
+
+
+class TestOfferQueryPlans(unittest.TestCase):
+    """Check that /api/offers queries are answered from indexes."""
+    
+    def setUp(self):
+        """Set up an in-memory database with some offers."""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        init_db(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        
+        for market in Market.query.all():
+            save_offers(market, [{'product_name': f'Vare {index}', 'price': float(index % 97)}
+                                 for index in range(200)])
+        db.session.execute(text('ANALYZE'))
+    
+    def tearDown(self):
+        """Drop the database."""
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+    
+    def plan(self, statement):
+        """Get the EXPLAIN QUERY PLAN details of a statement."""
+        sql = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+        return [row[3] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    
+    def assert_reads_offers_through(self, plan, accesses, allow_sort=False):
+        """
+        Fail unless every step that reads the offers table uses one of the accesses.
+        
+        Accesses are plan fragments such as 'INDEX ix_offers_price', which
+        covers both USING INDEX and USING COVERING INDEX, or 'INTEGER
+        PRIMARY KEY' for rowid lookups of FTS hits. A sort is a failure
+        unless allow_sort is set.
+        """
+        reads = [detail for detail in plan if re.search(r'\boffers\b', detail)]
+        self.assertTrue(reads, plan)
+        for detail in reads:
+            self.assertTrue(any(access in detail for access in accesses), plan)
+        if not allow_sort:
+            self.assertFalse([detail for detail in plan if 'TEMP B-TREE' in detail], plan)
+    
+    def test_offer_queries_use_indexes(self):
+        """Test every combination of search, market filter and sort order."""
+        for search, market, sort in product(['', 'vare 1'], ['', 'Netto'],
+                                            ['price_asc', 'price_desc']):
+            with self.subTest(search=search, market=market, sort=sort):
+                query = offers_query(search, market, sort)
+                
+                # The page of items and the total that paginate_rows() runs
+                items = query.limit(20).offset(40)
+                total = select(func.count()).select_from(query.order_by(None).subquery())
+                
+                # The next page of keyset pagination
+                after = {'price': 40.0, 'archived': False, 'id': 100}
+                keyset = offers_query(search, market, sort, after=after).limit(21)
+                
+                if search:
+                    # Search hits are few: offers are looked up by the rowids the
+                    # FTS index returns, or read through the market index and
+                    # matched against it, and sorted afterwards
+                    accesses = ('INTEGER PRIMARY KEY', 'INDEX ix_offers_market_id_price')
+                    for statement in (items, keyset, total):
+                        plan = self.plan(statement)
+                        self.assertTrue(any('offers_fts' in detail for detail in plan), plan)
+                        self.assert_reads_offers_through(plan, accesses, allow_sort=True)
+                    continue
+                
+                # Pages come in price order from the price index, or from the
+                # market and price index for one market
+                page_index = 'ix_offers_market_id_price' if market else 'ix_offers_price'
+                self.assert_reads_offers_through(self.plan(items), (f'INDEX {page_index}',))
+                self.assert_reads_offers_through(self.plan(keyset), (f'INDEX {page_index}',))
+                self.assert_reads_offers_through(
+                    self.plan(total), ('INDEX ix_offers_market_id_price', 'INDEX ix_offers_price'))
+    
+    def test_market_filter_uses_composite_index(self):
+        """Test that a market filter with a price sort reads the composite index."""
+        plan = self.plan(offers_query('', 'Netto', 'price_desc').limit(20))
+        self.assert_reads_offers_through(plan, ('INDEX ix_offers_market_id_price',))
+    
+    def test_archive_selection_uses_index(self):
+        """Test that the archive job finds expired offers through the valid_to index."""
+        # Offers from weeks of flyers, each with its own validity period
+        db.session.execute(text(
+            "UPDATE offers SET valid_to = date('2024-03-14', '+' || (id % 20) || ' days')"))
+        db.session.execute(text('ANALYZE'))
+        
+        plan = self.plan(select(Offer.id).where(expired_filter(date(2024, 3, 10))).limit(1000))
+        self.assert_reads_offers_through(plan, ('INDEX ix_offers_valid_to',))
+
+
+if __name__ == '__main__':
+    unittest.main()
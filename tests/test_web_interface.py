@@ -0,0 +1,431 @@
+"""Unit tests for the web API."""
+
+import csv
+import gzip
+import io
+import json
+import unittest
+import os
+import re
+import sys
+import tempfile
+import threading
+from datetime import date
+from unittest import mock
+
+# Add project root to path and keep the app away from the real database
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from sqlalchemy import event
+
+from src.database import MAX_PER_PAGE, db, Market, Offer, archive_expired_offers, save_offers
+from src.ingestion import JobQueue
+from src.pdf_processor import ExtractionCache
+import src.pdf_processor.extractor as extractor_module
+from src.web_interface.app import JOB_QUEUE_KEY, app
+from src.web_interface.cache import ENTRY_OVERHEAD, ResponseCache
+from tests.pdf_factory import write_sample_pdf
+
+
+class TestOffersEndpoint(unittest.TestCase):
+    """Test cases for /api/offers."""
+    
+    def setUp(self):
+        """Fill the in-memory database with offers from two markets."""
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        
+        for name in ['Netto', 'Lidl']:
+            market = Market.query.filter_by(name=name).first()
+            save_offers(market, [{'product_name': f'{name} vare {index}', 'price': float(index)}
+                                 for index in range(60)])
+        
+        # Load the market registry for the current data generation
+        self.client.get('/api/markets')
+        
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self.count_statement)
+    
+    def tearDown(self):
+        """Remove the offers again."""
+        event.remove(db.engine, 'before_cursor_execute', self.count_statement)
+        db.session.execute(Offer.__table__.delete())
+        db.session.commit()
+        db.session.remove()
+        self.context.pop()
+    
+    def count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def get(self, url):
+        """Fetch a URL and count the SQL statements it runs."""
+        self.statements.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json(), len(self.statements)
+    
+    def test_offer_fields(self):
+        """Test that offers are serialized with their market name."""
+        data, _ = self.get('/api/offers?market=Lidl&sort=price_desc&per_page=2')
+        self.assertEqual(data['total'], 60)
+        self.assertEqual(data['pages'], 30)
+        self.assertEqual([(offer['market'], offer['product_name'], offer['price'])
+                          for offer in data['offers']],
+                         [('Lidl', 'Lidl vare 59', 59.0), ('Lidl', 'Lidl vare 58', 58.0)])
+        self.assertEqual(set(data['offers'][0]),
+                         {'id', 'market', 'product_name', 'price', 'unit', 'valid_from',
+                          'valid_to', 'extracted_at', 'archived'})
+    
+    def test_statement_count_does_not_grow_with_page_size(self):
+        """Test that a page of offers is read without a query per offer."""
+        for filters in ['', 'market=Netto&search=vare&', 'include_history=1&',
+                        'cursor=&include_total=1&']:
+            with self.subTest(filters=filters):
+                counts = []
+                for per_page in [1, 10, 100]:
+                    data, count = self.get(f'/api/offers?{filters}per_page={per_page}')
+                    self.assertEqual(len(data['offers']), min(per_page, data['total']))
+                    counts.append(count)
+                self.assertEqual(len(set(counts)), 1, counts)
+                # Data generation, page and total; the market comes from the registry
+                self.assertLessEqual(counts[0], 3)
+    
+    def test_markets_come_from_registry(self):
+        """Test that a repeated markets request only reads the data generation."""
+        self.get('/api/markets')
+        data, count = self.get('/api/markets')
+        self.assertEqual(count, 1)  # the data generation
+        self.assertIn('Netto', [market['name'] for market in data['markets']])
+    
+    def test_responses_are_cached_until_ingest(self):
+        """Test that equal requests hit the cache until an ingest commits."""
+        self.assertEqual(self.client.get('/api/offers?search=vare').headers['X-Cache'], 'MISS')
+        self.statements.clear()
+        response = self.client.get('/api/offers?search=%20vare%20&sort=cheapest')
+        self.assertEqual(response.headers['X-Cache'], 'HIT')
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(response.get_json()['total'], 120)
+        
+        # An ingest that is rolled back leaves the cache valid
+        market = Market.query.filter_by(name='Netto').first()
+        save_offers(market, [{'product_name': 'Ny vare', 'price': 1.5}], commit=False)
+        db.session.rollback()
+        self.assertEqual(self.client.get('/api/offers?search=vare').headers['X-Cache'], 'HIT')
+        
+        save_offers(market, [{'product_name': 'Ny vare', 'price': 1.5}])
+        response = self.client.get('/api/offers?search=vare')
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(response.get_json()['total'], 121)
+        
+        stats, _ = self.get('/api/cache-stats')
+        self.assertGreater(stats['hits'], 0)
+        self.assertGreater(stats['misses'], 0)
+        self.assertGreater(stats['bytes'], 0)
+    
+    def test_etag_and_conditional_get(self):
+        """Test that an unchanged listing is answered with 304 until the next ingest."""
+        response = self.client.get('/api/offers?market=Lidl')
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        
+        self.statements.clear()
+        response = self.client.get('/api/offers?market=Lidl', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(len(self.statements), 1)  # the data generation
+        
+        market = Market.query.filter_by(name='Lidl').first()
+        save_offers(market, [{'product_name': 'Ny vare', 'price': 1.5}])
+        response = self.client.get('/api/offers?market=Lidl', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+    
+    def test_gzip_responses(self):
+        """Test that API responses are compressed for clients that accept gzip."""
+        plain = self.client.get('/api/offers?per_page=50')
+        for _ in range(2):  # built, then from the cache
+            response = self.client.get('/api/offers?per_page=50',
+                                       headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertLess(len(response.data), len(plain.data))
+            self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertNotIn('Content-Encoding', plain.headers)
+    
+    def test_static_files(self):
+        """Test versioned, long-cached and precompressed static files."""
+        page = self.client.get('/').get_data(as_text=True)
+        url = re.search(r'src="(/static/js/app\.js\?v=\w+)"', page).group(1)
+        with open(os.path.join(app.static_folder, 'js', 'app.js'), 'rb') as f:
+            content = f.read()
+        
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), content)
+        response.close()
+        
+        response = self.client.get('/static/js/app.js')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(response.data, content)
+        response.close()
+    
+    def walk(self, query):
+        """Follow next_cursor from the first page to the last."""
+        offers = []
+        cursor = ''
+        while cursor is not None:
+            data, _ = self.get(f'/api/offers?{query}&per_page=7&cursor={cursor}')
+            self.assertIsNone(data['total'])
+            offers.extend(data['offers'])
+            cursor = data['next_cursor']
+        return offers
+    
+    def test_cursor_pages_match_page_numbers(self):
+        """Test that keyset pages list the same offers in the same order as page numbers."""
+        # Equal prices in both markets and tables exercise the tie breakers
+        market = Market.query.filter_by(name='Netto').first()
+        save_offers(market, [{'product_name': f'Gammel vare {index}', 'price': float(index),
+                              'valid_to': date(2024, 3, 7)} for index in range(10)])
+        self.assertEqual(archive_expired_offers(), 10)
+        
+        for query in ['sort=price_asc', 'sort=price_desc', 'market=Lidl',
+                      'search=vare&sort=price_desc', 'include_history=1',
+                      'include_history=1&sort=price_desc&search=vare']:
+            with self.subTest(query=query):
+                first, _ = self.get(f'/api/offers?{query}&per_page={MAX_PER_PAGE}')
+                expected = first['offers']
+                for page in range(2, first['pages'] + 1):
+                    data, _ = self.get(f'/api/offers?{query}&per_page={MAX_PER_PAGE}&page={page}')
+                    expected.extend(data['offers'])
+                self.assertEqual(len(expected), first['total'])
+                self.assertEqual(self.walk(query), expected)
+    
+    def test_cursor_total_is_optional(self):
+        """Test that the total is only counted on request."""
+        data, count = self.get('/api/offers?market=Lidl&cursor=&include_total=1')
+        self.assertEqual(data['total'], 60)
+        _, count_without_total = self.get('/api/offers?market=Lidl&cursor=')
+        self.assertEqual(count_without_total, count - 1)
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        for cursor in ['abc', 'e30=', 'WzEsMl0=']:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/offers?cursor={cursor}')
+                self.assertEqual(response.status_code, 400)
+    
+    def test_export_streams_every_offer(self):
+        """Test that the export lists the same offers as the paginated listing."""
+        for query in ['sort=price_desc&search=vare', 'market=Lidl', 'include_history=1']:
+            with self.subTest(query=query):
+                expected = self.walk(query)
+                response = self.client.get(f'/api/offers/export?{query}')
+                self.assertTrue(response.is_streamed)
+                self.assertEqual(response.mimetype, 'application/x-ndjson')
+                self.assertEqual([json.loads(line) for line in response.data.splitlines()],
+                                 expected)
+                
+                response = self.client.get(f'/api/offers/export?{query}&format=csv')
+                self.assertEqual(response.mimetype, 'text/csv')
+                rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+                self.assertEqual([int(row['id']) for row in rows],
+                                 [offer['id'] for offer in expected])
+    
+    def test_export_gzip_and_errors(self):
+        """Test the compressed export, an empty export and an unknown format."""
+        plain = self.client.get('/api/offers/export?format=csv').data
+        response = self.client.get('/api/offers/export?format=csv',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), plain)
+        
+        response = self.client.get('/api/offers/export?format=csv&search=ingenting')
+        self.assertEqual(response.get_data(as_text=True).splitlines(),
+                         ['id,market,product_name,price,unit,valid_from,valid_to,'
+                          'extracted_at,archived'])
+        self.assertEqual(self.client.get('/api/offers/export?format=xml').status_code, 400)
+    
+    def test_suggestions(self):
+        """Test that suggestions come from memory and follow an ingest."""
+        market = Market.query.filter_by(name='Netto').first()
+        save_offers(market, [{'product_name': 'Netto vare 5', 'price': 99.0}])
+        
+        data, _ = self.get('/api/suggest?q=VARE%205&limit=3')
+        self.assertEqual(data['suggestions'][0], {'name': 'Netto vare 5', 'count': 2})
+        self.assertEqual(len(data['suggestions']), 3)
+        
+        data, count = self.get('/api/suggest?q=lidl%20vare%205')
+        self.assertEqual(count, 1)  # the data generation
+        self.assertEqual([suggestion['name'] for suggestion in data['suggestions']],
+                         ['Lidl vare 5', 'Lidl vare 50', 'Lidl vare 51', 'Lidl vare 52',
+                          'Lidl vare 53', 'Lidl vare 54', 'Lidl vare 55', 'Lidl vare 56'])
+        data, _ = self.get('/api/suggest?q=')
+        self.assertEqual(data['suggestions'], [])
+    
+    def test_per_page_is_capped(self):
+        """Test that per_page cannot ask for the whole table."""
+        data, _ = self.get('/api/offers?per_page=100000')
+        self.assertEqual(data['per_page'], MAX_PER_PAGE)
+        self.assertEqual(len(data['offers']), MAX_PER_PAGE)
+        self.assertEqual(data['pages'], 2)
+
+
+class TestIngestJobs(unittest.TestCase):
+    """Test cases for the background ingestion behind /api/process-pdf."""
+    
+    def setUp(self):
+        """Write a sample flyer and isolate the extraction cache."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        cache_patcher = mock.patch.object(
+            extractor_module, '_default_cache',
+            ExtractionCache(os.path.join(self.tmpdir.name, 'cache'), version='test'))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+        
+        self.pdf_path = os.path.join(self.tmpdir.name, 'bilka.pdf')
+        write_sample_pdf(self.pdf_path, [
+            'Gyldig fra 1. november 2099 til 7. november 2099',
+            'Banan 1 kg 10,50 kr\nBrød 1 stk 15 kr',
+        ])
+        self.client = app.test_client()
+    
+    def tearDown(self):
+        """Remove the saved offers."""
+        with app.app_context():
+            db.session.execute(Offer.__table__.delete())
+            db.session.commit()
+    
+    def submit(self, pdf_path):
+        """Queue a flyer and wait for the job to finish."""
+        response = self.client.post('/api/process-pdf',
+                                    json={'pdf_path': pdf_path, 'market_name': 'Bilka'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Location'], response.get_json()['status_url'])
+        app.extensions[JOB_QUEUE_KEY].join()
+        return self.client.get(response.headers['Location']).get_json()
+    
+    def test_job_reports_pages_and_saves_offers(self):
+        """Test that a queued flyer is ingested and its page progress reported."""
+        job = self.submit(self.pdf_path)
+        self.assertEqual(job['status'], 'done', job['error'])
+        self.assertEqual((job['pages_done'], job['pages_total'], job['progress']), (2, 2, 1.0))
+        self.assertEqual(job['result']['offers_inserted'], job['result']['offers_extracted'])
+        self.assertGreater(job['result']['offers_saved'], 0)
+        self.assertFalse(job['result']['partial'])
+        
+        offers = self.client.get('/api/offers?market=Bilka').get_json()
+        self.assertEqual(offers['total'], job['result']['offers_saved'])
+    
+    def test_cached_flyer_is_not_parsed(self):
+        """Test that a flyer served from the extraction cache is not opened again."""
+        self.assertEqual(self.submit(self.pdf_path)['status'], 'done')
+        with mock.patch.object(extractor_module, '_PageSource',
+                               side_effect=AssertionError('PDF parsed')):
+            job = self.submit(self.pdf_path)
+        self.assertEqual(job['status'], 'done', job['error'])
+        self.assertEqual((job['pages_done'], job['pages_total']), (2, 2))
+    
+    def test_partial_job(self):
+        """Test that a flyer with an unreadable page is saved but flagged as partial."""
+        original = extractor_module._PageSource.extract
+        
+        def unreadable(source, engine, index):
+            if index == 1:
+                raise ValueError('damaged page')
+            return original(source, engine, index)
+        
+        with mock.patch.object(extractor_module._PageSource, 'extract', unreadable):
+            job = self.submit(self.pdf_path)
+        self.assertEqual(job['status'], 'done', job['error'])
+        self.assertTrue(job['result']['partial'])
+        self.assertEqual(job['result']['offers_saved'], 0)
+    
+    def test_failed_job(self):
+        """Test that a file that is not a PDF fails the job without saving anything."""
+        path = os.path.join(self.tmpdir.name, 'broken.pdf')
+        with open(path, 'wb') as f:
+            f.write(b'not a pdf')
+        job = self.submit(path)
+        self.assertEqual(job['status'], 'failed')
+        self.assertTrue(job['error'])
+        self.assertIsNone(job['result'])
+    
+    def test_invalid_requests(self):
+        """Test missing fields, missing files and unknown job ids."""
+        response = self.client.post('/api/process-pdf', json={'market_name': 'Bilka'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/process-pdf', json={
+            'pdf_path': os.path.join(self.tmpdir.name, 'missing.pdf'), 'market_name': 'Bilka'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/jobs/unknown').status_code, 404)
+    
+    def test_queue_depth_is_capped(self):
+        """Test that jobs beyond the queue depth are refused with 503."""
+        started = threading.Event()
+        release = threading.Event()
+        
+        def run(job):
+            started.set()
+            release.wait(5)
+        
+        jobs = JobQueue(run, workers=1, max_depth=1)
+        with mock.patch.dict(app.extensions, {JOB_QUEUE_KEY: jobs}):
+            body = {'pdf_path': self.pdf_path, 'market_name': 'Bilka'}
+            self.assertEqual(self.client.post('/api/process-pdf', json=body).status_code, 202)
+            self.assertTrue(started.wait(5))
+            waiting = self.client.post('/api/process-pdf', json=body)
+            self.assertEqual(waiting.status_code, 202)
+            
+            response = self.client.post('/api/process-pdf', json=body)
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response.headers)
+            
+            self.assertEqual(self.client.get(waiting.headers['Location']).get_json()['status'],
+                             'queued')
+            release.set()
+            jobs.join()
+            self.assertEqual(self.client.get(waiting.headers['Location']).get_json()['status'],
+                             'done')
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the response cache."""
+    
+    def test_lru_eviction_keeps_the_cap(self):
+        """Test that the least recently used bodies go first once the cap is reached."""
+        cache = ResponseCache(max_bytes=3 * (100 + ENTRY_OVERHEAD))
+        for key in 'abc':
+            cache.put(key, 1, b'x' * 100)
+        self.assertIsNotNone(cache.get('a', 1))
+        cache.put('d', 1, b'x' * 100)
+        
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual([cache.get(key, 1) is not None for key in 'acd'], [True, True, True])
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (3, 1))
+        self.assertLessEqual(stats['bytes'], cache.max_bytes)
+        
+        # Bodies larger than the cache are not stored
+        cache.put('e', 1, b'x' * cache.max_bytes)
+        self.assertIsNone(cache.get('e', 1))
+    
+    def test_generation_invalidates(self):
+        """Test that a new generation empties the cache and old bodies are refused."""
+        cache = ResponseCache()
+        cache.put('a', 1, b'old')
+        self.assertEqual(cache.get('a', 1), b'old')
+        
+        self.assertIsNone(cache.get('a', 2))
+        cache.put('a', 1, b'stale')
+        self.assertIsNone(cache.get('a', 2))
+        cache.put('a', 2, b'new')
+        self.assertEqual(cache.get('a', 2), b'new')
+        self.assertEqual(cache.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()